@@ -0,0 +1,144 @@
+#!/usr/bin/python3
+
+## @package CollisionBroadphase
+#
+# Finds the obstacles and robots that a robot may be colliding with, so that
+# the exact shape tests of `Robot` only run on those.
+#
+# Without it, every robot tests its body against every dynamic obstacle,
+# every static obstacle, and every other robot on every step, which makes
+# runs with many robots cost O(R * (N + S + R)) shape tests per step. The
+# broadphase narrows each check down to the obstacles and robots whose
+# bounding boxes overlap the robot's:
+#
+# - Static obstacles are looked up in the environment's static index (see
+#   `GeometricEnvironment.get_static_index()`).
+# - Dynamic obstacles are put into a `SpatialIndex.BoxGrid`, which is built
+#   the first time it is needed in each step.
+# - Robots move one after another during a step, and each one checks for
+#   collisions right after it moves, so their boxes are kept in an array
+#   that each robot updates when it moves (see `update_robot()`). A check
+#   then compares against all of them in one vectorized test.
+#
+
+import numpy as np
+from SpatialIndex import BoxGrid, _bounding_box, _bounding_boxes
+
+
+## Boxes are grown by this much before they are compared, so that shapes
+# that exactly touch are never missed because of rounding
+_BOX_PAD = 1e-6
+
+
+class CollisionBroadphase:
+
+	## Constructor
+	#
+	# @param env (`Environment` object)
+	#
+	# @param cell_size (float)
+	# <br>	-- The cell size of the grid over the dynamic obstacles
+	#
+	def __init__(self, env, cell_size=40):
+		self._env = env
+		self._cell_size = cell_size
+
+		# The grid over the dynamic obstacles, and the state it was
+		# built for
+		self._dynamic_grid = None
+		self._dynamic_key = None
+
+		# The boxes of the robots' bodies (NaN for robots without one),
+		# in the order of the environment's `robots`
+		self._robot_boxes = np.zeros((0, 4))
+		self._robot_rows = dict()
+		self._robots_key = None
+
+
+	## Gets the dynamic obstacles whose bounding boxes overlap the given
+	# box.
+	#
+	# The obstacles are indexed at most once per step (per value of
+	# `Environment.get_state_version()`), so obstacles that are moved in
+	# some other way during a step are found where they were when the
+	# index was built.
+	#
+	# @param box (array-like)
+	# <br>	Format: `[xmin, ymin, xmax, ymax]`
+	#
+	# @returns (list of `DynamicObstacle`)
+	# <br>	-- The obstacles, in the order of `dynamic_obstacles`
+	#
+	def dynamic_obstacles_in_box(self, box):
+		obs_list = self._env.dynamic_obstacles
+		key = (self._env.get_state_version(), id(obs_list), len(obs_list))
+		if key != self._dynamic_key:
+			self._dynamic_grid = BoxGrid(_bounding_boxes(obs_list), cell_size=self._cell_size)
+			self._dynamic_key = key
+		ids = self._dynamic_grid.ids_in_box(box[0] - _BOX_PAD, box[1] - _BOX_PAD, box[2] + _BOX_PAD, box[3] + _BOX_PAD)
+		return [obs_list[i] for i in ids.tolist()]
+
+
+	## Gets the static obstacles whose bounding boxes overlap the given
+	# box.
+	#
+	# @returns (list of `DynamicObstacle`)
+	# <br>	-- The obstacles, in the order of `static_obstacles`
+	#
+	def static_obstacles_in_box(self, box):
+		index = self._env.get_static_index()
+		ids = index.obstacle_ids_in_box(box[0] - _BOX_PAD, box[1] - _BOX_PAD, box[2] + _BOX_PAD, box[3] + _BOX_PAD)
+		return [index.obstacles[i] for i in ids.tolist()]
+
+
+	## Gets the robots, other than `robot`, whose bodies' bounding boxes
+	# overlap the given box.
+	#
+	# @param robot (`Robot` object)
+	# <br>	-- The robot to leave out (the one doing the check)
+	#
+	# @returns (list of `Robot`)
+	# <br>	-- The robots, in the order of the environment's `robots`
+	#
+	def robots_in_box(self, box, robot=None):
+		self._update_robot_boxes()
+		boxes = self._robot_boxes
+		hits = (boxes[:, 0] <= box[2] + _BOX_PAD) & (box[0] - _BOX_PAD <= boxes[:, 2]) & (boxes[:, 1] <= box[3] + _BOX_PAD) & (box[1] - _BOX_PAD <= boxes[:, 3])
+		robots = self._env.robots
+		return [robots[i] for i in np.flatnonzero(hits).tolist() if robots[i] is not robot]
+
+
+	## Records where a robot's body is now. Robots call this whenever
+	# their body moves during a step, so that the robots that check for
+	# collisions after them see them in the right place.
+	#
+	# @param robot (`Robot` object)
+	#
+	def update_robot(self, robot):
+		self._update_robot_boxes()
+		row = self._robot_rows.get(id(robot))
+		if row is not None:
+			self._robot_boxes[row] = _robot_box(robot)
+
+
+	## Reads the boxes of all the robots, if this has not been done since
+	# the last step (or since the list of robots changed).
+	#
+	def _update_robot_boxes(self):
+		robots = self._env.robots
+		key = (self._env.get_state_version(), id(robots), len(robots))
+		if key == self._robots_key:
+			return
+		self._robots_key = key
+		self._robot_boxes = np.array([_robot_box(robot) for robot in robots], dtype=np.float64).reshape(-1, 4)
+		self._robot_rows = {id(robot): i for i, robot in enumerate(robots)}
+
+
+## Gets the bounding box of a robot's body, or NaNs (which overlap nothing)
+# if it does not have one.
+#
+def _robot_box(robot):
+	obs = robot.get_obstacle()
+	if obs is None:
+		return (np.nan, np.nan, np.nan, np.nan)
+	return _bounding_box(obs)
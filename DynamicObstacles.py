@@ -4,10 +4,35 @@
 #
 
 import numpy as np
-import pygame as PG
 import Vector
 
 
+## Makes a property for an attribute of `DynamicObstacle` that is kept in an
+# array of the obstacle's `ObstacleStore`, if it has one.
+#
+# @param name (string)
+# <br>	-- The name of the attribute
+#
+# @param array_name (string)
+# <br>	-- The name of the store's array
+#
+def _stored_attribute(name, array_name):
+	private_name = '_' + name
+
+	def get_value(self):
+		if self._store is None:
+			return getattr(self, private_name)
+		return getattr(self._store, array_name)[self._store_index]
+
+	def set_value(self, value):
+		if self._store is None:
+			setattr(self, private_name, value)
+		else:
+			getattr(self._store, array_name)[self._store_index] = value
+
+	return property(get_value, set_value)
+
+
 ## Represents a dynamic obstacle
 #
 # 
@@ -49,6 +74,10 @@ class DynamicObstacle:
 	# 	point is for their top-left corner (the point on the
 	# 	rectangle with the smallest x and y values), and for
 	# 	circles and ellipses it is the center of the circle.
+	#
+	# While the obstacle is in an `ObstacleStore` (see `set_store()`),
+	# `coordinate`, `radius`, `size`, `width`, `height`, and `shape` are
+	# kept in the store's arrays.
 	# 
 
 	## Constructor. See the member descriptions for what each of these
@@ -58,6 +87,16 @@ class DynamicObstacle:
 		self._movement          = movement
 		self._obs_id            = obs_id
 
+		# The ObstacleStore this obstacle is in, if any, and its row
+		self._store             = None
+		self._store_index       = None
+
+		# Whether the position comes from a SimClock (see
+		# next_step()), and the movement time at which `coordinate`
+		# was last set directly, if it does
+		self._follows_clock     = False
+		self._coordinate_time   = None
+
 		self.coordinate		= movement.get_pos()
 		self._last_position     = self.coordinate
 
@@ -71,6 +110,27 @@ class DynamicObstacle:
 		self.shape		= 1 # 1 = Circle, 2 = Rectangle, 3 = Ellipse
 
 
+	## The current location of the obstacle (see the member description
+	# above). If the obstacle follows a clock, it is computed from the
+	# movement when it is first asked for after the clock advances.
+	#
+	@property
+	def coordinate(self):
+		if self._store is not None:
+			return self._store.get_position(self._store_index)
+		if self._follows_clock and self._coordinate_time != self._movement.get_time():
+			return self._movement.get_pos()
+		return self._coordinate
+
+	@coordinate.setter
+	def coordinate(self, coordinate):
+		if self._store is not None:
+			self._store.set_position(self._store_index, coordinate)
+			return
+		self._coordinate = coordinate
+		if self._follows_clock:
+			self._coordinate_time = self._movement.get_time()
+
 	def set_coordinate(self, coordinate):
 		self.coordinate = coordinate
 
@@ -84,15 +144,182 @@ class DynamicObstacle:
 		self.height = height
 
 	def get_velocity_vector(self):
+		if self._store is not None:
+			return self._store.get_velocity(self._store_index)
+		if self._follows_clock:
+			return self.coordinate - self._movement.get_prev_pos()
 		return self.coordinate - self._last_position
 
 
 	## Does a motion step for this obstacle, updating its position and
 	# direction according to its movement mode.
 	#
-	def next_step(self, timestep):
+	# @param clock (`SimClock` object)
+	# <br>	-- The clock of the environment, which is advanced by
+	# 	`timestep` after all the obstacles are stepped. If the
+	# 	movement can follow it (see `MovementPattern.follow_clock()`),
+	# 	the obstacle is not stepped at all; its position and velocity
+	# 	are computed from the clock time when they are asked for.
+	#
+	def next_step(self, timestep, clock=None):
+		if self._store is not None:
+			self._store.step(timestep, [self._store_index])
+			return
+		if self._follows_clock or (clock is not None and self.follow_clock(clock)):
+			return
+
 		self._last_position = self.coordinate
 
 		self._movement.step(timestep)
 		self.coordinate = self._movement.get_pos()
 
+
+	## Makes this obstacle's position follow the given clock from now on,
+	# if its movement can (see `next_step()`).
+	#
+	# @param clock (`SimClock` object)
+	#
+	# @returns (bool)
+	# <br>	-- Whether the obstacle follows the clock
+	#
+	def follow_clock(self, clock):
+		if self._store is not None:
+			# It follows the store's clock
+			return self._follows_clock
+		if self._movement.follow_clock(clock):
+			self._follows_clock = True
+		return self._follows_clock
+
+
+	## Gets the state of this obstacle's motion, for
+	# `Environment.snapshot()`.
+	#
+	# @returns (`ObstacleState` object)
+	# <br>	-- The position, and anything else `set_state()` needs to
+	# 	put the obstacle back where it is now. For an obstacle in
+	# 	an `ObstacleStore`, that is the state of its row in the
+	# 	store; for one that follows a clock, the state of its
+	# 	movement; and otherwise, also its previous position and
+	# 	which of its position arrays are shared.
+	#
+	def get_state(self):
+		state = ObstacleState(np.array(self.coordinate, dtype=np.float64))
+		if self._store is not None:
+			# The state of a random movement is in the store, in the
+			# format of the movement's own state
+			state.in_store = True
+			state.movement_state = self._store.get_movement_state(self._store_index)
+			return state
+		state.movement_state = self._movement.get_state()
+		if self._follows_clock:
+			# The position follows from the movement's state
+			state.follows_clock = True
+			return state
+		state.last_position = np.array(self._last_position, dtype=np.float64)
+		# Some movements update their position in place, so the
+		# obstacle's position arrays may be shared with the movement
+		state.is_movement_pos = self.coordinate is self._movement.get_pos()
+		state.is_last_pos = self._last_position is self.coordinate
+		return state
+
+
+	## Puts this obstacle back into a state from `get_state()`.
+	#
+	# @param state (`ObstacleState` object)
+	#
+	def set_state(self, state):
+		if self._store is not None:
+			self._store.set_movement_state(self._store_index, state.movement_state)
+			return
+		self._movement.set_state(state.movement_state)
+		self._follows_clock = state.follows_clock
+		self._coordinate_time = None
+		if state.follows_clock:
+			return
+		self.coordinate = self._movement.get_pos() if state.is_movement_pos else np.array(state.coordinate)
+		self._last_position = self.coordinate if state.is_last_pos else np.array(state.last_position)
+
+
+	## Moves this obstacle's state into a row of an `ObstacleStore`. This
+	# is done by `ObstacleStore.add()`.
+	#
+	# @param store (`ObstacleStore` object)
+	#
+	# @param index (int)
+	# <br>	-- The obstacle's row in the store
+	#
+	def set_store(self, store, index):
+		self._store = store
+		self._store_index = index
+
+
+	## Gets the `ObstacleStore` this obstacle is in, or `None`.
+	#
+	def get_store(self):
+		return self._store
+
+
+	## Gets this obstacle's row in its `ObstacleStore`.
+	#
+	def get_store_index(self):
+		return self._store_index
+
+
+	radius = _stored_attribute('radius', 'radii')
+	width = _stored_attribute('width', 'widths')
+	height = _stored_attribute('height', 'heights')
+	size = _stored_attribute('size', 'sizes')
+	shape = _stored_attribute('shape', 'shapes')
+
+
+## The state of a `DynamicObstacle`'s motion, as captured by
+# `DynamicObstacle.get_state()`.
+#
+class ObstacleState:
+
+	## @var coordinate
+	# (numpy array)
+	# <br>	Format: `[x, y]`
+	# <br>	The position of the obstacle
+	#
+	# @var movement_state
+	# <br>	The state of the obstacle's movement (see
+	# 	`MovementPattern.MovementPattern.get_state()`), or of its row
+	# 	in its `ObstacleStore` (see
+	# 	`ObstacleStore.get_movement_state()`)
+	#
+	# @var in_store
+	# (bool)
+	# <br>	Whether the obstacle was in an `ObstacleStore`. If so, only
+	# 	`movement_state` is needed to restore it.
+	#
+	# @var follows_clock
+	# (bool)
+	# <br>	Whether the obstacle's position followed a clock. If so, the
+	# 	position follows from `movement_state`, and the fields below
+	# 	are not used.
+	#
+	# @var last_position
+	# (numpy array)
+	# <br>	Format: `[x, y]`
+	# <br>	The previous position of the obstacle, which gives its
+	# 	velocity
+	#
+	# @var is_movement_pos
+	# (bool)
+	# <br>	Whether `coordinate` was the same array as the movement's
+	# 	position (which some movements update in place)
+	#
+	# @var is_last_pos
+	# (bool)
+	# <br>	Whether the previous position was the same array as
+	# 	`coordinate`
+	#
+	def __init__(self, coordinate):
+		self.coordinate = coordinate
+		self.movement_state = None
+		self.in_store = False
+		self.follows_clock = False
+		self.last_position = None
+		self.is_movement_pos = False
+		self.is_last_pos = False
@@ -4,11 +4,13 @@
 #
 
 import numpy  as np
-import pygame as PG
-import DrawTool
 from  DynamicObstacles import DynamicObstacle
 import sys
 import Vector
+from MovementPattern import SimClock
+from ObstacleSchedule import ObstacleSchedule
+from ObstacleStore import ObstacleStore
+from CollisionBroadphase import CollisionBroadphase
 
 
 ## Types of grid cells. Used in Environment grid_data
@@ -35,6 +37,25 @@ class Environment:
 		self.non_interactive_objects = []
 		self._speed_mode = cmdargs.speedmode
 		self._triggers = {'step': []}
+		self._step_num = 0
+		self._state_version = 0
+
+		## The clock that obstacles with time-parametric movements
+		# follow (see `DynamicObstacle.next_step()`)
+		self.clock = SimClock()
+
+		## Dynamic obstacles that are only in `dynamic_obstacles`
+		# during their time intervals (see `schedule_obstacle()`)
+		self.obstacle_schedule = ObstacleSchedule()
+
+		## Holds the state of the dynamic obstacles whose movements can
+		# be advanced all at once. Obstacles are added to it when they
+		# are first stepped.
+		self.obstacle_store = ObstacleStore(self.clock)
+
+		## Narrows down the robots' collision checks (see
+		# `Robot.next_step()`)
+		self.collision_broadphase = CollisionBroadphase(self)
 
 
 	def add_robot(self, robot):
@@ -64,6 +85,74 @@ class Environment:
 		return self._speed_mode
 
 
+	## Gets the number of times `next_step()` has been called (or, after
+	# `restore()`, the number at the time of the snapshot).
+	#
+	def get_step_num(self):
+		return self._step_num
+
+
+	## Gets a number that changes whenever the obstacles may have moved,
+	# i.e., on every `next_step()` and `restore()`. Anything that caches
+	# information about the environment can use this to tell when its
+	# cache is out of date. (The step number can not be used for this, as
+	# it goes back to an earlier value when a snapshot is restored.)
+	#
+	def get_state_version(self):
+		return self._state_version
+
+
+	## Captures the state of the environment, so that it can be put back
+	# later with `restore()`. This lets planners simulate the future
+	# (e.g., forward rollouts) and then return to the present.
+	#
+	# The snapshot holds the kinematic state of the dynamic obstacles and
+	# robots, the step number, and the state of NumPy's global random
+	# number generator (which random movements and collision handling
+	# use), so stepping again after a restore repeats the same steps.
+	# Static data (the map and static obstacles) is not copied, and
+	# neither is anything that keeps its own state outside the
+	# environment, such as navigation algorithms, sensors, and triggers.
+	#
+	# @returns (`EnvironmentSnapshot` object)
+	#
+	def snapshot(self):
+		snapshot = EnvironmentSnapshot()
+		snapshot.step_num = self._step_num
+		snapshot.clock_state = (self.clock.time, self.clock.prev_time)
+		snapshot.schedule_state = self.obstacle_schedule.get_state()
+		snapshot.dynamic_obstacles = list(self.dynamic_obstacles)
+		snapshot.obstacle_states = [obs.get_state() for obs in snapshot.dynamic_obstacles]
+		snapshot.obstacle_positions = np.array([state.coordinate for state in snapshot.obstacle_states], dtype=np.float64).reshape(-1, 2)
+		snapshot.robots = list(self.robots)
+		snapshot.robot_states = [robot.get_state() for robot in snapshot.robots]
+		snapshot.robot_locations = np.array([state[0] for state in snapshot.robot_states], dtype=np.float64).reshape(-1, 2)
+		snapshot.random_state = np.random.get_state()
+		return snapshot
+
+
+	## Puts the environment back into the state captured by `snapshot()`.
+	# A snapshot can be restored any number of times.
+	#
+	# @param snapshot (`EnvironmentSnapshot` object)
+	#
+	def restore(self, snapshot):
+		self._step_num = snapshot.step_num
+		self._state_version += 1
+		self.clock.time, self.clock.prev_time = snapshot.clock_state
+		self.obstacle_schedule.set_state(snapshot.schedule_state)
+
+		# The lists are updated in place, since other objects may
+		# hold references to them
+		self.robots[:] = snapshot.robots
+		for robot, state in zip(snapshot.robots, snapshot.robot_states):
+			robot.set_state(state)
+		self.dynamic_obstacles[:] = snapshot.dynamic_obstacles
+		for obs, state in zip(snapshot.dynamic_obstacles, snapshot.obstacle_states):
+			obs.set_state(state)
+		np.random.set_state(snapshot.random_state)
+
+
 	def load_map(self, map_filename):
 		pass
 
@@ -79,9 +168,41 @@ class Environment:
 		map_modifier(self);
 
 
+	## Adds a dynamic obstacle that is only in `dynamic_obstacles` (and so
+	# only seen by radars, collision checks and drawing) during the given
+	# interval of the environment's clock.
+	#
+	# If the obstacle's movement can follow the clock (see
+	# `DynamicObstacle.follow_clock()`), it is at the right place on its
+	# path whenever it is active. Otherwise, it is not moved while it is
+	# inactive.
+	#
+	# @param obs (`DynamicObstacle` object)
+	#
+	# @param start_time (float)
+	# <br>	-- The first clock time at which the obstacle is active
+	#
+	# @param end_time (float)
+	# <br>	-- The last clock time at which the obstacle is active
+	#
+	def schedule_obstacle(self, obs, start_time, end_time):
+		if self.obstacle_store.add(obs) is None:
+			obs.follow_clock(self.clock)
+		self.obstacle_schedule.add(obs, start_time, end_time)
+		self.obstacle_schedule.update(self.clock.time, self.dynamic_obstacles)
+
+
 	def _update_dynamic_obstacles(self, timestep):
+		stored = []
 		for dynobs in self.dynamic_obstacles:
-			dynobs.next_step(timestep);
+			index = self.obstacle_store.index_of(dynobs)
+			if index is None:
+				dynobs.next_step(timestep, clock=self.clock);
+			else:
+				stored.append(index)
+		self.obstacle_store.step(timestep, stored)
+		self.clock.advance(timestep)
+		self.obstacle_schedule.update(self.clock.time, self.dynamic_obstacles)
 
 
 	## Draws the environment onto the given display.
@@ -96,6 +217,9 @@ class Environment:
 	## Step the environment, updating dynamic obstacles
 	#
 	def next_step(self, timestep=1):
+		self._step_num += 1
+		self._state_version += 1
+
 		for trigger in self._triggers['step']:
 			trigger(timestep)
 
@@ -115,3 +239,113 @@ class Environment:
 		# Should be overridden by subclass
 		# 0 means no obstacles
 		return 0
+
+
+	## Checks what kind of obstacle each of the given points is. This
+	# is the batched form of `get_obsflags()`; subclasses override it
+	# with a vectorized version.
+	#
+	# @param points (numpy array)
+	# <br>	Format: `[[x1, y1], ..., [xn, yn]]`
+	# <br>	-- Locations to check
+	#
+	# @param flag_types (int)
+	# <br>	-- The `ObsFlag` bits to check for
+	#
+	# @returns (numpy array)
+	# <br>	-- The flags at each point (only those in `flag_types`)
+	#
+	def get_obsflags_many(self, points, flag_types=0xFFFFFFFF):
+		return np.array([self.get_obsflags(point) for point in points], dtype=int).reshape(-1) & flag_types
+
+
+	## Checks whether a line segment touches any obstacle of the given
+	# types.
+	#
+	# @param p0 (numpy array)
+	# <br>	Format: `[x, y]`
+	# <br>	-- The start of the segment
+	#
+	# @param p1 (numpy array)
+	# <br>	Format: `[x, y]`
+	# <br>	-- The end of the segment
+	#
+	# @param flags (int)
+	# <br>	-- The `ObsFlag` bits to check for
+	#
+	# @param inflate_radius (float)
+	# <br>	-- If positive, the segment is swept by a disk of this radius
+	# 	(e.g., a robot's footprint), so obstacles within this
+	# 	distance of the segment count as touching it
+	#
+	# @returns (bool)
+	#
+	def segment_collides(self, p0, p1, flags=ObsFlag.ANY_OBSTACLE, inflate_radius=0):
+		return bool(self.segments_collide([p0], [p1], flags, inflate_radius)[0])
+
+
+	## Checks which of several line segments touch any obstacle of the
+	# given types. This is the batched form of `segment_collides()`.
+	#
+	# Subclasses override this with exact versions. This one samples each
+	# segment (and, if `inflate_radius` is positive, a few parallel
+	# offsets of it) at steps of one unit.
+	#
+	# @param starts (numpy array)
+	# <br>	Format: `[[x1, y1], ..., [xn, yn]]`
+	#
+	# @param ends (numpy array)
+	# <br>	Format: `[[x1, y1], ..., [xn, yn]]`
+	#
+	# @returns (numpy array of bool)
+	#
+	def segments_collide(self, starts, ends, flags=ObsFlag.ANY_OBSTACLE, inflate_radius=0):
+		starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+		ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+		out = np.zeros(len(starts), dtype=bool)
+		for i in range(len(starts)):
+			vec = ends[i] - starts[i]
+			length = np.sqrt(np.dot(vec, vec))
+			steps = np.append(np.arange(0, length, 1.0), length) / max(length, 1e-12)
+			points = starts[i] + steps[:, np.newaxis] * vec
+			if 0 < inflate_radius:
+				normal = np.array([-vec[1], vec[0]]) / max(length, 1e-12)
+				offsets = np.linspace(-inflate_radius, inflate_radius, 2 * int(np.ceil(inflate_radius)) + 1)
+				points = (points[np.newaxis, :, :] + offsets[:, np.newaxis, np.newaxis] * normal).reshape(-1, 2)
+			out[i] = np.any(self.get_obsflags_many(points, flags))
+		return out
+
+
+## The state of an `Environment`, as captured by `Environment.snapshot()`.
+#
+# Apart from the fields below, subclasses may add fields for their own state.
+#
+class EnvironmentSnapshot:
+
+	## @var step_num
+	# (int)
+	# <br>	The step number when the snapshot was taken
+	#
+	# @var obstacle_positions
+	# (numpy array)
+	# <br>	Format: `[[x1, y1], ..., [xn, yn]]`
+	# <br>	The position of each dynamic obstacle, in the same order as
+	# 	the environment's `dynamic_obstacles`
+	#
+	# @var robot_locations
+	# (numpy array)
+	# <br>	Format: `[[x1, y1], ..., [xn, yn]]`
+	# <br>	The location of each robot, in the same order as the
+	# 	environment's `robots`
+	#
+	def __init__(self):
+		self.step_num = 0
+		self.clock_state = (0.0, 0.0)
+		self.schedule_state = np.zeros(0, dtype=bool)
+		self.dynamic_obstacles = []
+		self.obstacle_states = []
+		self.obstacle_positions = np.zeros((0, 2))
+		self.robots = []
+		self.robot_states = []
+		self.robot_locations = np.zeros((0, 2))
+		self.random_state = None
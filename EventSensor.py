@@ -2,6 +2,7 @@
 
 import Vector
 from GeometricRadar import GeometricRadar
+from Environment import ObsFlag
 
 ## @package EventSensor
 #
@@ -38,10 +39,7 @@ class EventSensor:
 
 
 	def _obs_on_line(self, line):
-		for obs in self._env.static_obstacles:
-			if self._radar._obs_dist_along_line(obs, line) < float('inf'):
-				return True
-		return False
+		return self._env.segment_collides(line[0], line[1], ObsFlag.STATIC_OBSTACLE)
 
 
 	## Clears events within the detection range
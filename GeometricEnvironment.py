@@ -13,6 +13,8 @@ from Environment import Environment, ObsFlag
 import MapModifier
 import StaticGeometricMaps
 import Geometry
+from SpatialIndex import SpatialIndex
+from PackedObstacles import PackedObstacles
 
 
 ## Holds information related to the simulation environment, such as the
@@ -27,6 +29,10 @@ class GeometricEnvironment(Environment):
 		self.height = height
 		self.dynamic_obstacles = []
 		self.static_obstacles = []
+		self._static_index = None
+		self._dynamic_packed = None
+		self._dynamic_packed_source = None
+		self._dynamic_packed_state = None
 
 		self._triggers['pre_draw'] = []
 		self._triggers['post_draw'] = []
@@ -66,6 +72,20 @@ class GeometricEnvironment(Environment):
 
 	def load_map(self, map_filename):
 		self.static_obstacles = StaticGeometricMaps.load_map_file(self.cmdargs.map_name)
+		self._static_index = SpatialIndex(self.static_obstacles)
+
+
+	## Gets the spatial index over the static obstacles. The index is
+	# built when the map is loaded, and rebuilt if `static_obstacles`
+	# has been replaced or resized since then.
+	#
+	# @returns (`SpatialIndex` object)
+	#
+	def get_static_index(self):
+		index = self._static_index
+		if index is None or index.source is not self.static_obstacles or len(index) != len(self.static_obstacles):
+			self._static_index = SpatialIndex(self.static_obstacles)
+		return self._static_index
 
 
 	def apply_map_modifier_by_number(self, modifier_num):
@@ -148,7 +168,7 @@ class GeometricEnvironment(Environment):
 					break
 
 		if flag_types & (ObsFlag.STATIC_OBSTACLE | ObsFlag.ANY_OBSTACLE):
-			for obs in self.static_obstacles:
+			for obs in self.get_static_index().obstacles_at(location):
 				vec = np.subtract(location, obs.coordinate)
 				if (obs.shape == 1 and np.dot(vec, vec) < obs.radius*obs.radius) \
 					or (obs.shape == 2 and Geometry.point_inside_rectangle([obs.coordinate, obs.size], location)) \
@@ -165,3 +185,101 @@ class GeometricEnvironment(Environment):
 
 		return flags
 
+
+	## Checks what kind of obstacle each of the given points is. Gives the
+	# same result as calling `get_obsflags()` on each point, but tests all
+	# of the points against each obstacle at once.
+	#
+	# @param points (numpy array)
+	# <br>	Format: `[[x1, y1], ..., [xn, yn]]`
+	# <br>	-- Locations to check
+	#
+	# @param flag_types (int)
+	# <br>	-- The `ObsFlag` bits to check for
+	#
+	# @returns (numpy array)
+	# <br>	-- The flags at each point (only those in `flag_types`)
+	#
+	def get_obsflags_many(self, points, flag_types=0xFFFFFFFF):
+		points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+		flags = np.zeros(points.shape[0], dtype=int)
+		if points.shape[0] == 0:
+			return flags
+
+		if flag_types & (ObsFlag.DYNAMIC_OBSTACLE | ObsFlag.ANY_OBSTACLE):
+			packed = self.get_dynamic_packed()
+			if len(packed) > 0:
+				flags[np.any(packed.contains_points(points), axis=0)] |= ObsFlag.DYNAMIC_OBSTACLE
+
+		if flag_types & (ObsFlag.STATIC_OBSTACLE | ObsFlag.ANY_OBSTACLE):
+			index = self.get_static_index()
+			lo = np.min(points, axis=0)
+			hi = np.max(points, axis=0)
+			candidates = index.obstacle_ids_in_box(lo[0], lo[1], hi[0], hi[1])
+			if len(candidates) > 0:
+				flags[np.any(index.packed.contains_points(points, obs_ids=candidates), axis=0)] |= ObsFlag.STATIC_OBSTACLE
+
+		flags[(flags & (ObsFlag.DYNAMIC_OBSTACLE | ObsFlag.STATIC_OBSTACLE)) != 0] |= ObsFlag.ANY_OBSTACLE
+
+		return flags & flag_types
+
+
+	## Checks which of several line segments touch any obstacle of the
+	# given types, using the exact obstacle geometry (see
+	# `PackedObstacles.segments_touch()`). A segment touches an obstacle if
+	# it crosses its boundary or lies inside it.
+	#
+	# @param starts (numpy array)
+	# <br>	Format: `[[x1, y1], ..., [xn, yn]]`
+	#
+	# @param ends (numpy array)
+	# <br>	Format: `[[x1, y1], ..., [xn, yn]]`
+	#
+	# @param flags (int)
+	# <br>	-- The `ObsFlag` bits to check for
+	#
+	# @param inflate_radius (float)
+	# <br>	-- If positive, the segments are swept by a disk of this
+	# 	radius, so obstacles within this distance of a segment count
+	# 	as touching it
+	#
+	# @returns (numpy array of bool)
+	#
+	def segments_collide(self, starts, ends, flags=ObsFlag.ANY_OBSTACLE, inflate_radius=0):
+		starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+		ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+		out = np.zeros(len(starts), dtype=bool)
+		if len(starts) == 0:
+			return out
+
+		if flags & (ObsFlag.DYNAMIC_OBSTACLE | ObsFlag.ANY_OBSTACLE):
+			packed = self.get_dynamic_packed()
+			if len(packed) > 0:
+				out |= np.any(packed.segments_touch(starts, ends, inflate_radius), axis=0)
+
+		if flags & (ObsFlag.STATIC_OBSTACLE | ObsFlag.ANY_OBSTACLE):
+			index = self.get_static_index()
+			lo = np.minimum(np.min(starts, axis=0), np.min(ends, axis=0)) - inflate_radius
+			hi = np.maximum(np.max(starts, axis=0), np.max(ends, axis=0)) + inflate_radius
+			candidates = index.obstacle_ids_in_box(lo[0], lo[1], hi[0], hi[1])
+			if len(candidates) > 0:
+				out |= np.any(index.packed.segments_touch(starts, ends, inflate_radius, obs_ids=candidates), axis=0)
+
+		return out
+
+
+	## Gets the dynamic obstacles packed for batched queries. They are
+	# re-packed once per step or restore (or when `dynamic_obstacles` is
+	# replaced), since that is when they move, so the radars and the
+	# batched queries share one packing per step.
+	#
+	# @returns (`PackedObstacles` object)
+	#
+	def get_dynamic_packed(self):
+		state = (self.get_state_version(), len(self.dynamic_obstacles))
+		if self._dynamic_packed is None or self._dynamic_packed_source is not self.dynamic_obstacles or self._dynamic_packed_state != state:
+			self._dynamic_packed = PackedObstacles(self.dynamic_obstacles)
+			self._dynamic_packed_source = self.dynamic_obstacles
+			self._dynamic_packed_state = state
+		return self._dynamic_packed
+
@@ -10,6 +10,11 @@ import Vector
 import Geometry
 import cython
 from Radar import Radar
+from PackedObstacles import PackedObstacles
+
+# Number of (center, obstacle) pairs computed at once by the batched scans,
+# which bounds their memory use
+_PAIR_CHUNK_SIZE = 512
 
 ## Produces simulated radar output for the robot
 #
@@ -60,10 +65,17 @@ class GeometricRadar(Radar):
 	# <br>	-- The increment for the scanning beam. This controls how
 	# 	many different angles are checked for obstacles.
 	#
-	def __init__(self, env, radius = 100, degree_step = 1):
+	# @param use_vectorized_scan (boolean)
+	# <br>	-- Whether to compute scans with the batched NumPy backend
+	# 	(see `PackedObstacles`). The results are the same as the
+	# 	per-beam backend, but much faster when there are many
+	# 	obstacles or beams.
+	#
+	def __init__(self, env, radius = 100, degree_step = 1, use_vectorized_scan = True):
 
 		self._env        = env
 		self.radius	 = radius
+		self.use_vectorized_scan = use_vectorized_scan
 		self.set_degree_step(degree_step);
 
 
@@ -85,7 +97,22 @@ class GeometricRadar(Radar):
 	# 	`floor(360/degree_step)`.
 	#
 	def scan(self, center):
-		return self.scan_obstacles_list(center, self._env.dynamic_obstacles + self._env.static_obstacles)
+		return self.scan_obstacles_lists(center, self._env.dynamic_obstacles, self._env.static_obstacles)
+
+
+	## Produces a radar scan from each of several center points.
+	#
+	# @param centers (numpy array)
+	# <br>	Format `[[x1, y1], ..., [xn, yn]]`
+	# <br>	-- The center points of the scans
+	#
+	# @returns (numpy array)
+	# <br>	Format: `(num_centers, data_size)`
+	# <br>	-- Row `i` is the radar data for `centers[i]`, in the same
+	# 	format as `scan()`.
+	#
+	def scan_many(self, centers):
+		return self.scan_obstacles_lists_many(centers, self._env.dynamic_obstacles, self._env.static_obstacles)
 
 
 	## Sets the degree step of the `Radar`.
@@ -98,10 +125,12 @@ class GeometricRadar(Radar):
 		# Recalculate beams
 		self._nPoints = int(360 / int(self._degree_step)); 
 		self._beams = np.zeros([self._nPoints, 2]);
+		self._beam_dirs = np.zeros([self._nPoints, 2]);
 		currentStep = 0
 		for angle in np.arange(0, 360, self._degree_step):
 			ang_in_radians = angle * np.pi / 180
-			self._beams[currentStep] = Vector.unit_vec_from_radians(ang_in_radians) * self.radius
+			self._beam_dirs[currentStep] = Vector.unit_vec_from_radians(ang_in_radians)
+			self._beams[currentStep] = self._beam_dirs[currentStep] * self.radius
 			currentStep += 1
 
 
@@ -132,10 +161,18 @@ class GeometricRadar(Radar):
 
 		if angle_range is None:
 			return None;
+		# The range is end-exclusive, so it must end after the last
+		# beam inside the arc. Indices run from -nPoints to nPoints, so
+		# arcs that wrap around 0 degrees are handled by negative
+		# indexing.
 		index1 = np.ceil(angle_range[0] / self._degree_step);
-		index2 = min(360, np.floor(angle_range[1] / self._degree_step));
-		if index2 < index1:
+		index2 = np.floor(angle_range[1] / self._degree_step) + 1;
+		if angle_range[1] < angle_range[0]:
 			index1 -= self._nPoints;
+		if self._nPoints < index2:
+			index1 -= self._nPoints;
+			index2 -= self._nPoints;
+		index1 = max(index1, index2 - self._nPoints);
 		return [int(index1), int(index2)]
 
 
@@ -160,6 +197,47 @@ class GeometricRadar(Radar):
 		return self.scan_obstacles_list(center, self._env.dynamic_obstacles)
 
 
+	## Produces the combined, dynamic-only, and static-only radar scans
+	# in a single pass, along with the nearest dynamic obstacle on each
+	# beam.
+	#
+	# @param center (numpy array)
+	# <br>	Format `[x, y]`
+	# <br>	-- The center point of the scan
+	#
+	# @returns (tuple)
+	# <br>	Format: `(radar_data, dynamic_radar_data, static_radar_data, dynobs_ids)`
+	# <br>	-- The first three values are radar data, as returned by
+	# 	`scan()`, `scan_dynamic_obstacles()`, and a scan of only the
+	# 	static obstacles. `dynobs_ids[i]` is the index in
+	# 	`get_dynobs_list()` of the nearest dynamic obstacle along beam
+	# 	`i`, or -1 if the beam hits no dynamic obstacle.
+	#
+	def scan_full(self, center):
+		return self.scan_full_obstacles_lists(center, self._env.dynamic_obstacles, self._env.static_obstacles)
+
+
+	## Same as `scan_full()`, but for the given lists of dynamic and
+	# static obstacles. The returned `dynobs_ids` index into
+	# `dynobs_list`.
+	#
+	def scan_full_obstacles_lists(self, center, dynobs_list, staticobs_list):
+		dyn_dists, dyn_ids = self._packed_beam_distances(center, self._pack_dynamic(dynobs_list))
+
+		dynamic_radar_data = np.full([self._nPoints], self.radius, dtype=np.float64);
+		dynobs_ids = np.full([self._nPoints], -1, dtype=np.intp)
+		if 0 < dyn_dists.shape[0]:
+			nearest = np.argmin(dyn_dists, axis=0)
+			nearest_dists = dyn_dists[nearest, np.arange(self._nPoints)]
+			hit = np.isfinite(nearest_dists)
+			dynobs_ids[hit] = dyn_ids[nearest[hit]]
+			dynamic_radar_data = np.minimum(dynamic_radar_data, nearest_dists)
+		static_radar_data = self._scan_static(center, staticobs_list)
+
+		radar_data = np.minimum(dynamic_radar_data, static_radar_data)
+		return radar_data, dynamic_radar_data, static_radar_data, dynobs_ids
+
+
 	## Produces a radar scan, ignoring static obstacles and including
 	# only dynamic obstacles.
 	#
@@ -268,6 +346,9 @@ class GeometricRadar(Radar):
 	# 	equal to `floor(360/degree_step)`.
 	#
 	def scan_obstacles_list(self, center, obs_list):
+		if self.use_vectorized_scan:
+			return self._scan_packed(center, self._pack_dynamic(obs_list))
+
 		beams = self._beams
 		radar_data = np.full([self._nPoints], self.radius, dtype=np.float64);
 
@@ -282,6 +363,229 @@ class GeometricRadar(Radar):
 		return radar_data;
 
 
+	## Produces a radar scan from each of several center points, including
+	# only obstacles in `obs_list`. The obstacles are packed once, and the
+	# scans are computed together: each center is paired with the
+	# obstacles near it, and the distances for all of the pairs are found
+	# in the same batched operations (see
+	# `PackedObstacles.pair_beam_distances()`).
+	#
+	# @param centers (numpy array)
+	# <br>	Format `[[x1, y1], ..., [xn, yn]]`
+	# <br>	-- The center points of the scans
+	#
+	# @param obs_list (list of DynamicObstacle)
+	# <br>  -- The list of obstacles to include in the scans
+	#
+	# @returns (numpy array)
+	# <br>	Format: `(num_centers, data_size)`
+	# <br>	-- Row `i` is the radar data for `centers[i]`, in the same
+	# 	format as `scan_obstacles_list()`.
+	#
+	def scan_obstacles_list_many(self, centers, obs_list):
+		centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+		radar_data = np.empty([centers.shape[0], self._nPoints], dtype=np.float64)
+		if not self.use_vectorized_scan:
+			for i in range(centers.shape[0]):
+				radar_data[i] = self.scan_obstacles_list(centers[i], obs_list)
+			return radar_data
+
+		packed = self._pack_dynamic(obs_list)
+		return self._scan_pairs(centers, packed, *self._near_pairs(centers, packed))
+
+
+	## Produces a radar scan, including the obstacles in `dynobs_list` and
+	# `staticobs_list`. The result is the same as
+	# `scan_obstacles_list(center, dynobs_list + staticobs_list)`, but if
+	# `staticobs_list` is the environment's list of static obstacles, only
+	# the static obstacles near `center` are checked (see
+	# `GeometricEnvironment.get_static_index()`).
+	#
+	def scan_obstacles_lists(self, center, dynobs_list, staticobs_list):
+		if not self.use_vectorized_scan:
+			return self.scan_obstacles_list(center, list(dynobs_list) + list(staticobs_list))
+		return np.minimum(self._scan_packed(center, self._pack_dynamic(dynobs_list)), self._scan_static(center, staticobs_list))
+
+
+	## Same as `scan_obstacles_lists()`, but scans from each of several
+	# center points, as in `scan_obstacles_list_many()`.
+	#
+	def scan_obstacles_lists_many(self, centers, dynobs_list, staticobs_list):
+		centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+		if not self.use_vectorized_scan:
+			return self.scan_obstacles_list_many(centers, list(dynobs_list) + list(staticobs_list))
+
+		packed = self._pack_dynamic(dynobs_list)
+		return np.minimum(self._scan_pairs(centers, packed, *self._near_pairs(centers, packed)), self._scan_static_many(centers, staticobs_list))
+
+
+	## Produces a radar scan against a set of packed obstacles, computing
+	# all beams against all obstacles at once.
+	#
+	# @param center (numpy array)
+	# <br>	Format `[x, y]`
+	# <br>	-- The center point of the scan
+	#
+	# @param packed (PackedObstacles object)
+	# <br>	-- The obstacles to include in the scan
+	#
+	# @param candidates (numpy array of int)
+	# <br>	-- Optional indices of the packed obstacles to consider. If
+	# 	not given, all of them are considered.
+	#
+	# @returns (numpy array)
+	# <br>	-- Radar data, in the same format as `scan_obstacles_list()`
+	#
+	def _scan_packed(self, center, packed, candidates=None):
+		dists, _ = self._packed_beam_distances(center, packed, candidates)
+		radar_data = np.full([self._nPoints], self.radius, dtype=np.float64);
+		if dists.shape[0] == 0:
+			return radar_data
+		return np.minimum(radar_data, np.min(dists, axis=0))
+
+
+	## Same as `_scan_packed()`, but scans from each of several centers.
+	# The scans are given as pairs of a center and an obstacle to check
+	# from it (see `_near_pairs()`), which are computed in chunks of
+	# `_PAIR_CHUNK_SIZE`.
+	#
+	# @param pair_centers (numpy array of int)
+	# <br>	-- The index in `centers` of each pair, in increasing order
+	#
+	# @param pair_obs (numpy array of int)
+	# <br>	-- The index in `packed` of each pair
+	#
+	# @returns (numpy array)
+	# <br>	Format: `(num_centers, data_size)`
+	#
+	def _scan_pairs(self, centers, packed, pair_centers, pair_obs):
+		radar_data = np.full([centers.shape[0], self._nPoints], self.radius, dtype=np.float64)
+		for start in range(0, len(pair_centers), _PAIR_CHUNK_SIZE):
+			chunk_centers = pair_centers[start:start+_PAIR_CHUNK_SIZE]
+			dists, keep = self._pair_beam_distances(centers[chunk_centers], packed, pair_obs[start:start+_PAIR_CHUNK_SIZE])
+			if len(keep) == 0:
+				continue
+			# Reduce each center's run of pairs to the nearest hit
+			chunk_centers = chunk_centers[keep]
+			runs = np.flatnonzero(np.r_[True, chunk_centers[1:] != chunk_centers[:-1]])
+			rows = chunk_centers[runs]
+			radar_data[rows] = np.minimum(radar_data[rows], np.minimum.reduceat(dists, runs, axis=0))
+		return radar_data
+
+
+	## Pairs each center with the packed obstacles within range of it.
+	#
+	# @returns (tuple)
+	# <br>	Format: `(pair_centers, pair_obs)`
+	# <br>	-- The index of the center and of the obstacle in each pair,
+	# 	ordered by center
+	#
+	def _near_pairs(self, centers, packed, candidates=None):
+		if candidates is None:
+			candidates = np.arange(len(packed))
+		diff = packed.bound_centers[candidates][np.newaxis, :, :] - centers[:, np.newaxis, :]
+		reach = packed.bound_radii[candidates] + self.radius
+		pair_centers, pair_obs = np.nonzero(np.einsum('mkj,mkj->mk', diff, diff) <= reach * reach)
+		return pair_centers, candidates[pair_obs]
+
+
+	## Same as `_scan_static()`, but scans from each of several centers.
+	# With the spatial index, each center is only paired with the static
+	# obstacles near it.
+	#
+	def _scan_static_many(self, centers, staticobs_list):
+		get_static_index = getattr(self._env, 'get_static_index', None)
+		if get_static_index is None or staticobs_list is not self._env.static_obstacles:
+			packed = PackedObstacles(staticobs_list)
+			return self._scan_pairs(centers, packed, *self._near_pairs(centers, packed))
+
+		index = get_static_index()
+		pair_centers = []
+		pair_obs = []
+		for i in range(centers.shape[0]):
+			candidates = index.obstacle_ids_near(centers[i], self.radius)
+			candidates = candidates[index.packed.near_mask(centers[i], self.radius, candidates)]
+			pair_centers.append(np.full(len(candidates), i, dtype=np.intp))
+			pair_obs.append(candidates)
+		if centers.shape[0] == 0:
+			return np.zeros([0, self._nPoints], dtype=np.float64)
+		return self._scan_pairs(centers, index.packed, np.concatenate(pair_centers), np.concatenate(pair_obs))
+
+
+	## Packs the given obstacles, reusing the environment's packing of its
+	# dynamic obstacles (see `GeometricEnvironment.get_dynamic_packed()`)
+	# when `obs_list` is that list.
+	#
+	# @returns (`PackedObstacles` object)
+	#
+	def _pack_dynamic(self, obs_list):
+		get_dynamic_packed = getattr(self._env, 'get_dynamic_packed', None)
+		if get_dynamic_packed is None or obs_list is not self._env.dynamic_obstacles:
+			return PackedObstacles(obs_list)
+		return get_dynamic_packed()
+
+
+	## Scans the given static obstacles, using the environment's spatial
+	# index when `staticobs_list` is the list it was built from.
+	#
+	def _scan_static(self, center, staticobs_list):
+		get_static_index = getattr(self._env, 'get_static_index', None)
+		if get_static_index is None or staticobs_list is not self._env.static_obstacles:
+			return self._scan_packed(center, PackedObstacles(staticobs_list))
+
+		index = get_static_index()
+		return self._scan_packed(center, index.packed, index.obstacle_ids_near(center, self.radius))
+
+
+	## Gets the matrix of distances along each beam to the packed
+	# obstacles that are within range. Like the per-beam backend (see
+	# `_get_obs_data_index_range()`), each obstacle is only checked
+	# against the beams in its angular shadow, which here is the shadow
+	# of its bounding circle, found for all of the obstacles at once.
+	#
+	# @returns (tuple)
+	# <br>	Format: `(dists, obs_ids)`
+	# <br>	-- `dists` has shape `(len(obs_ids), num_beams)`, and row
+	# 	`k` holds the distances to obstacle `obs_ids[k]`.
+	#
+	def _packed_beam_distances(self, center, packed, candidates=None):
+		center = np.asarray(center, dtype=np.float64)
+		if candidates is None:
+			candidates = np.arange(len(packed))
+		obs_ids = candidates[packed.near_mask(center, self.radius, candidates)]
+		dists, keep = self._pair_beam_distances(np.broadcast_to(center, (len(obs_ids), 2)), packed, obs_ids)
+		return dists, obs_ids[keep]
+
+
+	## Same as `_packed_beam_distances()`, but for pairs of a center and a
+	# packed obstacle (see `PackedObstacles.pair_beam_distances()`).
+	# Pairs with no beams in the obstacle's shadow are dropped.
+	#
+	# @returns (tuple)
+	# <br>	Format: `(dists, keep)`
+	# <br>	-- `dists` has shape `(len(keep), num_beams)`, and row `k`
+	# 	holds the distances for pair `keep[k]`.
+	#
+	def _pair_beam_distances(self, centers, packed, obs_ids):
+		# A beam is in the shadow of a bounding circle at distance d
+		# with radius r if its angle to the circle's center is at most
+		# asin(r/d), i.e., if the projection of the center onto the
+		# beam is at least sqrt(d^2 - r^2). A small slack keeps beams
+		# that only graze the circle.
+		rel = packed.bound_centers[obs_ids] - centers
+		dist_sq = np.einsum('ij,ij->i', rel, rel)
+		radii_sq = packed.bound_radii[obs_ids] ** 2
+		min_proj = np.sqrt(np.maximum(dist_sq - radii_sq, 0)) - 1e-6
+		beam_mask = (np.dot(rel, self._beam_dirs.T) >= min_proj[:, np.newaxis]) | (dist_sq <= radii_sq)[:, np.newaxis]
+
+		keep = np.flatnonzero(np.any(beam_mask, axis=1))
+		beam_mask = beam_mask[keep]
+
+		dists = packed.pair_beam_distances(centers[keep], self._beams, obs_ids[keep])
+		dists[~beam_mask] = np.inf
+		return dists, keep
+
+
 	## Gets the distance to the given obstacle along the given line segment
 	# (i.e., the distance from the first endpoint of the segment to the
 	# intersection of the line and the obstacle). Returns float('inf') if
@@ -281,6 +281,48 @@ def point_inside_rectangle(rect, point):
 	return rect[0][0] <= point[0] and point[0] <= (rect[0][0] + rect[1][0]) and rect[0][1] <= point[1] and point[1] <= (rect[0][1] + rect[1][1]);
 
 
+## Clips a line segment to the given circle.
+# 
+# 
+# @param line (list of numpy array)
+# <br>	Format: `[[x1, y1], [x2, y2]]`
+# <br>	-- the segment
+# 
+# @param circle_center (numpy array)
+# <br>	Format: `[x, y]`
+# <br>	-- the center of the circle
+# 
+# @param circle_radius (float)
+# <br>	-- the radius of the circle
+# 
+# 
+# @returns (list of numpy array)
+# <br>	Format: `[[x1, y1], [x2, y2]]`
+# <br>	-- the part of the segment inside the circle, or `None` if
+# 	the segment does not pass through the circle
+#
+def clip_line_to_circle(line, circle_center, circle_radius):
+	p1 = np.asarray(line[0], dtype=np.float64)
+	vec = np.asarray(line[1], dtype=np.float64) - p1
+	rel = p1 - np.asarray(circle_center, dtype=np.float64)
+
+	# Solve |rel + t*vec| = radius for t
+	a = np.dot(vec, vec)
+	b = np.dot(rel, vec)
+	c = np.dot(rel, rel) - circle_radius * circle_radius
+	if a == 0:
+		return [p1, p1.copy()] if c < 0 else None
+	disc = b*b - a*c
+	if disc <= 0:
+		return None
+	sqrt_disc = np.sqrt(disc)
+	t1 = max(0.0, (-b - sqrt_disc) / a)
+	t2 = min(1.0, (-b + sqrt_disc) / a)
+	if t2 < t1:
+		return None
+	return [p1 + t1 * vec, p1 + t2 * vec]
+
+
 ## Gets the angle range of the "shadow" of the given circle with
 # respect to the given point. The shadow can be thought of in the following
 # way: Imagine the point as a light source and the circle as an opaque
@@ -4,12 +4,17 @@
 #
 
 import numpy  as np
-import pygame as PG
-import DrawTool
 from  DynamicObstacles import DynamicObstacle
 import sys
 import Vector
 import MapModifier
+import MapImage
+import MapCache
+import ObstacleStore
+import GridTraversal
+import Rasterizer
+from OccupancyPyramid import OccupancyPyramid
+from SpatialIndex import _bounding_box, _bounding_boxes
 from Environment import ObsFlag, Environment
 
 
@@ -18,11 +23,37 @@ from Environment import ObsFlag, Environment
 #
 class GridDataEnvironment(Environment):
 
-	def __init__(self, width, height, map_filename, cmdargs=None):
+	## Constructor
+	#
+	# @param rasterize_obstacles (bool)
+	# <br>	-- How the dynamic obstacles are put into `grid_data` each
+	# 	step. If true, their shapes are stamped directly into the
+	# 	grid (see `Rasterizer`). If false, the scene is drawn onto a
+	# 	pygame surface and the obstacles are found by their color
+	# 	(see `update_grid_data_from_display()`).
+	#
+	# @param map_cache (`MapCache` object)
+	# <br>	-- Where to cache the static layers of the map, so that
+	# 	later runs on the same map load them instead of decoding and
+	# 	processing the image again. Defaults to
+	# 	`MapCache.get_default_cache()`; pass `False` to disable
+	# 	caching.
+	#
+	def __init__(self, width, height, map_filename, cmdargs=None, rasterize_obstacles=True, map_cache=None):
 		self.cmdargs = cmdargs
+		self.rasterize_obstacles = rasterize_obstacles
+		if map_cache is None:
+			map_cache = MapCache.get_default_cache()
+		elif map_cache is False:
+			map_cache = None
 		self.width = width
 		self.height = height
 		super().__init__(width, height, map_filename, cmdargs=cmdargs)
+
+		# Occupancy grids (grid_data, static_overlay, and the grids
+		# derived from them) hold one byte per cell: the ObsFlag bits
+		# of whatever occupies it. The compiled radar reads them as
+		# unsigned char.
 		self.grid_data = np.zeros((self.width, self.height), dtype=np.uint8)
 		self.dynamic_obstacles = []
 
@@ -39,28 +70,124 @@ class GridDataEnvironment(Environment):
 		# dynamic obstacles
 		self.load_map(map_filename)
 
-		# Create static overlay (BEFORE applying map modifier)
-		pix_arr = PG.surfarray.pixels2d(self.static_base_image.copy())
-		pixel_mask = 0b11111100;
-		masked_pix_arr = np.bitwise_and(pix_arr, np.array([pixel_mask], dtype='uint8'));
-		grid_data_width = max(self.width, masked_pix_arr.shape[0]);
-		grid_data_height = max(self.height, masked_pix_arr.shape[1]);
-		self.static_overlay = np.zeros((grid_data_width, grid_data_height), dtype=int);
-		obstacle_pixel_val = 0x555555 & pixel_mask # (85, 85, 85) represented as integer
-		self.static_overlay[masked_pix_arr == obstacle_pixel_val] |= (ObsFlag.STATIC_OBSTACLE | ObsFlag.ANY_OBSTACLE);
-		del pix_arr
+		# Create the static overlay (BEFORE applying map modifier) and
+		# its distance field, or load them from the cache
+		if map_cache is None:
+			static_layers = self._compute_static_layers()
+		else:
+			static_layers = map_cache.get(map_filename, 'static_layers', (self.width, self.height), self._compute_static_layers)
+		self.static_overlay = static_layers['static_overlay']
+
+		# Distance from each cell to the nearest static obstacle, for
+		# GridDataRadar's 'distance_field' scan mode
+		self.static_distance_field = static_layers['static_distance_field']
 
 		if (cmdargs):
 			self.apply_map_modifier_by_number(self.cmdargs.map_modifier_num)
 
 		# Initialize the grid data
-		self._grid_data_display = PG.Surface((self.width, self.height))
+		self.occupancy_pyramid = None
+		self.dirty_rects = []
+		self._obstacle_footprints = None
+		self._grid_data_display = None
 		self._update_grid_data();
 
 
+	## Computes the layers of the grid that come from the static map.
+	#
+	# @returns (dict)
+	# <br>	-- `'static_overlay'` holds the flags of the static obstacle
+	# 	cells, found by their color in the map image, and
+	# 	`'static_distance_field'` the distance from each cell to the
+	# 	nearest of them.
+	#
+	def _compute_static_layers(self):
+		# Use the pixels packed as 0xAARRGGBB integers
+		rgba = self.static_map_pixels.astype(np.uint32)
+		pix_arr = (rgba[:, :, 3] << 24) | (rgba[:, :, 0] << 16) | (rgba[:, :, 1] << 8) | rgba[:, :, 2]
+		pixel_mask = 0b11111100;
+		masked_pix_arr = np.bitwise_and(pix_arr, np.array([pixel_mask], dtype='uint8'));
+		grid_data_width = max(self.width, masked_pix_arr.shape[0]);
+		grid_data_height = max(self.height, masked_pix_arr.shape[1]);
+		static_overlay = np.zeros((grid_data_width, grid_data_height), dtype=np.uint8);
+		obstacle_pixel_val = 0x555555 & pixel_mask # (85, 85, 85) represented as integer
+		static_overlay[masked_pix_arr == obstacle_pixel_val] |= (ObsFlag.STATIC_OBSTACLE | ObsFlag.ANY_OBSTACLE);
+		del pix_arr, rgba
+
+		return {
+			'static_overlay': static_overlay,
+			'static_distance_field': GridTraversal.static_distance_field(static_overlay != 0),
+		}
+
+
 	def _update_grid_data(self):
-		self.update_display(DrawTool.PygameDrawTool(self._grid_data_display));
-		self.update_grid_data_from_display(self._grid_data_display);
+		dirty_rects = self._find_dirty_rects()
+		if self.rasterize_obstacles:
+			self.update_grid_data_from_obstacles(dirty_rects);
+		else:
+			import pygame as PG
+			import DrawTool
+			if self._grid_data_display is None:
+				self._grid_data_display = PG.Surface((self.width, self.height))
+			self.update_display(DrawTool.PygameDrawTool(self._grid_data_display));
+			self.update_grid_data_from_display(self._grid_data_display);
+		self.dirty_rects = dirty_rects
+
+		if self.occupancy_pyramid is None:
+			self.occupancy_pyramid = OccupancyPyramid(self.grid_data)
+		else:
+			self.occupancy_pyramid.update(dirty_rects, grid_data=self.grid_data)
+
+
+	## Gets the regions of the grid that changed in the last grid update.
+	#
+	# Cells outside these regions are the same as before the update, so
+	# anything derived from the grid (e.g., an `OccupancyPyramid` or cached
+	# radar scans) only needs to be recomputed where it overlaps them.
+	#
+	# @returns (list of tuple)
+	# <br>	Format: `[(x0, y0, x1, y1), ...]`
+	# <br>	-- Each region covers the cells `x0 <= x < x1` and
+	# 	`y0 <= y < y1`, and may extend past the edges of the grid. After
+	# 	the first update, this is one region covering the whole grid.
+	#
+	def get_dirty_rects(self):
+		return self.dirty_rects
+
+
+	## Finds the regions of the grid that may change in the next grid
+	# update, and remembers the current obstacle footprints for the update
+	# after that.
+	#
+	# Each dynamic obstacle that moved (or changed shape) since the last
+	# update dirties the region it covered before and the region it covers
+	# now. Obstacles that did not move add nothing.
+	#
+	# @returns (list of tuple)
+	# <br>	Format: `[(x0, y0, x1, y1), ...]`
+	#
+	def _find_dirty_rects(self):
+		old_footprints = self._obstacle_footprints
+		footprints = {id(obs): (obs, signature) for obs, signature in zip(self.dynamic_obstacles, _obstacle_signatures(self.dynamic_obstacles))}
+		self._obstacle_footprints = footprints
+		return self._changed_footprint_rects(old_footprints, footprints)
+
+
+	## Gets the regions covered by the obstacle footprints that differ
+	# between two sets of footprints (see `_find_dirty_rects()`).
+	#
+	def _changed_footprint_rects(self, old_footprints, footprints):
+		if old_footprints is None or footprints is None:
+			return [(0, 0, self.static_overlay.shape[0], self.static_overlay.shape[1])]
+
+		dirty_rects = []
+		for key, (obs, signature) in old_footprints.items():
+			if key not in footprints or footprints[key][1] != signature:
+				dirty_rects.append(signature[0])
+		for key, (obs, signature) in footprints.items():
+			if key not in old_footprints or old_footprints[key][1] != signature:
+				dirty_rects.append(signature[0])
+		return dirty_rects
 
 
 	def _init_map_modifiers(self):
@@ -79,9 +206,47 @@ class GridDataEnvironment(Environment):
 		self.map_modifiers.append(MapModifier._map_mod_obsmat);
 
 
+	## Loads the static map. The image is only decoded when
+	# `static_map_pixels` is first used, and is decoded straight into an
+	# array (see `MapImage`), so no display is needed; the pygame image
+	# used for drawing is likewise only loaded when it is first used (see
+	# `static_base_image`).
+	#
+	# @param map_filename (string)
+	#
 	def load_map(self, map_filename):
-		image = PG.image.load(map_filename).convert_alpha();
-		self.static_base_image = image;
+		self.map_filename = map_filename
+		self._static_map_pixels = None
+		self._static_base_image = None
+
+
+	## The RGBA values of the static map's pixels (see
+	# `MapImage.load_image()`).
+	#
+	@property
+	def static_map_pixels(self):
+		if self._static_map_pixels is None:
+			self._static_map_pixels = MapImage.load_image(self.map_filename);
+		return self._static_map_pixels
+
+	@static_map_pixels.setter
+	def static_map_pixels(self, pixels):
+		self._static_map_pixels = pixels
+
+
+	## The static map as a pygame image, for drawing. Loading it imports
+	# pygame and requires an initialized display mode.
+	#
+	@property
+	def static_base_image(self):
+		if self._static_base_image is None:
+			import pygame as PG
+			self._static_base_image = PG.image.load(self.map_filename).convert_alpha();
+		return self._static_base_image
+
+	@static_base_image.setter
+	def static_base_image(self, image):
+		self._static_base_image = image
 
 
 	## Draws the environment onto the given display.
@@ -110,6 +275,57 @@ class GridDataEnvironment(Environment):
 				dtool.draw_poly(i.polygon.get_vertices())
 
 
+	## Update the grid data from the shapes of the dynamic obstacles.
+	#
+	# Each dynamic obstacle is stamped into the cells it covers, on top of
+	# the static map from `static_overlay`. Unlike
+	# `update_grid_data_from_display()`, nothing is drawn, so this only
+	# touches the cells near the obstacles.
+	#
+	# @param dirty_rects (list of tuple)
+	# <br>	Format: `[(x0, y0, x1, y1), ...]`
+	# <br>	-- The regions that changed since the last update (see
+	# 	`get_dirty_rects()`). Only these regions are restored from
+	# 	the static map, and only the obstacles overlapping them are
+	# 	stamped again, so `grid_data` is updated in place at a cost
+	# 	that depends on the number of moving obstacles rather than on
+	# 	the size of the map. If None, the whole grid is rebuilt.
+	#
+	def update_grid_data_from_obstacles(self, dirty_rects=None):
+		self.needs_grid_data_update = False
+		obstacle_flags = ObsFlag.DYNAMIC_OBSTACLE | ObsFlag.ANY_OBSTACLE
+
+		grid_data = self.grid_data
+		if dirty_rects is None or grid_data.shape != self.static_overlay.shape or grid_data.dtype != self.static_overlay.dtype:
+			grid_data = np.array(self.static_overlay);
+			for obs in self.dynamic_obstacles:
+				Rasterizer.stamp_obstacle(grid_data, obs, obstacle_flags);
+			self.grid_data = grid_data
+			return
+
+		width, height = grid_data.shape
+		clipped = []
+		for rect in dirty_rects:
+			x0 = max(0, int(np.floor(rect[0])))
+			y0 = max(0, int(np.floor(rect[1])))
+			x1 = min(width, int(np.ceil(rect[2])))
+			y1 = min(height, int(np.ceil(rect[3])))
+			if x0 < x1 and y0 < y1:
+				grid_data[x0:x1, y0:y1] = self.static_overlay[x0:x1, y0:y1]
+				clipped.append((x0, y0, x1, y1))
+		if len(clipped) == 0:
+			return
+
+		# Restoring a region may have erased parts of obstacles that
+		# did not move, so stamp every obstacle overlapping one again
+		clipped = np.array(clipped)
+		boxes = _bounding_boxes(self.dynamic_obstacles)
+		overlaps = ((clipped[:, 0] <= boxes[:, 2:3]) & (boxes[:, 0:1] < clipped[:, 2])
+			& (clipped[:, 1] <= boxes[:, 3:4]) & (boxes[:, 1:2] < clipped[:, 3]))
+		for i in np.flatnonzero(np.any(overlaps, axis=1)):
+			Rasterizer.stamp_obstacle(grid_data, self.dynamic_obstacles[i], obstacle_flags);
+
+
 	## Update the grid data from the given display.
 	#
 	# This method uses a `pygame.Surface` to construct an occupancy
@@ -130,6 +346,7 @@ class GridDataEnvironment(Environment):
 		# potentially wasting some memory compared to using a nested for loop. It is
 		# written this way intentionally to improve computation time (>1000%)
 
+		import pygame as PG
 		pix_arr = PG.surfarray.pixels2d(display)
 
 		# Mask pixel data to account for small errors in color
@@ -156,12 +373,49 @@ class GridDataEnvironment(Environment):
 	## Step the environment, updating dynamic obstacles and grid data.
 	#
 	def next_step(self, timestep=1):
+		self._step_num += 1
+		self._state_version += 1
 		if self.needs_grid_data_update:
 			self._update_grid_data();
 		self._update_dynamic_obstacles(timestep);
 		self.needs_grid_data_update = True
 
 
+	## Captures the state of the environment (see
+	# `Environment.snapshot()`), including the grid. The static layers
+	# are shared rather than copied.
+	#
+	def snapshot(self):
+		snapshot = super().snapshot()
+		snapshot.grid_data = np.array(self.grid_data)
+		snapshot.needs_grid_data_update = self.needs_grid_data_update
+		# Each grid update replaces these rather than changing them,
+		# so they can be shared
+		snapshot.obstacle_footprints = self._obstacle_footprints
+		snapshot.dirty_rects = self.dirty_rects
+		return snapshot
+
+
+	## Puts the environment back into the state captured by
+	# `snapshot()`. The grid is restored in place, and the occupancy
+	# pyramid is only updated where obstacle footprints differ between
+	# the current grid and the snapshot's.
+	#
+	def restore(self, snapshot):
+		super().restore(snapshot)
+
+		changed_rects = self._changed_footprint_rects(self._obstacle_footprints, snapshot.obstacle_footprints)
+		if self.grid_data.shape == snapshot.grid_data.shape and self.grid_data.dtype == snapshot.grid_data.dtype:
+			np.copyto(self.grid_data, snapshot.grid_data)
+		else:
+			self.grid_data = np.array(snapshot.grid_data)
+		self.needs_grid_data_update = snapshot.needs_grid_data_update
+		self._obstacle_footprints = snapshot.obstacle_footprints
+		self.dirty_rects = snapshot.dirty_rects
+		if self.occupancy_pyramid is not None:
+			self.occupancy_pyramid.update(changed_rects, grid_data=self.grid_data)
+
+
 	## Checks what kind of obstacle the given point is
 	# 
 	# @param location (numpy array)
@@ -169,4 +423,106 @@ class GridDataEnvironment(Environment):
 	# <br>  -- Location to check
 	#
 	def get_obsflags(self, location):
-		return self.grid_data[int(location[0])][int(location[1])]
+		return int(self.grid_data[int(location[0])][int(location[1])])
+
+
+	## Checks what kind of obstacle each of the given points is, with one
+	# lookup into `grid_data`.
+	#
+	# @param points (numpy array)
+	# <br>	Format: `[[x1, y1], ..., [xn, yn]]`
+	# <br>	-- Locations to check (must be inside the grid)
+	#
+	# @param flag_types (int)
+	# <br>	-- The `ObsFlag` bits to check for
+	#
+	# @returns (numpy array)
+	# <br>	-- The flags at each point (only those in `flag_types`)
+	#
+	def get_obsflags_many(self, points, flag_types=0xFFFFFFFF):
+		points = np.asarray(points).reshape(-1, 2).astype(int)
+		return self.grid_data[points[:, 0], points[:, 1]].astype(int) & flag_types
+
+
+	## Checks which of several line segments touch any grid cell with the
+	# given flags. Every cell that a segment passes through (or comes
+	# within `inflate_radius` of) is checked, so thin obstacles are never
+	# skipped. Cells outside the grid are treated as empty.
+	#
+	# @param starts (numpy array)
+	# <br>	Format: `[[x1, y1], ..., [xn, yn]]`
+	#
+	# @param ends (numpy array)
+	# <br>	Format: `[[x1, y1], ..., [xn, yn]]`
+	#
+	# @param flags (int)
+	# <br>	-- The `ObsFlag` bits to check for
+	#
+	# @param inflate_radius (float)
+	# <br>	-- If positive, the segments are swept by a disk of this
+	# 	radius, so cells within this distance of a segment are
+	# 	checked too
+	#
+	# @returns (numpy array of bool)
+	#
+	def segments_collide(self, starts, ends, flags=ObsFlag.ANY_OBSTACLE, inflate_radius=0):
+		starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+		ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+		width, height = self.grid_data.shape
+		out = np.zeros(len(starts), dtype=bool)
+		for i in range(len(starts)):
+			xs, ys = GridTraversal.segment_band_cells(starts[i], ends[i], inflate_radius)
+			inside = (0 <= xs) & (xs < width) & (0 <= ys) & (ys < height)
+			out[i] = np.any(self.grid_data[xs[inside], ys[inside]] & flags)
+		return out
+
+
+## Gets the region an obstacle covers in the grid, along with anything else
+# that affects which cells it covers, so that two signatures are equal only if
+# the obstacle would be stamped the same way.
+#
+# @returns (tuple)
+# <br>	Format: `((x0, y0, x1, y1), ...)`
+# <br>	-- The first element is the obstacle's bounding box, padded by a
+# 	few cells to allow for rounding when it is drawn.
+#
+def _obstacle_signature(obs):
+	pad = 3
+	box = _bounding_box(obs)
+	rect = (box[0] - pad, box[1] - pad, box[2] + pad, box[3] + pad)
+	if obs.shape == 3:
+		# Ellipses are turned to face the way they move
+		vec = obs.get_velocity_vector()
+		return (rect, obs.width, obs.height, float(vec[0]), float(vec[1]))
+	if obs.shape == 4:
+		return (rect, np.asarray(obs.polygon.get_vertices(), dtype=np.float64).tobytes())
+	return (rect, obs.shape)
+
+
+## Same as `_obstacle_signature()`, for each obstacle in a list. The
+# signatures of obstacles in an `ObstacleStore` are computed from its arrays.
+#
+# @returns (list of tuple)
+#
+def _obstacle_signatures(obs_list):
+	pad = 3
+	store, store_rows = ObstacleStore.get_store_rows(obs_list)
+	from_store = store_rows >= 0
+	if store is None:
+		return [_obstacle_signature(obs) for obs in obs_list]
+
+	signatures = [None] * len(obs_list)
+	rows = store_rows[from_store]
+	rects = (store.get_bounding_boxes(rows) + (-pad, -pad, pad, pad)).tolist()
+	shapes = store.shapes[rows].tolist()
+	widths = store.widths[rows].tolist()
+	heights = store.heights[rows].tolist()
+	velocities = store.get_velocities(rows).tolist()
+	for k, i in enumerate(np.flatnonzero(from_store)):
+		if shapes[k] == 3:
+			signatures[i] = (tuple(rects[k]), widths[k], heights[k], velocities[k][0], velocities[k][1])
+		else:
+			signatures[i] = (tuple(rects[k]), shapes[k])
+	for i in np.flatnonzero(~from_store):
+		signatures[i] = _obstacle_signature(obs_list[i])
+	return signatures
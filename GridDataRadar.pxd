@@ -7,11 +7,11 @@
 
 cimport numpy as np
 
-cdef extern from "c_src/_GridDataRadar.h":
+cdef extern from "c_src/_GridDataRadar.h" nogil:
 	cdef void _c_scan_generic(double centerx,
 		double centery,
 		double radius,
-		long * grid_data,
+		const unsigned char * grid_data,
 		int grid_data_width,
 		int grid_data_height,
 		int cell_type_flags,
@@ -24,20 +24,207 @@ cdef extern from "c_src/_GridDataRadar.h":
 cdef inline void scan_generic(double centerx,
 	double centery,
 	double radius,
-	np.ndarray[long, ndim=2, mode="c"] grid_data,
+	np.ndarray[np.uint8_t, ndim=2, mode="c"] grid_data,
 	int cell_type_flags,
 	double resolution,
 	double degreeStep,
 	np.ndarray[double] out_data):
 
-	_c_scan_generic(float(centerx),
-		float(centery),
-		float(radius),
-		<long *> np.PyArray_DATA(grid_data),
-		int(grid_data.shape[0]),
-		int(grid_data.shape[1]),
-		int(cell_type_flags),
-		resolution,
-		int(degreeStep),
-		<double *> np.PyArray_DATA(out_data),
-		int(out_data.shape[0]));
+	cdef unsigned char * grid_data_ptr = <unsigned char *> np.PyArray_DATA(grid_data)
+	cdef double * out_data_ptr = <double *> np.PyArray_DATA(out_data)
+	# The kernels only touch the arrays passed in, so other
+	# Python threads can run while they do
+	with nogil:
+		_c_scan_generic(float(centerx),
+			float(centery),
+			float(radius),
+			grid_data_ptr,
+			int(grid_data.shape[0]),
+			int(grid_data.shape[1]),
+			int(cell_type_flags),
+			resolution,
+			<int> degreeStep,
+			out_data_ptr,
+			int(out_data.shape[0]));
+
+cdef extern from "c_src/_GridDataRadar.h" nogil:
+	cdef void _c_scan_full(double centerx,
+		double centery,
+		double radius,
+		const unsigned char * grid_data,
+		int grid_data_width,
+		int grid_data_height,
+		int any_flag,
+		int dynamic_flag,
+		int static_flag,
+		double resolution,
+		double degreeStep,
+		double * out_all,
+		double * out_dynamic,
+		double * out_static,
+		int out_data_size
+	);
+
+cdef inline void scan_full_generic(double centerx,
+	double centery,
+	double radius,
+	np.ndarray[np.uint8_t, ndim=2, mode="c"] grid_data,
+	int any_flag,
+	int dynamic_flag,
+	int static_flag,
+	double resolution,
+	double degreeStep,
+	np.ndarray[double] out_all,
+	np.ndarray[double] out_dynamic,
+	np.ndarray[double] out_static):
+
+	cdef unsigned char * grid_data_ptr = <unsigned char *> np.PyArray_DATA(grid_data)
+	cdef double * out_all_ptr = <double *> np.PyArray_DATA(out_all)
+	cdef double * out_dynamic_ptr = <double *> np.PyArray_DATA(out_dynamic)
+	cdef double * out_static_ptr = <double *> np.PyArray_DATA(out_static)
+	with nogil:
+		_c_scan_full(float(centerx),
+			float(centery),
+			float(radius),
+			grid_data_ptr,
+			int(grid_data.shape[0]),
+			int(grid_data.shape[1]),
+			int(any_flag),
+			int(dynamic_flag),
+			int(static_flag),
+			resolution,
+			<int> degreeStep,
+			out_all_ptr,
+			out_dynamic_ptr,
+			out_static_ptr,
+			int(out_all.shape[0]));
+
+cdef extern from "c_src/_GridDataRadar.h" nogil:
+	cdef void _c_scan_dda(double centerx,
+		double centery,
+		double radius,
+		const unsigned char * grid_data,
+		int grid_data_width,
+		int grid_data_height,
+		const int * cell_type_flags,
+		int num_flags,
+		double degreeStep,
+		double * out_data,
+		int out_data_size
+	);
+
+cdef inline void scan_dda(double centerx,
+	double centery,
+	double radius,
+	np.ndarray[np.uint8_t, ndim=2, mode="c"] grid_data,
+	np.ndarray[int, ndim=1, mode="c"] cell_type_flags,
+	double degreeStep,
+	np.ndarray[double, ndim=2, mode="c"] out_data):
+
+	cdef unsigned char * grid_data_ptr = <unsigned char *> np.PyArray_DATA(grid_data)
+	cdef int * cell_type_flags_ptr = <int *> np.PyArray_DATA(cell_type_flags)
+	cdef double * out_data_ptr = <double *> np.PyArray_DATA(out_data)
+	with nogil:
+		_c_scan_dda(float(centerx),
+			float(centery),
+			float(radius),
+			grid_data_ptr,
+			int(grid_data.shape[0]),
+			int(grid_data.shape[1]),
+			cell_type_flags_ptr,
+			int(cell_type_flags.shape[0]),
+			<int> degreeStep,
+			out_data_ptr,
+			int(out_data.shape[1]));
+
+cdef extern from "c_src/_GridDataRadar.h" nogil:
+	cdef void _c_scan_distance_field(double centerx,
+		double centery,
+		double radius,
+		const double * distance_field,
+		const unsigned char * grid_data,
+		int grid_data_width,
+		int grid_data_height,
+		const int * cell_type_flags,
+		int num_flags,
+		int static_flags,
+		int box_x0,
+		int box_y0,
+		int box_x1,
+		int box_y1,
+		double degreeStep,
+		double * out_data,
+		int out_data_size
+	);
+
+cdef inline void scan_distance_field(double centerx,
+	double centery,
+	double radius,
+	np.ndarray[double, ndim=2, mode="c"] distance_field,
+	np.ndarray[np.uint8_t, ndim=2, mode="c"] grid_data,
+	np.ndarray[int, ndim=1, mode="c"] cell_type_flags,
+	int static_flags,
+	np.ndarray[int, ndim=1, mode="c"] box,
+	double degreeStep,
+	np.ndarray[double, ndim=2, mode="c"] out_data):
+
+	cdef double * distance_field_ptr = <double *> np.PyArray_DATA(distance_field)
+	cdef unsigned char * grid_data_ptr = <unsigned char *> np.PyArray_DATA(grid_data)
+	cdef int * cell_type_flags_ptr = <int *> np.PyArray_DATA(cell_type_flags)
+	cdef double * out_data_ptr = <double *> np.PyArray_DATA(out_data)
+	with nogil:
+		_c_scan_distance_field(float(centerx),
+			float(centery),
+			float(radius),
+			distance_field_ptr,
+			grid_data_ptr,
+			int(grid_data.shape[0]),
+			int(grid_data.shape[1]),
+			cell_type_flags_ptr,
+			int(cell_type_flags.shape[0]),
+			static_flags,
+			box[0],
+			box[1],
+			box[2],
+			box[3],
+			<int> degreeStep,
+			out_data_ptr,
+			int(out_data.shape[1]));
+
+cdef extern from "c_src/_GridDataRadar.h" nogil:
+	cdef void _c_scan_many(const double * centers,
+		int num_centers,
+		double radius,
+		const unsigned char * grid_data,
+		int grid_data_width,
+		int grid_data_height,
+		int cell_type_flags,
+		double resolution,
+		double degreeStep,
+		double * out_data,
+		int out_data_size
+	);
+
+cdef inline void scan_many_generic(np.ndarray[double, ndim=2, mode="c"] centers,
+	double radius,
+	np.ndarray[np.uint8_t, ndim=2, mode="c"] grid_data,
+	int cell_type_flags,
+	double resolution,
+	double degreeStep,
+	np.ndarray[double, ndim=2, mode="c"] out_data):
+
+	cdef double * centers_ptr = <double *> np.PyArray_DATA(centers)
+	cdef unsigned char * grid_data_ptr = <unsigned char *> np.PyArray_DATA(grid_data)
+	cdef double * out_data_ptr = <double *> np.PyArray_DATA(out_data)
+	with nogil:
+		_c_scan_many(centers_ptr,
+			int(centers.shape[0]),
+			float(radius),
+			grid_data_ptr,
+			int(grid_data.shape[0]),
+			int(grid_data.shape[1]),
+			int(cell_type_flags),
+			resolution,
+			<int> degreeStep,
+			out_data_ptr,
+			int(out_data.shape[1]));
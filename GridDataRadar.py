@@ -11,6 +11,8 @@ import math
 import cython
 from Environment import ObsFlag
 from Radar import Radar
+import GridTraversal
+from OccupancyPyramid import OccupancyPyramid
 
 ## Produces simulated radar output for the robot
 #
@@ -64,11 +66,33 @@ class GridDataRadar(Radar):
 	# <br>	-- The increment for the scanning beam. This controls how
 	# 	many different angles are checked for obstacles.
 	#
-	def __init__(self, env, radius = 100, resolution = 4, degree_step = 1):
+	# @param scan_mode (string)
+	# <br>	-- How beams are traced through the grid. One of:
+	# <br>	`'sample'`: check one cell every `resolution` units along
+	# 	the beam. Thin obstacles can be missed.
+	# <br>	`'dda'`: visit every cell the beam passes through, exactly
+	# 	once (see `GridTraversal`). Hits are exact, and are
+	# 	reported at the distance where the beam enters the cell.
+	# <br>	`'distance_field'`: same hits as `'dda'`, but the static map
+	# 	is traced with the environment's `static_distance_field`,
+	# 	jumping over open space, and only the cells near `center`
+	# 	that differ from the environment's `static_overlay` (the
+	# 	dynamic layer) are checked one by one.
+	# <br>	`'pyramid'`: same hits as `'dda'`, but beams skip over empty
+	# 	space using the environment's `occupancy_pyramid` (see
+	# 	`OccupancyPyramid`), and only step through single cells near
+	# 	obstacles.
+	#
+	def __init__(self, env, radius = 100, resolution = 4, degree_step = 1, scan_mode = 'sample'):
 
 		self._env        = env
 		self.radius	 = radius
 		self.resolution  = resolution
+		self.scan_mode   = scan_mode
+
+		# The flags of the cells in the static map
+		self._static_flags = ObsFlag.STATIC_OBSTACLE | ObsFlag.ANY_OBSTACLE
+		self._pyramid = None
 		self.set_degree_step(degree_step);
 
 
@@ -91,6 +115,13 @@ class GridDataRadar(Radar):
 	#
 	def scan(self, center, cell_type = ObsFlag.ANY_OBSTACLE):
 
+		if self.scan_mode == 'dda':
+			return self._scan_dda(center, [cell_type])[0]
+		elif self.scan_mode == 'distance_field':
+			return self._scan_distance_field(center, [cell_type])[0]
+		elif self.scan_mode == 'pyramid':
+			return self._scan_pyramid(center, [cell_type])[0]
+
 		if cython.compiled:
 			grid_data = self._env.grid_data;
 			radar_data = np.full([self._nPoints], self.radius, dtype=np.float64);
@@ -104,29 +135,262 @@ class GridDataRadar(Radar):
 				radar_data);
 			return radar_data;
 
+		return self._scan_sample(center, [cell_type])[0]
+
+
+	## Produces the combined, dynamic-only, and static-only radar scans
+	# in a single traversal of the grid.
+	#
+	# @param center (numpy array)
+	# <br>	Format `[x, y]`
+	# <br>	-- The center point of the scan
+	#
+	# @returns (tuple)
+	# <br>	Format: `(radar_data, dynamic_radar_data, static_radar_data, dynobs_ids)`
+	# <br>	-- The first three values are the same as `scan()` with
+	# 	`cell_type` set to `ObsFlag.ANY_OBSTACLE`,
+	# 	`ObsFlag.DYNAMIC_OBSTACLE`, and `ObsFlag.STATIC_OBSTACLE`.
+	# 	The grid does not record which obstacle occupies a cell, so
+	# 	`dynobs_ids` is always `None`.
+	#
+	def scan_full(self, center):
+		if self.scan_mode == 'dda':
+			radar_data, dynamic_radar_data, static_radar_data = self._scan_dda(center, [ObsFlag.ANY_OBSTACLE, ObsFlag.DYNAMIC_OBSTACLE, ObsFlag.STATIC_OBSTACLE])
+			return radar_data, dynamic_radar_data, static_radar_data, None
+		elif self.scan_mode == 'distance_field':
+			radar_data, dynamic_radar_data, static_radar_data = self._scan_distance_field(center, [ObsFlag.ANY_OBSTACLE, ObsFlag.DYNAMIC_OBSTACLE, ObsFlag.STATIC_OBSTACLE])
+			return radar_data, dynamic_radar_data, static_radar_data, None
+		elif self.scan_mode == 'pyramid':
+			radar_data, dynamic_radar_data, static_radar_data = self._scan_pyramid(center, [ObsFlag.ANY_OBSTACLE, ObsFlag.DYNAMIC_OBSTACLE, ObsFlag.STATIC_OBSTACLE])
+			return radar_data, dynamic_radar_data, static_radar_data, None
+
+		if cython.compiled:
+			grid_data = self._env.grid_data;
+			radar_data = np.full([self._nPoints], self.radius, dtype=np.float64);
+			dynamic_radar_data = np.full([self._nPoints], self.radius, dtype=np.float64);
+			static_radar_data = np.full([self._nPoints], self.radius, dtype=np.float64);
+			scan_full_generic(center[0],
+				center[1],
+				self.radius,
+				grid_data,
+				ObsFlag.ANY_OBSTACLE,
+				ObsFlag.DYNAMIC_OBSTACLE,
+				ObsFlag.STATIC_OBSTACLE,
+				self.resolution,
+				self._degree_step,
+				radar_data,
+				dynamic_radar_data,
+				static_radar_data);
+			return radar_data, dynamic_radar_data, static_radar_data, None;
+
+		radar_data, dynamic_radar_data, static_radar_data = self._scan_sample(center, [ObsFlag.ANY_OBSTACLE, ObsFlag.DYNAMIC_OBSTACLE, ObsFlag.STATIC_OBSTACLE])
+		return radar_data, dynamic_radar_data, static_radar_data, None
+
+
+	## Produces a radar scan from each of several center points.
+	#
+	# @param centers (numpy array)
+	# <br>	Format `[[x1, y1], ..., [xn, yn]]`
+	# <br>	-- The center points of the scans
+	#
+	# @param cell_type (int)
+	# <br>	-- The `ObsFlag` bits to treat as obstacles
+	#
+	# @returns (numpy array)
+	# <br>	Format: `(num_centers, data_size)`
+	# <br>	-- Row `i` is the radar data for `centers[i]`, in the same
+	# 	format as `scan()`.
+	#
+	def scan_many(self, centers, cell_type = ObsFlag.ANY_OBSTACLE):
+		centers = np.ascontiguousarray(centers, dtype=np.float64).reshape(-1, 2)
+
+		if cython.compiled and self.scan_mode == 'sample':
+			radar_data = np.full([centers.shape[0], self._nPoints], self.radius, dtype=np.float64);
+			scan_many_generic(centers,
+				self.radius,
+				self._env.grid_data,
+				cell_type,
+				self.resolution,
+				self._degree_step,
+				radar_data);
+			return radar_data;
+
+		radar_data = np.empty([centers.shape[0], self._nPoints], dtype=np.float64)
+		for i in range(centers.shape[0]):
+			radar_data[i] = self.scan(centers[i], cell_type)
+		return radar_data
+
+
+	## Scans by checking one cell every `resolution` units along each
+	# beam, without the compiled extension. All the sample points are
+	# computed and looked up in the grid at once, and the first hit on
+	# each beam is found with `argmax`. Leaving the grid counts as a hit.
+	#
+	# @param center (numpy array)
+	# <br>	Format `[x, y]`
+	# <br>	-- The center point of the scan
+	#
+	# @param cell_types (list of int)
+	# <br>	-- The `ObsFlag` bits to treat as obstacles for each scan
+	#
+	# @returns (numpy array)
+	# <br>	Format: `(len(cell_types), data_size)`
+	# <br>	-- One row of radar data for each entry of `cell_types`
+	#
+	def _scan_sample(self, center, cell_types):
 		grid_data = self._env.grid_data;
+		width, height = grid_data.shape
+		radar_data = np.full([len(cell_types), self._nPoints], self.radius, dtype=np.float64)
+		dists = np.arange(0, self.radius, self.resolution)
+		if len(dists) == 0:
+			return radar_data
 
-		radar_data = np.full([self._nPoints], self.radius, dtype=np.float64)
-		currentStep = 0
-		x_upper_bound = min(799, grid_data.shape[0])
-		y_upper_bound = min(599, grid_data.shape[1])
-		for degree in np.arange(0, 360, self._degree_step):
-			ang_in_radians = degree * np.pi / 180
-			cos_cached = np.cos(ang_in_radians)
-			sin_cached = np.sin(ang_in_radians)
-			for i in np.arange(0, self.radius, self.resolution):
-				x = int(cos_cached * i + center[0])
-				y = int(sin_cached * i + center[1])
-				if ((x < 0) or (y < 0) or (x_upper_bound <= x) or (y_upper_bound <= y)):
-					radar_data[currentStep] = i
-					break
-				if (grid_data[x,y] & cell_type):
-					radar_data[currentStep] = i
-					break
-			currentStep = currentStep + 1
+		# Shape (beams, samples)
+		xs = (self._beam_dirs[:, 0, np.newaxis] * dists + center[0]).astype(int)
+		ys = (self._beam_dirs[:, 1, np.newaxis] * dists + center[1]).astype(int)
+		outside = (xs < 0) | (ys < 0) | (width <= xs) | (height <= ys)
+		cells = grid_data[np.clip(xs, 0, width - 1), np.clip(ys, 0, height - 1)]
+
+		beam_idx = np.arange(self._nPoints)
+		for i in range(len(cell_types)):
+			hits = outside | ((cells & cell_types[i]) != 0)
+			first = np.argmax(hits, axis=1)
+			found = hits[beam_idx, first]
+			radar_data[i, found] = dists[first[found]]
 		return radar_data
 
 
+	## Scans by exact traversal of the grid cells along each beam.
+	#
+	# @param center (numpy array)
+	# <br>	Format `[x, y]`
+	# <br>	-- The center point of the scan
+	#
+	# @param cell_types (list of int)
+	# <br>	-- The `ObsFlag` bits to treat as obstacles for each scan
+	#
+	# @returns (numpy array)
+	# <br>	Format: `(len(cell_types), data_size)`
+	# <br>	-- One row of radar data for each entry of `cell_types`
+	#
+	def _scan_dda(self, center, cell_types):
+		grid_data = self._env.grid_data;
+		if cython.compiled:
+			radar_data = np.full([len(cell_types), self._nPoints], self.radius, dtype=np.float64);
+			scan_dda(center[0],
+				center[1],
+				self.radius,
+				grid_data,
+				np.array(cell_types, dtype=np.intc),
+				self._degree_step,
+				radar_data);
+			return radar_data;
+
+		return GridTraversal.dda_ray_distances(grid_data, center, self._beam_dirs, self.radius, cell_types)
+
+
+	## Scans using the distance field of the static map, checking only the
+	# dynamic layer cell by cell. Gives the same results as `_scan_dda()`.
+	#
+	# @param center (numpy array)
+	# <br>	Format `[x, y]`
+	# <br>	-- The center point of the scan
+	#
+	# @param cell_types (list of int)
+	# <br>	-- The `ObsFlag` bits to treat as obstacles for each scan
+	#
+	# @returns (numpy array)
+	# <br>	Format: `(len(cell_types), data_size)`
+	# <br>	-- One row of radar data for each entry of `cell_types`
+	#
+	def _scan_distance_field(self, center, cell_types):
+		grid_data = self._env.grid_data;
+		static_overlay = self._env.static_overlay;
+		distance_field = self._env.static_distance_field;
+
+		# The dynamic layer is whatever differs from the static map,
+		# within range of the center
+		x0 = max(0, int(np.floor(center[0] - self.radius)))
+		y0 = max(0, int(np.floor(center[1] - self.radius)))
+		x1 = min(grid_data.shape[0], int(np.ceil(center[0] + self.radius)) + 1)
+		y1 = min(grid_data.shape[1], int(np.ceil(center[1] + self.radius)) + 1)
+		window = grid_data[x0:x1, y0:y1]
+		changed_x, changed_y = np.nonzero(window != static_overlay[x0:x1, y0:y1])
+		changed_x += x0
+		changed_y += y0
+
+		if cython.compiled:
+			if 0 < len(changed_x):
+				box = np.array([changed_x.min(), changed_y.min(), changed_x.max() + 1, changed_y.max() + 1], dtype=np.intc)
+			else:
+				box = np.zeros(4, dtype=np.intc)
+			radar_data = np.empty([len(cell_types), self._nPoints], dtype=np.float64);
+			scan_distance_field(center[0],
+				center[1],
+				self.radius,
+				distance_field,
+				grid_data,
+				np.array(cell_types, dtype=np.intc),
+				self._static_flags,
+				box,
+				self._degree_step,
+				radar_data);
+			return radar_data;
+
+		static_radar_data = GridTraversal.sphere_trace_distances(distance_field, center, self._beam_dirs, self.radius)
+		exit_radar_data = GridTraversal.grid_exit_distances(grid_data.shape, center, self._beam_dirs, self.radius)
+		changed_vals = grid_data[changed_x, changed_y]
+		changed_cells = np.column_stack((changed_x, changed_y))
+
+		radar_data = np.empty([len(cell_types), self._nPoints], dtype=np.float64)
+		for i in range(len(cell_types)):
+			if cell_types[i] & self._static_flags:
+				radar_data[i] = static_radar_data
+			else:
+				radar_data[i] = exit_radar_data
+			cells = changed_cells[(changed_vals & cell_types[i]) != 0]
+			if 0 < len(cells):
+				radar_data[i] = np.minimum(radar_data[i], GridTraversal.cell_entry_distances(cells, center, self._beam_dirs, self.radius))
+		return radar_data
+
+
+	## Scans coarse-to-fine through an occupancy pyramid of the grid.
+	# Gives the same results as `_scan_dda()`.
+	#
+	# @param center (numpy array)
+	# <br>	Format `[x, y]`
+	# <br>	-- The center point of the scan
+	#
+	# @param cell_types (list of int)
+	# <br>	-- The `ObsFlag` bits to treat as obstacles for each scan
+	#
+	# @returns (numpy array)
+	# <br>	Format: `(len(cell_types), data_size)`
+	# <br>	-- One row of radar data for each entry of `cell_types`
+	#
+	def _scan_pyramid(self, center, cell_types):
+		pyramid = self._get_pyramid()
+		radar_data = np.empty([len(cell_types), self._nPoints], dtype=np.float64)
+		for i in range(len(cell_types)):
+			radar_data[i] = GridTraversal.pyramid_ray_distances(pyramid, center, self._beam_dirs, self.radius, cell_types[i])
+		return radar_data
+
+
+	## Gets an `OccupancyPyramid` of the environment's current grid. The
+	# environment's own `occupancy_pyramid` is used when it is up to date;
+	# otherwise the radar builds one, which is reused until the grid is
+	# replaced.
+	#
+	def _get_pyramid(self):
+		grid_data = self._env.grid_data
+		pyramid = getattr(self._env, 'occupancy_pyramid', None)
+		if pyramid is not None and pyramid.grid_data is grid_data:
+			return pyramid
+		if self._pyramid is None or self._pyramid.grid_data is not grid_data:
+			self._pyramid = OccupancyPyramid(grid_data)
+		return self._pyramid
+
+
 	## Sets the degree step of the `Radar`.
 	#
 	# @param newDegreeStep (float)
@@ -137,10 +401,12 @@ class GridDataRadar(Radar):
 		# Recalculate beams
 		self._nPoints = int(360 / int(self._degree_step)); 
 		self._beams = np.zeros([self._nPoints, 2]);
+		self._beam_dirs = np.zeros([self._nPoints, 2]);
 		currentStep = 0
 		for angle in np.arange(0, 360, self._degree_step):
 			ang_in_radians = angle * np.pi / 180
-			self._beams[currentStep] = Vector.unit_vec_from_radians(ang_in_radians) * self.radius
+			self._beam_dirs[currentStep] = Vector.unit_vec_from_radians(ang_in_radians)
+			self._beams[currentStep] = self._beam_dirs[currentStep] * self.radius
 			currentStep += 1
 
 
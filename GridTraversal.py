@@ -0,0 +1,489 @@
+#!/usr/bin/python3
+
+## @package GridTraversal
+#
+# Exact traversal of occupancy grids along rays, in the style of Amanatides
+# and Woo ("A Fast Voxel Traversal Algorithm for Ray Tracing", 1987).
+#
+# Grid cell `(x, y)` covers the square `[x, x+1) x [y, y+1)`, which matches
+# the truncation used by the sampling-based scans. Every cell that a ray
+# passes through is visited exactly once, so thin obstacles are never skipped
+# no matter how long the ray is.
+#
+# For grids whose obstacles never move, `static_distance_field()` and
+# `sphere_trace_distances()` give the same hits while skipping over open space
+# in large jumps. `pyramid_ray_distances()` does the same for any grid, using
+# an `OccupancyPyramid`.
+#
+# `segment_cells()` and `segment_band_cells()` list the cells touched by a line
+# segment (optionally swept by a disk), for exact collision checks.
+#
+
+import numpy as np
+import scipy.ndimage
+from PackedObstacles import _point_segment_distances
+
+
+## Finds the distance along each of several rays to the first grid cell
+# matching each of several flags.
+#
+# All rays start at `center`. Distances are measured to the point where the
+# ray enters the matching cell (0 if `center` is in a matching cell).
+# Leaving the grid counts as a hit for every flag, at the distance where the
+# ray leaves the grid.
+#
+# The rays are traversed in lockstep, one cell per iteration, so the number
+# of (vectorized) iterations is bounded by about `2 * max_dist` regardless of
+# the number of rays.
+#
+# @param grid_data (numpy array)
+# <br>	Format: `(width, height)`
+# <br>	-- The occupancy grid, holding `ObsFlag` bits for each cell
+#
+# @param center (numpy array)
+# <br>	Format: `[x, y]`
+# <br>	-- The start point of the rays
+#
+# @param directions (numpy array)
+# <br>	Format: `[[dx1, dy1], ..., [dxn, dyn]]`
+# <br>	-- Unit direction vectors of the rays
+#
+# @param max_dist (float)
+# <br>	-- The length of the rays
+#
+# @param flags (list of int)
+# <br>	-- For each flag, the scan stops at the first cell `c` with
+# 	`grid_data[c] & flag` nonzero.
+#
+# @returns (numpy array)
+# <br>	Format: `(len(flags), num_rays)`
+# <br>	-- The distance to the first hit for each flag and ray, or
+# 	`max_dist` if there is no hit within range.
+#
+def dda_ray_distances(grid_data, center, directions, max_dist, flags):
+	directions = np.asarray(directions, dtype=np.float64)
+	num_rays = directions.shape[0]
+	flags = np.asarray(flags, dtype=grid_data.dtype)
+	out = np.full((len(flags), num_rays), float(max_dist))
+	width, height = grid_data.shape
+
+	cx = float(center[0])
+	cy = float(center[1])
+	x = np.full(num_rays, int(np.floor(cx)))
+	y = np.full(num_rays, int(np.floor(cy)))
+	step_x, t_max_x, t_delta_x = _axis_setup(cx, x, directions[:, 0])
+	step_y, t_max_y, t_delta_y = _axis_setup(cy, y, directions[:, 1])
+
+	t_entry = np.zeros(num_rays)
+	# Which (flag, ray) pairs have not hit anything yet
+	pending = np.ones((len(flags), num_rays), dtype=bool)
+	active = np.arange(num_rays)
+
+	while 0 < len(active):
+		xa = x[active]
+		ya = y[active]
+		outside = (xa < 0) | (ya < 0) | (width <= xa) | (height <= ya)
+		cells = np.zeros(len(active), dtype=grid_data.dtype)
+		inside = ~outside
+		cells[inside] = grid_data[xa[inside], ya[inside]]
+
+		hits = outside[np.newaxis, :] | ((cells[np.newaxis, :] & flags[:, np.newaxis]) != 0)
+		new_hits = hits & pending[:, active]
+		flag_idx, ray_idx = np.nonzero(new_hits)
+		out[flag_idx, active[ray_idx]] = t_entry[active[ray_idx]]
+		pending[flag_idx, active[ray_idx]] = False
+
+		# Advance each remaining ray into its next cell
+		active = active[np.any(pending[:, active], axis=0) & ~outside]
+		use_x = t_max_x[active] < t_max_y[active]
+		ax = active[use_x]
+		ay = active[~use_x]
+		t_entry[ax] = t_max_x[ax]
+		x[ax] += step_x[ax]
+		t_max_x[ax] += t_delta_x[ax]
+		t_entry[ay] = t_max_y[ay]
+		y[ay] += step_y[ay]
+		t_max_y[ay] += t_delta_y[ay]
+		active = active[t_entry[active] < max_dist]
+
+	return out
+
+
+## Computes the per-axis traversal state for rays starting at coordinate
+# `c` (in cell `cell`) with direction components `d`.
+#
+# @returns (tuple)
+# <br>	Format: `(step, t_max, t_delta)`
+# <br>	-- The direction to step in, the ray parameter at which the
+# 	first cell boundary is crossed, and the ray parameter between
+# 	consecutive boundaries.
+#
+def _axis_setup(c, cell, d):
+	step = np.sign(d).astype(int)
+	with np.errstate(divide='ignore', invalid='ignore'):
+		t_max = np.where(d != 0, ((cell + (0 < step)) - c) / d, np.inf)
+		t_delta = np.where(d != 0, 1.0 / np.abs(d), np.inf)
+	return step, t_max, t_delta
+
+
+## Computes the Euclidean distance transform of an occupancy grid.
+#
+# @param occupied (numpy array)
+# <br>	Format: `(width, height)`
+# <br>	-- Boolean grid, true where a cell is occupied
+#
+# @returns (numpy array)
+# <br>	Format: `(width, height)`
+# <br>	-- The distance from the center of each cell to the center of the
+# 	nearest occupied cell (0 for occupied cells, and infinity everywhere
+# 	if no cell is occupied)
+#
+def static_distance_field(occupied):
+	occupied = np.asarray(occupied, dtype=bool)
+	if not np.any(occupied):
+		return np.full(occupied.shape, np.inf)
+	return scipy.ndimage.distance_transform_edt(~occupied)
+
+
+## Finds the distance along each ray to the point where it leaves the grid.
+#
+# @param shape (tuple)
+# <br>	Format: `(width, height)`
+# <br>	-- The shape of the grid
+#
+# @returns (numpy array)
+# <br>	-- The distance for each ray (0 if `center` is outside the grid),
+# 	or `max_dist` if the ray stays in the grid for its whole length
+#
+def grid_exit_distances(shape, center, directions, max_dist):
+	directions = np.asarray(directions, dtype=np.float64)
+	if not (0 <= center[0] < shape[0] and 0 <= center[1] < shape[1]):
+		return np.zeros(directions.shape[0])
+	t_exit = np.full(directions.shape[0], float(max_dist))
+	for axis in range(2):
+		d = directions[:, axis]
+		with np.errstate(divide='ignore', invalid='ignore'):
+			t_axis = np.where(0 < d, (shape[axis] - center[axis]) / d, np.where(d < 0, -center[axis] / d, np.inf))
+		t_exit = np.minimum(t_exit, np.maximum(t_axis, 0))
+	return t_exit
+
+
+## Finds the distance along each ray to the first occupied cell, given the
+# distance field of the grid (see `static_distance_field()`).
+#
+# This gives the same result as `dda_ray_distances()` on the occupancy grid,
+# but each ray jumps ahead by the clearance from the distance field. A ray
+# at point `p` in a cell whose distance field value is `D` is at least
+# `D - sqrt(2)` away from any occupied cell, so it can safely advance by that
+# much. Only close to obstacles, where the clearance is less than one cell,
+# do the rays step from cell to cell. In open space a ray of any length takes
+# a handful of steps.
+#
+# @param distance_field (numpy array)
+# <br>	Format: `(width, height)`
+# <br>	-- The distance field of the grid
+#
+# @param center (numpy array)
+# <br>	Format: `[x, y]`
+# <br>	-- The start point of the rays
+#
+# @param directions (numpy array)
+# <br>	Format: `[[dx1, dy1], ..., [dxn, dyn]]`
+# <br>	-- Unit direction vectors of the rays
+#
+# @param max_dist (float)
+# <br>	-- The length of the rays
+#
+# @returns (numpy array)
+# <br>	-- The distance to the first occupied cell (or to the edge of the
+# 	grid) for each ray, or `max_dist` if there is no hit within range
+#
+def sphere_trace_distances(distance_field, center, directions, max_dist):
+	directions = np.asarray(directions, dtype=np.float64)
+	width, height = distance_field.shape
+	cx = float(center[0])
+	cy = float(center[1])
+
+	# Leaving the grid counts as a hit, so it is the default result
+	out = grid_exit_distances(distance_field.shape, center, directions, max_dist)
+	limit = out.copy()
+	t = np.zeros(directions.shape[0])
+	active = np.nonzero(0 < limit)[0]
+
+	while 0 < len(active):
+		ta = t[active]
+		da = directions[active]
+		# Nudge forward so that a point on a cell boundary is looked
+		# up in the cell the ray is entering
+		t_lookup = ta + np.where(0 < ta, 1e-9, 0.0)
+		x = np.clip(np.floor(cx + t_lookup * da[:, 0]).astype(int), 0, width - 1)
+		y = np.clip(np.floor(cy + t_lookup * da[:, 1]).astype(int), 0, height - 1)
+		px = cx + ta * da[:, 0]
+		py = cy + ta * da[:, 1]
+		clearance = distance_field[x, y]
+
+		hit = (clearance == 0)
+		out[active[hit]] = ta[hit]
+
+		# Jump by the clearance where there is room, otherwise move to
+		# the next cell boundary
+		jump = clearance - np.sqrt(2)
+		with np.errstate(divide='ignore', invalid='ignore'):
+			to_x = np.where(0 < da[:, 0], (x + 1 - px) / da[:, 0], np.where(da[:, 0] < 0, (x - px) / da[:, 0], np.inf))
+			to_y = np.where(0 < da[:, 1], (y + 1 - py) / da[:, 1], np.where(da[:, 1] < 0, (y - py) / da[:, 1], np.inf))
+		t[active] = ta + np.where(1 <= jump, jump, np.maximum(np.minimum(to_x, to_y), 1e-9))
+
+		active = active[~hit]
+		active = active[t[active] < limit[active]]
+
+	return out
+
+
+## Finds the distance along each ray to the first grid cell matching a
+# flag, skipping empty space with an `OccupancyPyramid`.
+#
+# Each ray starts at the coarsest level of the pyramid. When the ray is in a
+# tile that has none of `flag` set, it jumps to the point where it leaves
+# the tile and moves up a level; when the tile has `flag` set, the ray moves
+# down a level without advancing. A hit on level 0 is a matching cell. The
+# result is the same as `dda_ray_distances()`, but long stretches of empty
+# space cost a few coarse steps.
+#
+# @param pyramid (`OccupancyPyramid` object)
+# <br>	-- The pyramid over the occupancy grid
+#
+# @param center (numpy array)
+# <br>	Format: `[x, y]`
+# <br>	-- The start point of the rays
+#
+# @param directions (numpy array)
+# <br>	Format: `[[dx1, dy1], ..., [dxn, dyn]]`
+# <br>	-- Unit direction vectors of the rays
+#
+# @param max_dist (float)
+# <br>	-- The length of the rays
+#
+# @param flag (int)
+# <br>	-- The scan stops at the first cell `c` with
+# 	`grid_data[c] & flag` nonzero.
+#
+# @returns (numpy array)
+# <br>	-- The distance to the first hit (or to the edge of the grid) for
+# 	each ray, or `max_dist` if there is no hit within range
+#
+def pyramid_ray_distances(pyramid, center, directions, max_dist, flag):
+	directions = np.asarray(directions, dtype=np.float64)
+	width, height = pyramid.grid_data.shape
+	sizes = np.array(pyramid.tile_sizes)
+	top = len(sizes) - 1
+	cx = float(center[0])
+	cy = float(center[1])
+
+	# Leaving the grid counts as a hit, so it is the default result
+	out = grid_exit_distances(pyramid.grid_data.shape, center, directions, max_dist)
+	limit = out.copy()
+	t = np.zeros(directions.shape[0])
+	level = np.full(directions.shape[0], top)
+	active = np.nonzero(0 < limit)[0]
+
+	while 0 < len(active):
+		ta = t[active]
+		la = level[active]
+		da = directions[active]
+		# Nudge forward so that a point on a tile boundary is looked
+		# up in the tile the ray is entering
+		t_lookup = ta + np.where(0 < ta, 1e-9, 0.0)
+		x = np.clip(np.floor(cx + t_lookup * da[:, 0]).astype(int), 0, width - 1)
+		y = np.clip(np.floor(cy + t_lookup * da[:, 1]).astype(int), 0, height - 1)
+		size = sizes[la]
+		tx = x // size
+		ty = y // size
+
+		vals = np.zeros(len(active), dtype=pyramid.grid_data.dtype)
+		for k in range(top + 1):
+			on_level = (la == k)
+			vals[on_level] = pyramid.levels[k][tx[on_level], ty[on_level]]
+		occupied = (vals & flag) != 0
+
+		hit = occupied & (la == 0)
+		out[active[hit]] = ta[hit]
+		level[active[occupied]] -= 1
+
+		# Jump to the far side of empty tiles
+		empty = ~occupied
+		de = da[empty]
+		se = size[empty]
+		with np.errstate(divide='ignore', invalid='ignore'):
+			to_x = np.where(0 < de[:, 0], ((tx[empty] + 1) * se - cx) / de[:, 0], np.where(de[:, 0] < 0, (tx[empty] * se - cx) / de[:, 0], np.inf))
+			to_y = np.where(0 < de[:, 1], ((ty[empty] + 1) * se - cy) / de[:, 1], np.where(de[:, 1] < 0, (ty[empty] * se - cy) / de[:, 1], np.inf))
+		advanced = active[empty]
+		t[advanced] = np.maximum(np.minimum(to_x, to_y), ta[empty] + 1e-9)
+		level[advanced] = np.minimum(la[empty] + 1, top)
+
+		active = active[~hit]
+		active = active[t[active] < limit[active]]
+
+	return out
+
+
+## Finds the distance along each ray to the first of the given grid cells.
+#
+# Each cell is tested directly against every ray, so this is meant for a
+# modest number of cells (e.g., the cells covered by moving obstacles near
+# the rays' start point).
+#
+# @param cells (numpy array)
+# <br>	Format: `[[x1, y1], ..., [xk, yk]]`
+# <br>	-- Integer coordinates of the cells
+#
+# @param center (numpy array)
+# <br>	Format: `[x, y]`
+# <br>	-- The start point of the rays
+#
+# @param directions (numpy array)
+# <br>	Format: `[[dx1, dy1], ..., [dxn, dyn]]`
+# <br>	-- Unit direction vectors of the rays
+#
+# @param max_dist (float)
+# <br>	-- The length of the rays
+#
+# @returns (numpy array)
+# <br>	-- The distance to the point where each ray enters the first of
+# 	the cells (0 if `center` is inside one of them), or `max_dist` if
+# 	the ray does not reach any of them
+#
+def cell_entry_distances(cells, center, directions, max_dist, chunk_size=1024):
+	directions = np.asarray(directions, dtype=np.float64)
+	out = np.full(directions.shape[0], float(max_dist))
+	# Avoid 0 * inf for rays that are parallel to an axis
+	d = np.where(directions == 0, 1e-30, directions)
+	inv = 1.0 / d
+
+	for start in range(0, len(cells), chunk_size):
+		chunk = np.asarray(cells[start:start + chunk_size], dtype=np.float64)
+		lo = chunk - center
+		t_near = np.full((directions.shape[0], chunk.shape[0]), -np.inf)
+		t_far = np.full((directions.shape[0], chunk.shape[0]), np.inf)
+		for axis in range(2):
+			t1 = lo[np.newaxis, :, axis] * inv[:, axis, np.newaxis]
+			t2 = (lo[np.newaxis, :, axis] + 1) * inv[:, axis, np.newaxis]
+			t_near = np.maximum(t_near, np.minimum(t1, t2))
+			t_far = np.minimum(t_far, np.maximum(t1, t2))
+		entry = np.where((t_near < t_far) & (0 < t_far), np.maximum(t_near, 0), np.inf)
+		out = np.minimum(out, np.min(entry, axis=1))
+
+	return out
+
+
+## Gets the grid cells that a line segment passes through.
+#
+# A cell is included if the segment touches it at all, including the cells
+# containing the two end points. Cells may be outside the grid.
+#
+# @param p0 (numpy array)
+# <br>	Format: `[x, y]`
+#
+# @param p1 (numpy array)
+# <br>	Format: `[x, y]`
+#
+# @returns (tuple)
+# <br>	Format: `(xs, ys)`
+# <br>	-- The coordinates of the cells, in order along the segment
+#
+def segment_cells(p0, p1):
+	p0 = np.asarray(p0, dtype=np.float64)
+	p1 = np.asarray(p1, dtype=np.float64)
+	d = p1 - p0
+
+	# The segment parameters where it crosses a cell boundary. The
+	# segment is in one cell between consecutive crossings.
+	ts = [np.array([0.0, 1.0])]
+	for axis in range(2):
+		if d[axis] != 0:
+			lo, hi = min(p0[axis], p1[axis]), max(p0[axis], p1[axis])
+			ts.append((np.arange(np.floor(lo) + 1, np.ceil(hi)) - p0[axis]) / d[axis])
+	ts = np.unique(np.concatenate(ts))
+	mids = (ts[:-1] + ts[1:]) / 2.0
+	points = np.vstack((p0, p0 + mids[:, np.newaxis] * d, p1))
+	cells = np.floor(points).astype(int)
+
+	# Drop repeats (only consecutive cells can be the same)
+	keep = np.r_[True, np.any(cells[1:] != cells[:-1], axis=1)]
+	return cells[keep, 0], cells[keep, 1]
+
+
+## Gets the grid cells that come within `radius` of a line segment, i.e. the
+# cells touched by the segment swept by a disk of that radius.
+#
+# @param p0 (numpy array)
+# <br>	Format: `[x, y]`
+#
+# @param p1 (numpy array)
+# <br>	Format: `[x, y]`
+#
+# @param radius (float)
+#
+# @returns (tuple)
+# <br>	Format: `(xs, ys)`
+# <br>	-- The coordinates of the cells, in no particular order. Cells
+# 	may be outside the grid.
+#
+def segment_band_cells(p0, p1, radius):
+	xs, ys = segment_cells(p0, p1)
+	if radius <= 0:
+		return xs, ys
+	# Candidates: the square of cells around each cell on the segment
+	reach = int(np.ceil(radius))
+	offsets = np.arange(-reach, reach + 1)
+	x0, y0 = xs.min() - reach, ys.min() - reach
+	span = ys.max() + reach - y0 + 1
+	keys = (xs - x0)[:, np.newaxis] * span + (ys - y0)[:, np.newaxis]
+	keys = np.unique((keys[:, np.newaxis, :] + offsets[np.newaxis, :, np.newaxis] * span + offsets[np.newaxis, np.newaxis, :]).reshape(-1))
+	cells = np.column_stack((keys // span + x0, keys % span + y0))
+	near = segment_box_distances(p0, p1, cells, cells + 1) <= radius
+	return cells[near, 0], cells[near, 1]
+
+
+## Computes the distance between a line segment and each of several
+# axis-aligned boxes (0 where they overlap).
+#
+# @param lo (numpy array)
+# <br>	Format: `[[x1, y1], ..., [xn, yn]]`
+# <br>	-- The lowest corner of each box
+#
+# @param hi (numpy array)
+# <br>	Format: `[[x1, y1], ..., [xn, yn]]`
+# <br>	-- The highest corner of each box
+#
+def segment_box_distances(p0, p1, lo, hi):
+	p0 = np.asarray(p0, dtype=np.float64)
+	p1 = np.asarray(p1, dtype=np.float64)
+	lo = np.asarray(lo, dtype=np.float64)
+	hi = np.asarray(hi, dtype=np.float64)
+	d = p1 - p0
+
+	# Overlap, by clipping the segment to each box (Liang-Barsky)
+	t0 = np.zeros(len(lo))
+	t1 = np.ones(len(lo))
+	overlaps = np.ones(len(lo), dtype=bool)
+	for axis in range(2):
+		if d[axis] == 0:
+			overlaps &= (lo[:, axis] <= p0[axis]) & (p0[axis] <= hi[:, axis])
+			continue
+		ta = (lo[:, axis] - p0[axis]) / d[axis]
+		tb = (hi[:, axis] - p0[axis]) / d[axis]
+		t0 = np.maximum(t0, np.minimum(ta, tb))
+		t1 = np.minimum(t1, np.maximum(ta, tb))
+	overlaps &= t0 <= t1
+
+	# Otherwise the nearest points include an end point of the segment
+	# or a corner of the box
+	dist = np.minimum(_point_box_distances(p0, lo, hi), _point_box_distances(p1, lo, hi))
+	for corner in (lo, hi, np.column_stack((lo[:, 0], hi[:, 1])), np.column_stack((hi[:, 0], lo[:, 1]))):
+		dist = np.minimum(dist, _point_segment_distances(corner, p0, p1))
+	return np.where(overlaps, 0.0, dist)
+
+
+def _point_box_distances(point, lo, hi):
+	gap = np.maximum(np.maximum(lo - point, point - hi), 0)
+	return np.sqrt(np.einsum('ij,ij->i', gap, gap))
@@ -97,12 +97,15 @@ class MDPAdapterSensor(MDP):
 		# numpy array with entry of zero if free space and one if
 		# not free
 		# entries are according to states, y for columns and x for rows
-		grid_data = env.grid_data
-		walls = np.zeros((self._height,self._width), dtype=np.float32)
-		for x in range(self._width):
-			for y in range(self._height):
-				temp_wall = grid_data[x*cell_size:(x+1)*cell_size-1,y*cell_size:(y+1)*cell_size-1]
-				walls[y,x] = 1 if np.sum(temp_wall) > 0 else 0
+		# Each state covers the cells [x*cell_size, (x+1)*cell_size-1)
+		# by [y*cell_size, (y+1)*cell_size-1) of the grid, so the grid
+		# is cut into cell_size x cell_size blocks and the last row
+		# and column of each block are dropped
+		grid_data = env.grid_data[:self._width*cell_size, :self._height*cell_size]
+		blocks = np.zeros((self._width*cell_size, self._height*cell_size), dtype=grid_data.dtype)
+		blocks[:grid_data.shape[0], :grid_data.shape[1]] = grid_data
+		blocks = blocks.reshape(self._width, cell_size, self._height, cell_size)[:, :cell_size-1, :, :cell_size-1]
+		walls = np.any(blocks != 0, axis=(1, 3)).T.astype(np.float32)
 		return walls
 
 
@@ -0,0 +1,163 @@
+#!/usr/bin/python3
+
+## @package MapCache
+#
+# On-disk cache of arrays derived from map files.
+#
+# Turning a map file into the arrays the simulator uses (e.g., decoding a PNG
+# map and computing its static obstacle layer and distance field) gives the
+# same result every time for the same file. A batch of trials usually runs the
+# same few maps over and over, so the results are saved to disk the first time
+# and memory-mapped on later runs.
+#
+# Entries are keyed by a hash of the map file's contents, the kind of
+# artifact, the parameters it was computed with, and `CACHE_VERSION`, so an
+# edited map (or a changed loader) simply gets a new entry. Each entry is a
+# directory of `.npy` files, which is written under a temporary name and then
+# renamed into place, so concurrent trials never see a partial entry.
+#
+
+import hashlib
+import os
+import shutil
+import tempfile
+import numpy as np
+
+
+## Version of the cached artifacts. Increase this whenever the way any of
+# them is computed changes, so that old entries are not used.
+CACHE_VERSION = 2
+
+## Environment variable giving the cache directory. If it is set to an empty
+# string, caching is disabled.
+CACHE_DIR_ENV_VAR = 'SAFENAV_MAP_CACHE'
+
+
+## A directory of cached map artifacts.
+#
+class MapCache:
+
+	## Constructor
+	#
+	# @param cache_dir (string)
+	# <br>	-- The directory to keep the cache in. It is created when the
+	# 	first entry is written.
+	#
+	def __init__(self, cache_dir):
+		self.cache_dir = cache_dir
+
+		## Number of artifacts loaded from the cache
+		self.hits = 0
+
+		## Number of artifacts that had to be computed
+		self.misses = 0
+
+
+	## Gets the artifacts of a map, computing and caching them if they are
+	# not cached yet.
+	#
+	# @param map_filename (string)
+	# <br>	-- The map file the artifacts are derived from
+	#
+	# @param kind (string)
+	# <br>	-- Name of the kind of artifact
+	#
+	# @param params (tuple)
+	# <br>	-- Any other parameters that affect the artifacts (compared
+	# 	by their `repr()`)
+	#
+	# @param compute (function)
+	# <br>	-- Computes the artifacts, as a dict mapping names to numpy
+	# 	arrays
+	#
+	# @returns (dict)
+	# <br>	-- The artifacts. Arrays loaded from the cache are
+	# 	copy-on-write memory maps, so changing them does not change
+	# 	the cache.
+	#
+	def get(self, map_filename, kind, params, compute):
+		path = os.path.join(self.cache_dir, self.get_key(map_filename, kind, params))
+		arrays = _load_entry(path)
+		if arrays is not None:
+			self.hits += 1
+			return arrays
+
+		self.misses += 1
+		arrays = compute()
+		try:
+			_store_entry(path, arrays)
+		except OSError:
+			# The cache is only an optimization (e.g., the disk may
+			# be read-only or full)
+			pass
+		return arrays
+
+
+	## Gets the name of the cache entry for the given artifacts.
+	#
+	# @returns (string)
+	#
+	def get_key(self, map_filename, kind, params):
+		digest = hashlib.sha256()
+		with open(map_filename, 'rb') as f:
+			for block in iter(lambda: f.read(1 << 20), b''):
+				digest.update(block)
+		digest.update(repr((kind, params, CACHE_VERSION)).encode('utf-8'))
+		return '{}-{}'.format(kind, digest.hexdigest()[:32])
+
+
+	## Deletes every entry in the cache.
+	#
+	def clear(self):
+		if os.path.isdir(self.cache_dir):
+			shutil.rmtree(self.cache_dir)
+
+
+_default_cache = None
+
+## Gets the cache shared by the whole process. Its directory is given by the
+# `SAFENAV_MAP_CACHE` environment variable, defaulting to
+# `~/.cache/safenav/maps`.
+#
+# @returns (`MapCache` object)
+# <br>	-- The cache, or `None` if caching has been disabled by setting
+# 	`SAFENAV_MAP_CACHE` to an empty string
+#
+def get_default_cache():
+	global _default_cache
+	cache_dir = os.environ.get(CACHE_DIR_ENV_VAR, os.path.join(os.path.expanduser('~'), '.cache', 'safenav', 'maps'))
+	if cache_dir == '':
+		return None
+	if _default_cache is None or _default_cache.cache_dir != cache_dir:
+		_default_cache = MapCache(cache_dir)
+	return _default_cache
+
+
+def _load_entry(path):
+	if not os.path.isdir(path):
+		return None
+	arrays = {}
+	for filename in os.listdir(path):
+		if not filename.endswith('.npy'):
+			continue
+		array_path = os.path.join(path, filename)
+		try:
+			arrays[filename[:-4]] = np.load(array_path, mmap_mode='c')
+		except ValueError:
+			# Empty arrays can not be memory-mapped
+			arrays[filename[:-4]] = np.load(array_path)
+	return arrays
+
+
+def _store_entry(path, arrays):
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+	tmp_path = tempfile.mkdtemp(prefix='.tmp-', dir=os.path.dirname(path))
+	try:
+		for name, array in arrays.items():
+			np.save(os.path.join(tmp_path, name + '.npy'), np.ascontiguousarray(array))
+		os.rename(tmp_path, path)
+	except OSError:
+		# Another process may have stored the same entry first
+		shutil.rmtree(tmp_path, ignore_errors=True)
+		if not os.path.isdir(path):
+			raise
@@ -0,0 +1,205 @@
+#!/usr/bin/python3
+
+## @package MapImage
+#
+# Loads map images into NumPy arrays without pygame.
+#
+# PNG files are decoded directly with `zlib` and NumPy, so maps can be loaded
+# without a display (or without pygame installed at all). Only 8-bit,
+# non-interlaced PNGs are supported, which covers every map in `Maps/`; for
+# anything else `load_png()` raises a `ValueError`, and `load_image()` falls
+# back to pygame.
+#
+# Images are returned as `(width, height, 4)` arrays of RGBA bytes, indexed by
+# `[x][y]` like `pygame.surfarray`.
+#
+
+import numpy as np
+import struct
+import zlib
+
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Number of channels for each PNG color type
+_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+## Loads an image, decoding PNGs directly and using pygame for anything else.
+#
+# @param filename (string)
+#
+# @returns (numpy array)
+# <br>	Format: `(width, height, 4)`, dtype `uint8`
+# <br>	-- The RGBA value of each pixel
+#
+def load_image(filename):
+	try:
+		return load_png(filename)
+	except ValueError:
+		pass
+
+	import pygame as PG
+	image = PG.image.load(filename)
+	return np.dstack((PG.surfarray.array3d(image), PG.surfarray.array_alpha(image)))
+
+
+## Decodes a PNG file.
+#
+# @param filename (string)
+#
+# @returns (numpy array)
+# <br>	Format: `(width, height, 4)`, dtype `uint8`
+# <br>	-- The RGBA value of each pixel
+#
+def load_png(filename):
+	with open(filename, 'rb') as f:
+		data = f.read()
+	if data[:8] != _PNG_SIGNATURE:
+		raise ValueError('Not a PNG file: {}'.format(filename))
+
+	header = None
+	palette = None
+	transparency = None
+	idat = []
+	pos = 8
+	while pos + 8 <= len(data):
+		length, chunk_type = struct.unpack('>I4s', data[pos:pos+8])
+		chunk = data[pos+8:pos+8+length]
+		pos += 12 + length
+		if chunk_type == b'IHDR':
+			header = struct.unpack('>IIBBBBB', chunk)
+		elif chunk_type == b'PLTE':
+			palette = np.frombuffer(chunk, dtype=np.uint8).reshape(-1, 3)
+		elif chunk_type == b'tRNS':
+			transparency = chunk
+		elif chunk_type == b'IDAT':
+			idat.append(chunk)
+		elif chunk_type == b'IEND':
+			break
+
+	if header is None:
+		raise ValueError('PNG file has no header: {}'.format(filename))
+	width, height, bit_depth, color_type, compression, filter_method, interlace = header
+	if bit_depth != 8 or color_type not in _CHANNELS or interlace != 0 or compression != 0 or filter_method != 0:
+		raise ValueError('Unsupported PNG format (bit depth {}, color type {}, interlace {}): {}'.format(bit_depth, color_type, interlace, filename))
+	if color_type == 3 and palette is None:
+		raise ValueError('Paletted PNG file has no palette: {}'.format(filename))
+
+	channels = _CHANNELS[color_type]
+	try:
+		raw = zlib.decompress(b''.join(idat))
+	except zlib.error as e:
+		raise ValueError('Corrupt PNG data in {}: {}'.format(filename, e))
+	stride = width * channels + 1
+	if len(raw) < stride * height:
+		raise ValueError('Truncated PNG data: {}'.format(filename))
+	rows = np.frombuffer(raw, dtype=np.uint8, count=stride*height).reshape(height, stride)
+	pixels = _unfilter(rows[:, 1:], rows[:, 0], channels).reshape(height, width, channels)
+
+	rgba = np.empty((height, width, 4), dtype=np.uint8)
+	rgba[:, :, 3] = 255
+	if color_type == 0 or color_type == 4:
+		rgba[:, :, :3] = pixels[:, :, 0:1]
+		if color_type == 4:
+			rgba[:, :, 3] = pixels[:, :, 1]
+		elif transparency is not None and len(transparency) >= 2:
+			rgba[:, :, 3][pixels[:, :, 0] == transparency[1]] = 0
+	elif color_type == 2 or color_type == 6:
+		rgba[:, :, :3] = pixels[:, :, :3]
+		if color_type == 6:
+			rgba[:, :, 3] = pixels[:, :, 3]
+		elif transparency is not None and len(transparency) >= 6:
+			key = np.frombuffer(transparency, dtype='>u2', count=3).astype(np.uint8)
+			rgba[:, :, 3][np.all(pixels == key, axis=2)] = 0
+	else:
+		alpha = np.full(len(palette), 255, dtype=np.uint8)
+		if transparency is not None:
+			alpha[:len(transparency)] = np.frombuffer(transparency, dtype=np.uint8)[:len(palette)]
+		index = pixels[:, :, 0]
+		rgba[:, :, :3] = palette[index]
+		rgba[:, :, 3] = alpha[index]
+
+	return rgba.transpose(1, 0, 2).copy()
+
+
+## Undoes the PNG scanline filters.
+#
+# @param lines (numpy array)
+# <br>	Format: `(height, width * channels)`
+# <br>	-- The filtered bytes of each scanline
+#
+# @param filter_types (numpy array)
+# <br>	-- The filter type of each scanline
+#
+# @param channels (int)
+# <br>	-- The number of bytes per pixel
+#
+# @returns (numpy array)
+# <br>	Format: `(height, width * channels)`
+#
+def _unfilter(lines, filter_types, channels):
+	out = np.empty(lines.shape, dtype=np.uint8)
+	prev = np.zeros(lines.shape[1], dtype=np.uint8)
+	for y in range(lines.shape[0]):
+		line = lines[y]
+		filter_type = filter_types[y]
+		if filter_type == 0:
+			out[y] = line
+		elif filter_type == 1:
+			# Sub: a running sum along each channel
+			out[y] = np.cumsum(line.reshape(-1, channels), axis=0, dtype=np.uint8).reshape(-1)
+		elif filter_type == 2:
+			out[y] = line + prev
+		elif filter_type == 3:
+			out[y] = _unfilter_average(line, prev, channels)
+		elif filter_type == 4:
+			out[y] = _unfilter_paeth(line, prev, channels)
+		else:
+			raise ValueError('Invalid PNG filter type: {}'.format(filter_type))
+		prev = out[y]
+	return out
+
+
+def _unfilter_average(line, prev, channels):
+	out = bytearray(line.tobytes())
+	prev = prev.tobytes()
+	for i in range(len(out)):
+		left = out[i-channels] if i >= channels else 0
+		out[i] = (out[i] + ((left + prev[i]) >> 1)) & 0xFF
+	return np.frombuffer(bytes(out), dtype=np.uint8)
+
+
+## Undoes the Paeth filter for one scanline.
+#
+# The Paeth predictor of a byte depends on the byte to its left, so it can
+# not be vectorized in general. But where the bytes above and above-left are
+# equal, the predictor is just the byte to the left, so a run of those bytes
+# is a running sum (as for the Sub filter). Map images are mostly flat color,
+# so the predictor only has to be evaluated where the row above changes.
+#
+def _unfilter_paeth(line, prev, channels):
+	out = np.empty(line.shape, dtype=np.uint8)
+	for k in range(channels):
+		x = line[k::channels]
+		b = prev[k::channels].astype(np.int64)
+		out_k = out[k::channels]
+		starts = np.concatenate(([0], np.flatnonzero(b[1:] != b[:-1]) + 1, [len(x)]))
+		left = 0
+		for s in range(len(starts) - 1):
+			i, end = starts[s], starts[s+1]
+			above = int(b[i])
+			above_left = int(b[i-1]) if i > 0 else 0
+			p = left + above - above_left
+			pa, pb, pc = abs(p - left), abs(p - above), abs(p - above_left)
+			if pa <= pb and pa <= pc:
+				pred = left
+			elif pb <= pc:
+				pred = above
+			else:
+				pred = above_left
+			out_k[i] = (int(x[i]) + pred) & 0xFF
+			if end - i > 1:
+				out_k[i+1:end] = (int(out_k[i]) + np.cumsum(x[i+1:end], dtype=np.int64)) & 0xFF
+			left = int(out_k[end-1])
+	return out
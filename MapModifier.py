@@ -8,9 +8,9 @@ import Vector
 import Geometry
 import os
 import sys
-import json
 from DynamicObstacles import DynamicObstacle
 import MovementPattern
+import PedestrianData
 
 
 def make_randompath_dynamic_obstacle(env,
@@ -343,30 +343,29 @@ def _map_mod_obsmat(env):
 	])
 	H_meter2pix = np.linalg.inv(H_pix2meter)
 
-	with open('obsmat.json', 'r') as f:
-		obsmat = json.load(f)
-		time_offset = obsmat[str(env.cmdargs.ped_id_to_replace)][0]['time'] if env.cmdargs.ped_id_to_replace > 0 else 0
-		for ped_id in obsmat:
-			if ped_id == str(env.cmdargs.ped_id_to_replace):
-				continue
-
-			path_list = []
-			firstpoint = obsmat[ped_id][0]
-			path_list.append((-1000, -1000, firstpoint['time']-time_offset))
-			for waypoint in obsmat[ped_id]:
-				#pos = Geometry.apply_homography(H_meter2pix, (waypoint['pos_x'], waypoint['pos_y']))
-				pos = (waypoint['pos_x'], waypoint['pos_y'])
-				# Rotate 90 degrees to match video
-				path_list.append((pos[1], pos[0], waypoint['time']-time_offset))
-
-			# Get obstacles offscreen after they finish their path
-			path_list.append((-1000, -1000, path_list[-1][2]+0.01))
-
-			obs_mover = MovementPattern.PathMovement(path_list, loop=False)
-
-			dynobs = DynamicObstacle(obs_mover, obs_id=int(ped_id))
-			dynobs.shape = 3
-			dynobs.width = 0.6
-			dynobs.height = 0.3
-			env.dynamic_obstacles.append(dynobs)
+	obsmat = PedestrianData.load_obsmat('obsmat.json')
+	time_offset = obsmat.get_sample(env.cmdargs.ped_id_to_replace, 0)['time'] if env.cmdargs.ped_id_to_replace > 0 else 0
+	for ped_id in obsmat.ped_ids.tolist():
+		if ped_id == env.cmdargs.ped_id_to_replace:
+			continue
+
+		samples = obsmat.get_samples(ped_id)
+		times = samples['time'] - time_offset
+		#pos = Geometry.apply_homography(H_meter2pix, (samples['pos_x'], samples['pos_y']))
+		# Rotate 90 degrees to match video
+		path_list = np.column_stack((samples['pos_y'], samples['pos_x'], times))
+
+		# Keep obstacles offscreen before and after their path
+		path_list = np.vstack(([-1000, -1000, times[0]], path_list, [-1000, -1000, times[-1]+0.01]))
+
+		obs_mover = MovementPattern.PathMovement(path_list, loop=False)
+
+		dynobs = DynamicObstacle(obs_mover, obs_id=int(ped_id))
+		dynobs.shape = 3
+		dynobs.width = 0.6
+		dynobs.height = 0.3
+
+		# Only keep the pedestrian in the environment while it
+		# is on its path
+		env.schedule_obstacle(dynobs, float(times[0]), float(times[-1]))
 
@@ -2,10 +2,32 @@
 ## @package ParametricPathMovement
 #
 
+import bisect
 import numpy as np
 import Vector
 
 
+## A simulation clock, shared by the movements of an environment's obstacles.
+#
+# Movements whose position is a pure function of time (see
+# `ParametricPathMovement`) can follow a clock instead of being stepped.
+# Advancing the clock then moves all of them at once, and each position is
+# only computed when something asks for it.
+#
+class SimClock:
+	def __init__(self):
+		## The current time
+		self.time = 0.0
+
+		## The time before the last call to `advance()`
+		self.prev_time = 0.0
+
+
+	def advance(self, timestep):
+		self.prev_time = self.time
+		self.time += timestep
+
+
 class MovementPattern:
 	def __init__(self, initial_pos=(0, 0)):
 		self._pos = np.array(initial_pos, dtype=np.float64)
@@ -24,6 +46,32 @@ class MovementPattern:
 		return self._pos
 
 
+	## Makes this movement follow the given clock instead of being
+	# stepped, if its position is a function of time.
+	#
+	# @param clock (`SimClock` object)
+	#
+	# @returns (bool)
+	# <br>	-- Whether the movement follows the clock
+	#
+	def follow_clock(self, clock):
+		return False
+
+
+	## Gets the state of this movement, for `DynamicObstacle.get_state()`.
+	# Subclasses with more state than their position override this and
+	# `set_state()`.
+	#
+	def get_state(self):
+		return np.array(self._pos)
+
+
+	## Puts this movement back into a state from `get_state()`.
+	#
+	def set_state(self, state):
+		self._pos = np.array(state)
+
+
 ## A static MovementPattern that does not move. Good for static obstacles.
 #
 class StaticMovement(MovementPattern):
@@ -51,16 +99,35 @@ class RobotBodyMovement(MovementPattern):
 	def get_pos(self):
 		return self._robot.location
 
+	# The position belongs to the robot
+	def get_state(self):
+		return None
+
+	def set_state(self, state):
+		pass
+
 
 ## Represents a movement through space modeled as a parametric curve
 #
+# The position is only computed from the curve when `get_pos()` is called,
+# so a movement can be stepped (or follow a `SimClock`) cheaply while nothing
+# looks at it.
+#
 class ParametricPathMovement(MovementPattern):
 	def __init__(self, *args, **kwargs):
 		super().__init__(*args, **kwargs)
 
 		self._cur_time = 0.0
 
+		# The clock this movement follows, if any, and the clock
+		# times that correspond to time 0 on the path and to when it
+		# started following the clock
+		self._clock = None
+		self._clock_offset = 0.0
+		self._clock_start = 0.0
+
 		self._pos = self.pos_at(0)
+		self._pos_time = 0.0
 
 
 	## Gets the (x, y) coordinates of this path at the given time
@@ -69,12 +136,65 @@ class ParametricPathMovement(MovementPattern):
 		pass
 
 
+	## Gets the (x, y) coordinates of this path at each of the given times
+	# (e.g., to predict where an obstacle will be).
+	#
+	# @param times (array-like)
+	#
+	# @returns (numpy array)
+	# <br>	Format: `[[x1, y1], ..., [xn, yn]]`
+	#
+	def pos_at_many(self, times):
+		return np.array([self.pos_at(time) for time in np.ravel(times)], dtype=np.float64).reshape(-1, 2)
+
+
+	## Gets the current time along the path
+	#
+	def get_time(self):
+		if self._clock is None:
+			return self._cur_time
+		return self._clock.time - self._clock_offset
+
+
+	def follow_clock(self, clock):
+		if self._clock is not clock:
+			self._clock_offset = clock.time - self.get_time()
+			self._clock_start = clock.time
+			self._clock = clock
+		return True
+
+
 	def step(self, timestep):
-		self._cur_time += timestep
-		self._pos = self.pos_at(self._cur_time)
+		if self._clock is None:
+			self._cur_time += timestep
+		else:
+			self._clock_offset -= timestep
+		return self.get_pos()
+
+
+	def get_pos(self):
+		time = self.get_time()
+		if time != self._pos_time:
+			self._pos = self.pos_at(time)
+			self._pos_time = time
 		return self._pos
 
 
+	## Gets the position at the previous tick of the clock this movement
+	# follows (or where it started following it, if that was later)
+	#
+	def get_prev_pos(self):
+		return self.pos_at(max(self._clock.prev_time, self._clock_start) - self._clock_offset)
+
+
+	def get_state(self):
+		return (self._cur_time, self._clock, self._clock_offset, self._clock_start)
+
+	def set_state(self, state):
+		self._cur_time, self._clock, self._clock_offset, self._clock_start = state
+		self._pos_time = None
+
+
 ## Circular movement
 #
 class CircleMovement(ParametricPathMovement):
@@ -97,6 +217,11 @@ class CircleMovement(ParametricPathMovement):
 		return np.add(self._center, (np.cos(angle)*self._radius, np.sin(angle) * self._radius))
 
 
+	def pos_at_many(self, times):
+		angles = (np.ravel(times) * self._angular_speed) + self._angle_offset
+		return np.add(self._center, np.stack((np.cos(angles)*self._radius, np.sin(angles) * self._radius), axis=1))
+
+
 ## Movement along a fixed closed path
 #
 class PathMovement(ParametricPathMovement):
@@ -167,6 +292,12 @@ class PathMovement(ParametricPathMovement):
 
 		self._path_length = self._path_list[-1][2]
 
+		# The times of the points, for searching, and the segment that
+		# the last call to pos_at() found
+		self._path_times = self._path_list[:, 2].tolist()
+		self._segment_vecs = self._path_list[1:, :2] - self._path_list[:-1, :2]
+		self._cursor = 0
+
 		super().__init__(*args, **kwargs);
 
 
@@ -176,26 +307,44 @@ class PathMovement(ParametricPathMovement):
 		if self._loop:
 			time = time % self._path_length
 
-		# Find the segment the current time lies on
-		for i in range(len(self._path_list)-1):
-			cur_time = self._path_list[i][2]
-			next_time = self._path_list[i+1][2]
-			if cur_time <= time and time < next_time:
-				segment_time = next_time - cur_time
-				time_diff = time - cur_time
-				segment_vec = self._path_list[i+1][:2] - self._path_list[i][:2]
-				return self._path_list[i][:2] + (segment_vec * time_diff / segment_time)
-
-		# Corner cases when the time is before the beginning of the
-		# path or after the end
-		if time <= self._path_list[0][2]:
-			return self._path_list[0][:2]
-		elif time >= self._path_list[-1][2]:
-			return self._path_list[-1][:2]
+		# Find the segment the current time lies on. The time usually
+		# moves forward a little from one call to the next, so try the
+		# segment found last time and the one after it before
+		# searching the whole path.
+		times = self._path_times
+		last = len(times) - 1
+		i = self._cursor
+		if not (times[i] <= time < times[i+1]):
+			i += 1
+			if not (i < last and times[i] <= time < times[i+1]):
+				i = bisect.bisect_right(times, time) - 1
+
+				# Corner cases when the time is before the
+				# beginning of the path or after the end
+				if i < 0:
+					return self._path_list[0][:2]
+				elif i >= last:
+					return self._path_list[-1][:2]
+			self._cursor = i
+
+		return self._path_list[i][:2] + (self._segment_vecs[i] * (time - times[i]) / (times[i+1] - times[i]))
+
+
+	def pos_at_many(self, times):
+		times = np.ravel(np.asarray(times, dtype=np.float64))
+		if self._loop:
+			times = times % self._path_length
 
-		# We should have covered all cases, so if we get here something
-		# went wrong
-		raise Exception('Unknown error: Unable to determine path position')
+		path = self._path_list
+		seg = np.searchsorted(path[:, 2], times, side='right') - 1
+		i = np.clip(seg, 0, len(path) - 2)
+		with np.errstate(invalid='ignore', divide='ignore'):
+			# Segments without duration are only picked here for
+			# times that are not on a segment
+			pos = path[i, :2] + (self._segment_vecs[i] * (times - path[i, 2])[:, np.newaxis] / (path[i+1, 2] - path[i, 2])[:, np.newaxis])
+		pos[seg < 0] = path[0, :2]
+		pos[len(path) - 1 <= seg] = path[-1, :2]
+		return pos
 
 
 
@@ -221,3 +370,10 @@ class RandomMovement(MovementPattern):
 
 		return self._pos
 
+
+	def get_state(self):
+		return (np.array(self._pos), self._leftover)
+
+	def set_state(self, state):
+		self._pos = np.array(state[0])
+		self._leftover = state[1]
@@ -8,6 +8,8 @@ from .AbstractNavAlgo import AbstractNavigationAlgorithm
 from Robot import RobotControlInput
 from StaticMapper import StaticMapper
 from Environment import ObsFlag
+import Geometry
+import GridTraversal
 
 
 ## Implementation of the Dynamic Window algorithm for robotic navigation.
@@ -321,17 +323,18 @@ class DynamicRrtNavigationAlgorithm(AbstractNavigationAlgorithm):
 		grid_data = self._mapper.get_grid_data();
 
 		if fromPoint is not None:
-			ang_in_radians = Vector.degrees_between(fromPoint, toPoint) * np.pi / 180
-			dist = Vector.distance_between(fromPoint, toPoint)
-
-			cos_cached = np.cos(ang_in_radians)
-			sin_cached = np.sin(ang_in_radians)
-			for i in np.arange(0, dist, 1):
-				x = int(cos_cached * i + fromPoint[0])
-				y = int(sin_cached * i + fromPoint[1])
-				if grid_data[x,y] & ObsFlag.ANY_OBSTACLE:
-					return True
-				if not self._use_as_global_planner and Vector.distance_between(np.array([x,y]), self._gps.location()) < self._radar.radius and self._radar._env.get_obsflags([x,y], ObsFlag.DYNAMIC_OBSTACLE):
+			# Check every mapped cell that the edge passes through,
+			# coarse-to-fine, so that open stretches of the map are
+			# skipped a tile at a time
+			xs, ys = GridTraversal.segment_cells(fromPoint, toPoint)
+			if self._mapper.get_occupancy_pyramid().any_at(xs, ys, ObsFlag.ANY_OBSTACLE):
+				return True
+
+			if not self._use_as_global_planner:
+				# Only the part of the edge within radar range is
+				# checked for dynamic obstacles
+				line = Geometry.clip_line_to_circle((fromPoint, toPoint), self._gps.location(), self._radar.radius)
+				if line is not None and self._radar._env.segment_collides(line[0], line[1], ObsFlag.DYNAMIC_OBSTACLE):
 					return True
 
 		return grid_data[int(toPoint[0])][int(toPoint[1])] & ObsFlag.ANY_OBSTACLE;
@@ -110,8 +110,8 @@ class FuzzyNavigationAlgorithm(AbstractNavigationAlgorithm):
 		combined_pdf = targetpoint_pdf
 
 		# Scan the radar to get obstacle information
-		raw_radar_data = self._radar.scan(self._gps.location());
-		raw_dynamic_radar_data = self._radar.scan_dynamic_obstacles(self._gps.location());
+		raw_radar_data, raw_dynamic_radar_data, _, dynobs_ids = self._radar.scan_full(self._gps.location());
+		self._dynobs_getter = self._radar.get_dynobs_getter(self._gps.location(), dynobs_ids);
 
 
 		if self._with_predictor:
@@ -339,4 +339,4 @@ class FuzzyNavigationAlgorithm(AbstractNavigationAlgorithm):
 
 
 	def _obstacle_predictor_dynobs_getter_func(self, angle):
-		return self._radar.get_dynobs_at_angle(self._gps.location(), angle)
+		return self._dynobs_getter(angle)
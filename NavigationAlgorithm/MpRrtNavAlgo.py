@@ -8,6 +8,7 @@ from .AbstractNavAlgo import AbstractNavigationAlgorithm
 from ObstaclePredictor import CollisionConeObstaclePredictor
 from Robot import RobotControlInput
 from Environment import ObsFlag
+import Geometry
 
 
 ## Implementation of the Dynamic Window algorithm for robotic navigation.
@@ -28,8 +29,13 @@ class MpRrtNavigationAlgorithm(AbstractNavigationAlgorithm):
 	#
 	# @param cmdargs (object)
 	# <br>	-- A command-line arguments object generated by `argparse`.
+	#
+	# @param obstacle_predictor (`AbstractObstaclePredictor` object)
+	# <br>	-- The predictor to use for dynamic obstacles (e.g., an
+	# 	`OracleObstaclePredictor` as a baseline). By default, a
+	# 	`CollisionConeObstaclePredictor` is used.
 	# 
-	def __init__(self, sensors, target, cmdargs):
+	def __init__(self, sensors, target, cmdargs, obstacle_predictor=None):
 		# Init basic members
 		self._sensors = sensors;
 		self._target = target;
@@ -57,7 +63,9 @@ class MpRrtNavigationAlgorithm(AbstractNavigationAlgorithm):
 		self._time = 0;
 		self._minTimeMultiplier = 3;
 		self._maxPredictTime = 3;
-		self._obstacle_predictor = CollisionConeObstaclePredictor(360, self._radar.radius, self._maxPredictTime);
+		self._obstacle_predictor = obstacle_predictor;
+		if obstacle_predictor is None:
+			self._obstacle_predictor = CollisionConeObstaclePredictor(360, self._radar.radius, self._maxPredictTime);
 
 
 		self.debug_info = {"path": [], "path2": []}
@@ -80,8 +88,8 @@ class MpRrtNavigationAlgorithm(AbstractNavigationAlgorithm):
 	#
 	def select_next_action(self):
 		#Scan the radar
-		self._dynamic_radar_data = self._radar.scan_dynamic_obstacles(self._gps.location());
-		self._radar_data = self._radar.scan(self._gps.location());
+		self._radar_data, self._dynamic_radar_data, _, dynobs_ids = self._radar.scan_full(self._gps.location());
+		self._dynobs_getter = self._radar.get_dynobs_getter(self._gps.location(), dynobs_ids);
 
 		# Give the current observation to the obstacle motion predictor
 		self.debug_info['future_obstacles'] = self._obstacle_predictor.add_observation(self._gps.location(),
@@ -313,24 +321,26 @@ class MpRrtNavigationAlgorithm(AbstractNavigationAlgorithm):
 			fromPoint = fromData[:2];
 			toDataTimeOffset = toData[2] - self._time;
 			fromDataTimeOffset = fromData[2] - self._time;
-			
-			ang_in_radians = Vector.degrees_between(fromPoint, toPoint) * np.pi / 180
-			dist = Vector.getDistanceBetweenPoints(fromPoint, toPoint)
-
-			cos_cached = np.cos(ang_in_radians)
-			sin_cached = np.sin(ang_in_radians)
-			for i in np.arange(0, dist, 2):
-				x = int(cos_cached * i + fromPoint[0])
-				y = int(sin_cached * i + fromPoint[1])
-				if env.get_obsflags([x,y]) & ObsFlag.ANY_OBSTACLE and Vector.distance_between((x,y), self._gps.location()) < self._radar.radius:
-					return True
-				if fromDataTimeOffset <= self._maxPredictTime:
+
+			# Obstacles are only visible within radar range, except
+			# for the static map
+			line = Geometry.clip_line_to_circle((fromPoint, toPoint), self._gps.location(), self._radar.radius)
+			if line is not None and env.segment_collides(line[0], line[1], ObsFlag.ANY_OBSTACLE):
+				return True
+			if not dynamicOnly and env.segment_collides(fromPoint, toPoint, ObsFlag.STATIC_OBSTACLE):
+				return True
+
+			if fromDataTimeOffset <= self._maxPredictTime:
+				# The predictions are sampled along the edge
+				ang_in_radians = Vector.degrees_between(fromPoint, toPoint) * np.pi / 180
+				dist = Vector.getDistanceBetweenPoints(fromPoint, toPoint)
+				steps = np.arange(0, dist, 2)
+				xs = (np.cos(ang_in_radians) * steps + fromPoint[0]).astype(int)
+				ys = (np.sin(ang_in_radians) * steps + fromPoint[1]).astype(int)
+				for x, y in zip(xs.tolist(), ys.tolist()):
 					for i in np.arange(fromDataTimeOffset, min(self._maxPredictTime, toDataTimeOffset), 1):
 						if self._obstacle_predictor.get_prediction((x,y), i) > 0.15:
 							return True;
-				if not dynamicOnly:
-					if env.get_obsflags([x,y]) & ObsFlag.STATIC_OBSTACLE:
-						return True
 		else:
                         # Check for dynamic obstacle
 			timeOffset = toData[2] - self._time;
@@ -372,7 +382,7 @@ class MpRrtNavigationAlgorithm(AbstractNavigationAlgorithm):
 		return x, y, t;
 
 	def _obstacle_predictor_dynobs_getter_func(self, angle):
-		return self._radar.get_dynobs_at_angle(self._gps.location(), angle);
+		return self._dynobs_getter(angle);
 
 class Tree:
 
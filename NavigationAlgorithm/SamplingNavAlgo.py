@@ -84,8 +84,7 @@ class SamplingNavigationAlgorithm(AbstractNavigationAlgorithm):
 		self._stepNum += 1;
 
 		# Scan the radar
-		self._dynamic_radar_data = self._radar.scan_dynamic_obstacles(self._gps.location());
-		self._radar_data = self._radar.scan(self._gps.location());
+		self._radar_data, self._dynamic_radar_data, _, _ = self._radar.scan_full(self._gps.location());
 
 		# Give the current observation to the obstacle motion predictor
 		self.debug_info["future_obstacles"] = self._obstacle_predictor.add_observation(self._gps.location(),
@@ -213,7 +212,7 @@ class SamplingNavigationAlgorithm(AbstractNavigationAlgorithm):
 
 		radius = self._radar.radius;
 		resolution = 10
-		if isinstance(self._radar, Radar):
+		if hasattr(self._radar, 'resolution'):
 			resolution = self._radar.resolution;
 		degree_step = self._radar.get_degree_step();
 		nPoints = self._radar.get_data_size();
@@ -358,8 +357,7 @@ class DwaSamplingNavigationAlgorithm(AbstractNavigationAlgorithm):
 		self._stepNum += 1;
 
 		# Scan the radar
-		self._dynamic_radar_data = self._radar.scan_dynamic_obstacles(self._gps.location());
-		self._radar_data = self._radar.scan(self._gps.location());
+		self._radar_data, self._dynamic_radar_data, _, _ = self._radar.scan_full(self._gps.location());
 
 		# Give the current observation to the obstacle motion predictor
 		self.debug_info["future_obstacles"] = self._obstacle_predictor.add_observation(self._gps.location(),
@@ -5,6 +5,8 @@
 
 import numpy as np;
 import Vector
+import MovementPattern
+import Rasterizer
 from scipy.spatial.distance import pdist
 from scipy.cluster.hierarchy import linkage, fcluster
 from collections import defaultdict
@@ -564,4 +566,183 @@ class CollisionConeObstaclePredictor(AbstractObstaclePredictor):
 		return points;
 
 
+## Obstacle predictor that knows where obstacles with predetermined
+# movements will be.
+#
+# Obstacles that move along a `PathMovement` or `CircleMovement`, or that do
+# not move (`StaticMovement`), do not need to be guessed at: their positions
+# follow from the environment's clock. This predictor stamps them into a
+# space-time occupancy volume, with one bit per grid cell (pixel) per time
+# step, and answers `get_prediction()` by looking up a bit. That makes it an
+# upper bound to compare the other predictors against, and a cheap
+# prediction backend for planners.
+#
+# The volume is generated lazily, `chunk_size` time steps at a time, when a
+# prediction for one of those steps is first asked for. `add_observation()`
+# drops the chunks that are in the past, and all of them if the set of
+# obstacles has changed. Obstacles with other movements (random movements,
+# robots) are not predicted, so the prediction for them is 0. Scheduled
+# obstacles (see `Environment.schedule_obstacle()`) are only predicted
+# during their intervals.
+#
+class OracleObstaclePredictor(AbstractObstaclePredictor):
+
+	## Constructor
+	#
+	# @param env (`Environment` object)
+	# <br>	-- The environment whose obstacles to predict
+	#
+	# @param data_size (int)
+	# <br>	-- See `AbstractObstaclePredictor`. The observations are not
+	# 	used, since the predictions come from the environment.
+	#
+	# @param chunk_size (int)
+	# <br>	-- The number of time steps to generate at once
+	#
+	# @param timestep (float)
+	# <br>	-- The clock time of one step (as passed to
+	# 	`Environment.next_step()`)
+	#
+	def __init__(self, env, data_size=360, chunk_size=16, timestep=1):
+		self.data_size = data_size;
+		self._env = env;
+		self._chunk_size = chunk_size;
+		self._timestep = timestep;
+
+		# Steps are counted from the clock time when the predictor
+		# was created, and predictions are relative to the step of
+		# the last observation
+		self._origin_time = env.clock.time;
+		self._base_step = 0;
 
+		# Packed occupancy of each generated chunk, by chunk number.
+		# Format: `(chunk_size, width, ceil(height / 8))`
+		self._chunks = dict();
+
+		# The predictable obstacles, with the time intervals they are
+		# in the environment for
+		self._obstacles = [];
+		self._obstacles_key = None;
+		self._scheduled_ids = set();
+		self._update_obstacles();
+
+
+	## @copydoc AbstractObstaclePredictor#add_observation()
+	#
+	def add_observation(self, location, radar_all, radar_dynamic, get_obs_at_angle):
+		self._base_step = self._get_step(self._env.clock.time);
+		self._update_obstacles();
+
+		first_chunk = self._base_step // self._chunk_size;
+		for chunk_num in [chunk_num for chunk_num in self._chunks if chunk_num < first_chunk]:
+			del self._chunks[chunk_num];
+
+
+	## @copydoc AbstractObstaclePredictor#get_prediction()
+	#
+	# The prediction is 1 if a predictable obstacle covers the grid cell
+	# of `location` at that time, and 0 otherwise.
+	#
+	def get_prediction(self, location, time):
+		x = int(np.floor(location[0]));
+		y = int(np.floor(location[1]));
+		if not (0 <= x < self._env.width and 0 <= y < self._env.height):
+			return 0.0;
+
+		step = self._base_step + max(int(round(time)), 0);
+		chunk = self._get_chunk(step // self._chunk_size);
+		return float((chunk[step % self._chunk_size, x, y >> 3] >> (7 - (y & 7))) & 1);
+
+
+	## Gets the predictions at several points for the same time. This is
+	# the batched form of `get_prediction()`.
+	#
+	# @param points (numpy array)
+	# <br>	Format: `[[x1, y1], ..., [xn, yn]]`
+	#
+	# @param num_steps_in_future (int)
+	#
+	# @returns (numpy array)
+	# <br>	-- The prediction at each point
+	#
+	def get_prediction_many(self, points, num_steps_in_future):
+		cells = np.floor(np.asarray(points, dtype=np.float64).reshape(-1, 2)).astype(np.intp);
+		inside = (0 <= cells[:, 0]) & (cells[:, 0] < self._env.width) & (0 <= cells[:, 1]) & (cells[:, 1] < self._env.height);
+		x = cells[inside, 0];
+		y = cells[inside, 1];
+
+		step = self._base_step + max(int(round(num_steps_in_future)), 0);
+		chunk = self._get_chunk(step // self._chunk_size);
+		predictions = np.zeros(len(cells));
+		predictions[inside] = (chunk[step % self._chunk_size, x, y >> 3] >> (7 - (y & 7))) & 1;
+		return predictions;
+
+
+	## Gets the step number of a clock time.
+	#
+	def _get_step(self, time):
+		return int(round((time - self._origin_time) / self._timestep));
+
+
+	## Collects the obstacles that can be predicted, and drops the
+	# generated chunks if they have changed.
+	#
+	def _update_obstacles(self):
+		scheduled, start_times, end_times = self._env.obstacle_schedule.get_intervals();
+		if len(scheduled) != len(self._scheduled_ids):
+			self._scheduled_ids = set(map(id, scheduled));
+
+		# Scheduled obstacles are in the environment's list while
+		# they are active, but their intervals are already known
+		unscheduled = [obs for obs in self._env.dynamic_obstacles if id(obs) not in self._scheduled_ids];
+		key = (tuple(map(id, unscheduled)), len(scheduled));
+		if key == self._obstacles_key:
+			return;
+		self._obstacles_key = key;
+		self._chunks = dict();
+
+		self._obstacles = [(obs, -np.inf, np.inf) for obs in unscheduled if _is_predictable(obs)];
+		self._obstacles += [interval for interval in zip(scheduled, start_times.tolist(), end_times.tolist()) if _is_predictable(interval[0])];
+
+
+	def _get_chunk(self, chunk_num):
+		chunk = self._chunks.get(chunk_num);
+		if chunk is None:
+			chunk = self._make_chunk(chunk_num);
+			self._chunks[chunk_num] = chunk;
+		return chunk;
+
+
+	## Stamps the obstacles into the occupancy grids of the steps of a
+	# chunk, and packs them.
+	#
+	def _make_chunk(self, chunk_num):
+		clock_time = self._env.clock.time;
+		times = self._origin_time + (chunk_num * self._chunk_size + np.arange(self._chunk_size)) * self._timestep;
+		grids = np.zeros((self._chunk_size, self._env.width, self._env.height), dtype=np.uint8);
+
+		for obs, start_time, end_time in self._obstacles:
+			steps = np.flatnonzero((start_time <= times) & (times <= end_time));
+			if len(steps) == 0:
+				continue;
+
+			movement = obs._movement;
+			if isinstance(movement, MovementPattern.ParametricPathMovement):
+				path_times = times[steps] + (movement.get_time() - clock_time);
+				positions = movement.pos_at_many(path_times);
+				velocities = positions - movement.pos_at_many(path_times - self._timestep);
+			else:
+				positions = np.tile(obs.coordinate, (len(steps), 1));
+				velocities = np.tile(obs.get_velocity_vector(), (len(steps), 1));
+
+			for step, position, velocity in zip(steps, positions, velocities):
+				Rasterizer.stamp_obstacle(grids[step], obs, 1, coordinate=position, velocity=velocity);
+
+		return np.packbits(grids, axis=-1);
+
+
+## Checks whether an obstacle's future positions are known in advance (see
+# `OracleObstaclePredictor`).
+#
+def _is_predictable(obs):
+	return isinstance(obs._movement, (MovementPattern.ParametricPathMovement, MovementPattern.StaticMovement));
@@ -0,0 +1,103 @@
+#!/usr/bin/python3
+
+## @package ObstacleSchedule
+#
+# Keeps dynamic obstacles out of an environment outside of their time
+# intervals.
+#
+# Some obstacles only take part in part of a run. For example, pedestrians
+# replayed from a dataset each walk through the scene once. Leaving them in
+# `dynamic_obstacles` for the whole run (parked off screen) would make every
+# radar scan, collision check and drawing pass over all of them every step.
+# An `ObstacleSchedule` adds each obstacle to the environment's list when its
+# interval starts and removes it when the interval ends, so everything that
+# reads the list only sees the obstacles that are active.
+#
+
+import numpy as np
+
+
+class ObstacleSchedule:
+
+	def __init__(self):
+		## The scheduled obstacles, active or not
+		self.obstacles = []
+
+		self._start_times = np.zeros(0)
+		self._end_times = np.zeros(0)
+		self._active = np.zeros(0, dtype=bool)
+
+
+	## Adds an obstacle to the schedule. It becomes active the next time
+	# `update()` is called with a time in its interval.
+	#
+	# @param obs (`DynamicObstacle` object)
+	#
+	# @param start_time (float)
+	# <br>	-- The first time at which the obstacle is active
+	#
+	# @param end_time (float)
+	# <br>	-- The last time at which the obstacle is active
+	#
+	def add(self, obs, start_time, end_time):
+		self.obstacles.append(obs)
+		self._start_times = np.append(self._start_times, start_time)
+		self._end_times = np.append(self._end_times, end_time)
+		self._active = np.append(self._active, False)
+
+
+	## Inserts the obstacles that became active and removes the ones that
+	# stopped being active since the last update.
+	#
+	# @param time (float)
+	# <br>	-- The current time
+	#
+	# @param active_obstacles (list)
+	# <br>	-- The list of obstacles to update in place (e.g., an
+	# 	environment's `dynamic_obstacles`). Obstacles in it that are
+	# 	not scheduled are left alone.
+	#
+	def update(self, time, active_obstacles):
+		active = (self._start_times <= time) & (time <= self._end_times)
+		changed = np.flatnonzero(active != self._active)
+		if len(changed) == 0:
+			return
+		self._active = active
+
+		retired = {id(self.obstacles[i]) for i in changed if not active[i]}
+		if 0 < len(retired):
+			active_obstacles[:] = [obs for obs in active_obstacles if id(obs) not in retired]
+		active_obstacles.extend(self.obstacles[i] for i in changed if active[i])
+
+
+	## Gets the scheduled obstacles and their intervals.
+	#
+	# @returns (tuple)
+	# <br>	Format: `(obstacles, start_times, end_times)`
+	# <br>	-- The obstacles, in the order they were added, and numpy
+	# 	arrays of the start and end of each one's interval
+	#
+	def get_intervals(self):
+		return self.obstacles, self._start_times, self._end_times
+
+
+	## Gets the number of scheduled obstacles that are active.
+	#
+	def num_active(self):
+		return int(np.count_nonzero(self._active))
+
+
+	## Gets which obstacles are active, for `Environment.snapshot()`.
+	#
+	def get_state(self):
+		# update() replaces this array rather than changing it, so it
+		# can be shared
+		return self._active
+
+
+	## Puts back which obstacles are active, from `get_state()`. This does
+	# not change any list of active obstacles. Obstacles added since the
+	# state was taken are marked inactive.
+	#
+	def set_state(self, state):
+		self._active = np.concatenate((state, np.zeros(len(self.obstacles) - len(state), dtype=bool)))
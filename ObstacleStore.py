@@ -0,0 +1,437 @@
+#!/usr/bin/python3
+
+## @package ObstacleStore
+#
+# Keeps the state of many moving obstacles in contiguous arrays.
+#
+# Each `DynamicObstacle` normally holds its own position and its own
+# `MovementPattern`, so stepping N obstacles, or reading where they all are
+# (to rasterize them, pack them for a radar scan, and so on), takes N Python
+# method calls and creates N small numpy arrays. An `ObstacleStore` holds the
+# positions, previous positions, and geometry of the obstacles added to it,
+# and the parameters of their movements, one row per obstacle. Their
+# movements are advanced in one vectorized update, and code that handles
+# many obstacles at once can read the arrays directly (see `get_rows()`).
+#
+# Obstacles in a store are still `DynamicObstacle` objects; their attributes
+# just read and write their row, so code that handles one obstacle at a time
+# keeps working.
+#
+# Only `PathMovement`, `CircleMovement` and `RandomMovement` can be stored.
+# Path and circle movements follow the store's clock (see `SimClock`), so
+# their positions are recomputed (for all of them at once) when the clock
+# has moved and a position is asked for. Random movements are advanced by
+# `step()`.
+#
+
+import numpy as np
+import MovementPattern
+
+
+## Kinds of movement of the obstacles in a store
+PATH_MOVEMENT = 0
+CIRCLE_MOVEMENT = 1
+RANDOM_MOVEMENT = 2
+
+# The arrays with one row per obstacle, and the shape of each row
+_ROW_ARRAYS = {
+	'positions': (2,),
+	'prev_positions': (2,),
+	'shapes': (),
+	'radii': (),
+	'sizes': (2,),
+	'widths': (),
+	'heights': (),
+	'kinds': (),
+	'clock_offsets': (),
+	'clock_starts': (),
+	'path_first': (),
+	'path_counts': (),
+	'path_lengths': (),
+	'path_loops': (),
+	'circle_centers': (2,),
+	'circle_radii': (),
+	'angular_speeds': (),
+	'angle_offsets': (),
+	'random_intervals': (),
+	'random_speeds': (),
+	'random_leftovers': (),
+	'_pinned': (),
+}
+_ROW_DTYPES = {'shapes': np.int64, 'kinds': np.int8, 'path_first': np.intp, 'path_counts': np.intp, 'path_loops': bool, '_pinned': bool}
+
+
+class ObstacleStore:
+
+	## Constructor
+	#
+	# @param clock (`SimClock` object)
+	# <br>	-- The clock that the stored path and circle movements follow
+	#
+	def __init__(self, clock):
+		self.clock = clock
+
+		## The stored obstacles. Obstacle `obstacles[i]` is in row `i`
+		# of each array.
+		self.obstacles = []
+
+		for name, row_shape in _ROW_ARRAYS.items():
+			setattr(self, name, np.zeros((16,) + row_shape, dtype=_ROW_DTYPES.get(name, np.float64)))
+
+		# The `[x, y, t]` points of all the stored paths, one path
+		# after another (see `path_first` and `path_counts`)
+		self._path_points = np.zeros((0, 3), dtype=np.float64)
+
+		# The clock time that the path and circle positions were last
+		# computed for
+		self._positions_time = None
+
+
+	def __len__(self):
+		return len(self.obstacles)
+
+
+	## Adds an obstacle to the store, if its movement is one the store can
+	# advance. From then on the obstacle's position, geometry, and motion
+	# live in the store.
+	#
+	# @param obs (`DynamicObstacle` object)
+	#
+	# @returns (int)
+	# <br>	-- The obstacle's row, or `None` if it can not be stored
+	#
+	def add(self, obs):
+		movement = obs._movement
+		if obs.get_store() is not None or type(movement) not in _MOVEMENT_KINDS:
+			return None
+		kind = _MOVEMENT_KINDS[type(movement)]
+		if kind != RANDOM_MOVEMENT:
+			obs.follow_clock(self.clock)
+
+		index = len(self.obstacles)
+		if index == len(self.positions):
+			self._grow()
+		self.obstacles.append(obs)
+
+		self.kinds[index] = kind
+		self.shapes[index] = obs.shape
+		self.radii[index] = obs.radius
+		self.sizes[index] = obs.size
+		self.widths[index] = obs.width
+		self.heights[index] = obs.height
+
+		if kind == PATH_MOVEMENT:
+			self.path_first[index] = len(self._path_points)
+			self.path_counts[index] = len(movement._path_list)
+			self.path_lengths[index] = movement._path_length
+			self.path_loops[index] = movement._loop
+			self._path_points = np.concatenate((self._path_points, np.asarray(movement._path_list, dtype=np.float64)[:, :3]))
+		elif kind == CIRCLE_MOVEMENT:
+			self.circle_centers[index] = movement._center
+			self.circle_radii[index] = movement._radius
+			self.angular_speeds[index] = movement._angular_speed
+			self.angle_offsets[index] = movement._angle_offset
+
+		if kind == RANDOM_MOVEMENT:
+			self.positions[index] = obs.coordinate
+			self.prev_positions[index] = self.positions[index]
+			self.random_intervals[index] = movement._random_interval
+			self.random_speeds[index] = movement._speed
+			self.random_leftovers[index] = movement._leftover
+		else:
+			self._load_clock_params(index)
+			self._positions_time = None
+
+		obs.set_store(self, index)
+		return index
+
+
+	## Gets the row of an obstacle, adding it to the store first if it is
+	# not stored yet (see `add()`).
+	#
+	# @returns (int)
+	# <br>	-- The obstacle's row, or `None` if it is not in this store
+	# 	and can not be added
+	#
+	def index_of(self, obs):
+		if obs.get_store() is self:
+			return obs.get_store_index()
+		return self.add(obs)
+
+
+	## Advances the random movements of the given obstacles. Path and
+	# circle movements follow the clock, so they are not affected.
+	#
+	# Random directions are drawn from `np.random` in the order of
+	# `indices`, the same way stepping each obstacle in that order would
+	# draw them.
+	#
+	# @param timestep (float)
+	#
+	# @param indices (array-like of int)
+	# <br>	-- The rows of the obstacles to step
+	#
+	def step(self, timestep, indices):
+		indices = np.asarray(indices, dtype=np.intp)
+		indices = indices[self.kinds[indices] == RANDOM_MOVEMENT]
+		if len(indices) == 0:
+			return
+
+		intervals = (timestep + self.random_leftovers[indices]) / self.random_intervals[indices]
+		num_moves = np.floor(intervals)
+		self.random_leftovers[indices] = intervals - num_moves
+		num_moves = num_moves.astype(np.intp)
+		if np.sum(num_moves) == 0:
+			return
+
+		angles = np.random.uniform(0, 2*np.pi, np.sum(num_moves))
+		movers = np.repeat(indices, num_moves)
+		moves = np.empty((len(angles), 2), dtype=np.float64)
+		moves[:, 0] = np.cos(angles)
+		moves[:, 1] = np.sin(angles)
+		# Unbuffered, so each obstacle's moves are added one at a time
+		# and in order, as stepping it alone would add them
+		np.add.at(self.positions, movers, self.random_speeds[movers, np.newaxis] * moves)
+		self.prev_positions[movers] = self.positions[movers]
+
+
+	## Gets the current position of an obstacle.
+	#
+	# @returns (numpy array)
+	# <br>	Format: `[x, y]`
+	#
+	def get_position(self, index):
+		self._update_positions()
+		return np.array(self.positions[index])
+
+
+	## Sets the position of an obstacle. For a path or circle movement,
+	# the position stays there until the clock moves.
+	#
+	def set_position(self, index, position):
+		self._update_positions()
+		self.positions[index] = position
+		self._pinned[index] = True
+
+
+	## Gets the velocity (the change of position over the last tick of the
+	# clock) of an obstacle.
+	#
+	# @returns (numpy array)
+	# <br>	Format: `[dx, dy]`
+	#
+	def get_velocity(self, index):
+		return self.get_velocities(np.array([index]))[0]
+
+
+	## Gets the position, velocity, and geometry of several obstacles.
+	#
+	# @param indices (numpy array of int)
+	#
+	# @returns (dict)
+	# <br>	-- Arrays with one row per entry of `indices`: `positions`,
+	# 	`velocities`, `shapes`, `radii`, `sizes`, `widths`, and
+	# 	`heights`
+	#
+	def get_rows(self, indices):
+		return {
+			'positions': self.get_positions(indices),
+			'velocities': self.get_velocities(indices),
+			'shapes': self.shapes[indices],
+			'radii': self.radii[indices],
+			'sizes': self.sizes[indices],
+			'widths': self.widths[indices],
+			'heights': self.heights[indices],
+		}
+
+
+	## Gets the current positions of several obstacles.
+	#
+	# @param indices (numpy array of int)
+	#
+	# @returns (numpy array)
+	# <br>	Format: `[[x1, y1], ..., [xn, yn]]`
+	#
+	def get_positions(self, indices):
+		self._update_positions()
+		return self.positions[indices]
+
+
+	## Gets the bounding boxes of several obstacles, which must be
+	# circles, rectangles, or ellipses (see `SpatialIndex._bounding_box()`).
+	#
+	# @param indices (numpy array of int)
+	#
+	# @returns (numpy array)
+	# <br>	Format: `[[xmin, ymin, xmax, ymax], ...]`
+	#
+	def get_bounding_boxes(self, indices):
+		positions = self.get_positions(indices)
+		shapes = self.shapes[indices]
+		half = np.where(shapes == 1, self.radii[indices], np.maximum(self.widths[indices], self.heights[indices]) / 2.0)
+		boxes = np.concatenate((positions - half[:, np.newaxis], positions + half[:, np.newaxis]), axis=1)
+		rects = shapes == 2
+		boxes[rects, 2:] = positions[rects] + self.sizes[indices[rects]]
+		boxes[rects, :2] = positions[rects]
+		return boxes
+
+
+	## Gets the velocities of several obstacles (see `get_velocity()`).
+	#
+	def get_velocities(self, indices):
+		self._update_positions()
+		# A random movement's position array is updated in place, so
+		# an obstacle outside of a store has always seen it as its
+		# last position too, i.e., without velocity. That is kept here
+		# by `step()` moving the previous position along.
+		return self.positions[indices] - self.prev_positions[indices]
+
+
+	## Gets the movement state of an obstacle, in the format of its
+	# movement's `get_state()`, for `DynamicObstacle.get_state()`.
+	#
+	def get_movement_state(self, index):
+		if self.kinds[index] == RANDOM_MOVEMENT:
+			return (np.array(self.positions[index]), float(self.random_leftovers[index]))
+		return self.obstacles[index]._movement.get_state()
+
+
+	## Puts the movement of an obstacle back into a state from its
+	# `get_state()` (or from `get_movement_state()`).
+	#
+	def set_movement_state(self, index, state):
+		if self.kinds[index] == RANDOM_MOVEMENT:
+			self.positions[index] = state[0]
+			self.prev_positions[index] = state[0]
+			self.random_leftovers[index] = state[1]
+			return
+
+		movement = self.obstacles[index]._movement
+		movement.set_state(state)
+		# The state may be from before the movement followed the clock
+		movement.follow_clock(self.clock)
+		self._load_clock_params(index)
+		self._pinned[index] = False
+		self._positions_time = None
+
+
+	def _load_clock_params(self, index):
+		movement = self.obstacles[index]._movement
+		self.clock_offsets[index] = movement._clock_offset
+		self.clock_starts[index] = movement._clock_start
+
+
+	## Recomputes the positions of the path and circle movements, if the
+	# clock has moved (or their parameters have changed) since they were
+	# last computed. Positions set with `set_position()` are kept until
+	# the clock moves.
+	#
+	def _update_positions(self):
+		if self._positions_time == self.clock.time:
+			return
+		num_obs = len(self.obstacles)
+		if self._positions_time is not None:
+			self._pinned[:num_obs] = False
+		self._positions_time = self.clock.time
+
+		offsets = self.clock_offsets[:num_obs]
+		prev_times = np.maximum(self.clock.prev_time, self.clock_starts[:num_obs]) - offsets
+		times = self.clock.time - offsets
+
+		kinds = self.kinds[:num_obs]
+		pinned = self._pinned[:num_obs]
+		for kind, pos_at in ((PATH_MOVEMENT, self._path_pos_at), (CIRCLE_MOVEMENT, self._circle_pos_at)):
+			indices = np.flatnonzero(kinds == kind)
+			if len(indices) == 0:
+				continue
+			self.prev_positions[indices] = pos_at(indices, prev_times[indices])
+			indices = indices[~pinned[indices]]
+			self.positions[indices] = pos_at(indices, times[indices])
+
+
+	## Same as `PathMovement.pos_at()`, for several stored paths at once.
+	#
+	def _path_pos_at(self, indices, times):
+		times = np.where(self.path_loops[indices], times % self.path_lengths[indices], times)
+		first = self.path_first[indices]
+		counts = self.path_counts[indices]
+		path_times = self._path_points[:, 2]
+
+		# Binary search for the number of points of each path at or
+		# before its time
+		lo = np.zeros(len(indices), dtype=np.intp)
+		hi = np.array(counts)
+		while True:
+			searching = lo < hi
+			if not np.any(searching):
+				break
+			mid = (lo + hi) // 2
+			at_or_before = path_times[first + np.minimum(mid, counts - 1)] <= times
+			lo = np.where(searching & at_or_before, mid + 1, lo)
+			hi = np.where(searching & ~at_or_before, mid, hi)
+
+		# Times before the first point or after the last one stay at
+		# that point; the others are on segment `lo - 1`
+		seg = np.clip(lo - 1, 0, counts - 2)
+		start = self._path_points[first + seg]
+		end = self._path_points[first + seg + 1]
+		segment_vec = end[:, :2] - start[:, :2]
+		with np.errstate(invalid='ignore', divide='ignore'):
+			# Paths may have segments without duration, which are
+			# only picked here for times that are not on a segment
+			pos = start[:, :2] + (segment_vec * (times - start[:, 2])[:, np.newaxis] / (end[:, 2] - start[:, 2])[:, np.newaxis])
+		before = lo == 0
+		pos[before] = self._path_points[first[before], :2]
+		after = lo == counts
+		pos[after] = self._path_points[first[after] + counts[after] - 1, :2]
+		return pos
+
+
+	## Same as `CircleMovement.pos_at()`, for several stored circles at
+	# once.
+	#
+	def _circle_pos_at(self, indices, times):
+		angles = (times * self.angular_speeds[indices]) + self.angle_offsets[indices]
+		radii = self.circle_radii[indices]
+		return self.circle_centers[indices] + np.stack((np.cos(angles) * radii, np.sin(angles) * radii), axis=1)
+
+
+	def _grow(self):
+		for name in _ROW_ARRAYS:
+			array = getattr(self, name)
+			setattr(self, name, np.concatenate((array, np.zeros_like(array))))
+
+
+_MOVEMENT_KINDS = {
+	MovementPattern.PathMovement: PATH_MOVEMENT,
+	MovementPattern.CircleMovement: CIRCLE_MOVEMENT,
+	MovementPattern.RandomMovement: RANDOM_MOVEMENT,
+}
+
+
+## Finds which of a list of obstacles are stored, and in which rows, so that
+# code handling the whole list can read them from the store's arrays.
+# Polygons are left out, since their vertices are not stored.
+#
+# @param obs_list (list of `DynamicObstacle`)
+#
+# @returns (tuple)
+# <br>	Format: `(store, indices)`
+# <br>	-- The store of the first stored obstacle in the list (or `None`),
+# 	and each obstacle's row in it (-1 for obstacles not in it, and for
+# 	polygons)
+#
+def get_store_rows(obs_list):
+	store = None
+	indices = np.full(len(obs_list), -1, dtype=np.intp)
+	for i, obs in enumerate(obs_list):
+		obs_store = obs.get_store()
+		if obs_store is None:
+			continue
+		if store is None:
+			store = obs_store
+		if obs_store is store:
+			indices[i] = obs.get_store_index()
+	if store is not None:
+		indices[(0 <= indices) & (store.shapes[indices] == 4)] = -1
+	return store, indices
@@ -0,0 +1,128 @@
+#!/usr/bin/python3
+
+## @package OccupancyPyramid
+#
+
+import numpy as np
+
+
+## A multi-resolution copy of an occupancy grid, for skipping over empty
+# space.
+#
+# Level 0 is the grid itself. Each cell ("tile") of level `k` covers a
+# `tile_sizes[k] x tile_sizes[k]` block of grid cells, and holds the bitwise
+# OR of the `ObsFlag` bits of those cells (i.e., the grid is max-pooled for
+# each flag). So if a tile has no bit of a flag set, then none of the cells
+# it covers do, and a ray or a query can skip the whole tile at once.
+#
+# The pyramid holds a reference to the grid rather than a copy. When the
+# grid changes, call `update()` with the changed regions (or `rebuild()`);
+# only the tiles covering those regions are recomputed.
+#
+class OccupancyPyramid:
+
+	## Constructor
+	#
+	# @param grid_data (numpy array)
+	# <br>	Format: `(width, height)`
+	# <br>	-- The occupancy grid, holding `ObsFlag` bits for each cell
+	#
+	# @param tile_sizes (tuple of int)
+	# <br>	-- The tile size of each level, starting with 1 for the grid
+	# 	itself. Each size must be a multiple of the one before.
+	#
+	def __init__(self, grid_data, tile_sizes=(1, 4, 16, 64)):
+		if tile_sizes[0] != 1 or any(tile_sizes[k] % tile_sizes[k-1] != 0 for k in range(1, len(tile_sizes))):
+			raise ValueError('Invalid tile sizes: {}'.format(tile_sizes))
+		self.tile_sizes = tuple(tile_sizes)
+		self.rebuild(grid_data)
+
+
+	## Recomputes every level of the pyramid.
+	#
+	# @param grid_data (numpy array)
+	# <br>	-- The new occupancy grid. Defaults to the current one (which
+	# 	may have been modified in place).
+	#
+	def rebuild(self, grid_data=None):
+		if grid_data is not None:
+			self.grid_data = grid_data
+		self.levels = [self.grid_data]
+		for k in range(1, len(self.tile_sizes)):
+			self.levels.append(_pool(self.levels[k-1], self.tile_sizes[k] // self.tile_sizes[k-1]))
+
+
+	## Recomputes the tiles that cover the given regions of the grid.
+	#
+	# @param rects (list of tuple)
+	# <br>	Format: `[(x0, y0, x1, y1), ...]`
+	# <br>	-- Regions of the grid that have changed. Each covers the
+	# 	cells `x0 <= x < x1` and `y0 <= y < y1`, and may extend past
+	# 	the edges of the grid.
+	#
+	# @param grid_data (numpy array)
+	# <br>	-- The new occupancy grid, if it has been replaced. It must
+	# 	have the same shape as the old one, and differ from it only
+	# 	inside `rects`.
+	#
+	def update(self, rects, grid_data=None):
+		if grid_data is not None:
+			self.grid_data = grid_data
+			self.levels[0] = grid_data
+		width, height = self.grid_data.shape
+		for rect in rects:
+			x0 = max(0, int(np.floor(rect[0])))
+			y0 = max(0, int(np.floor(rect[1])))
+			x1 = min(width, int(np.ceil(rect[2])))
+			y1 = min(height, int(np.ceil(rect[3])))
+			if x1 <= x0 or y1 <= y0:
+				continue
+			for k in range(1, len(self.tile_sizes)):
+				size = self.tile_sizes[k]
+				factor = size // self.tile_sizes[k-1]
+				tx0, ty0 = x0 // size, y0 // size
+				tx1, ty1 = -(-x1 // size), -(-y1 // size)
+				child = self.levels[k-1][tx0*factor:tx1*factor, ty0*factor:ty1*factor]
+				self.levels[k][tx0:tx1, ty0:ty1] = _pool(child, factor)
+
+
+	## Checks the grid cells at several points for the given flags, looking
+	# at the finer levels only for points in tiles where the flags are
+	# set.
+	#
+	# @param xs (numpy array)
+	# <br>	-- The x coordinates of the cells (must be inside the grid)
+	#
+	# @param ys (numpy array)
+	# <br>	-- The y coordinates of the cells (must be inside the grid)
+	#
+	# @param flags (int)
+	# <br>	-- The `ObsFlag` bits to check for
+	#
+	# @returns (bool)
+	# <br>	-- True if any of the cells has any of `flags` set
+	#
+	def any_at(self, xs, ys, flags):
+		xs = np.asarray(xs, dtype=int)
+		ys = np.asarray(ys, dtype=int)
+		for k in range(len(self.tile_sizes) - 1, -1, -1):
+			size = self.tile_sizes[k]
+			keep = (self.levels[k][xs // size, ys // size] & flags) != 0
+			xs = xs[keep]
+			ys = ys[keep]
+			if len(xs) == 0:
+				return False
+		return True
+
+
+## Max-pools (ORs together) each `factor x factor` block of `grid`. Blocks at
+# the edges may be partial.
+#
+def _pool(grid, factor):
+	width, height = grid.shape
+	pad_w = -width % factor
+	pad_h = -height % factor
+	if pad_w or pad_h:
+		grid = np.pad(grid, ((0, pad_w), (0, pad_h)))
+	blocks = grid.reshape(grid.shape[0] // factor, factor, grid.shape[1] // factor, factor)
+	return np.bitwise_or.reduce(np.bitwise_or.reduce(blocks, axis=3), axis=1)
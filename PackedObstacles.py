@@ -0,0 +1,563 @@
+#!/usr/bin/python3
+
+## @package PackedObstacles
+#
+# Array-based representation of a list of obstacles, used to compute
+# intersections of many beams with many obstacles in a few batched NumPy
+# operations instead of one Python call per (beam, obstacle) pair.
+#
+
+import numpy as np
+import ObstacleStore
+
+
+## A list of obstacles packed into flat NumPy arrays.
+#
+# Circles and ellipses are stored by their parameters, while rectangles and
+# polygons are broken down into their edges. Every primitive remembers the
+# index (in the original obstacle list) of the obstacle it came from, so
+# results can be reported per obstacle.
+#
+# The packed arrays are a snapshot of the obstacle positions at the time of
+# construction. Obstacles that move must be re-packed before the next query.
+# Circles, rectangles, and ellipses that are in an `ObstacleStore` are packed
+# straight from the store's arrays.
+#
+class PackedObstacles:
+
+	## Constructor
+	#
+	# @param obs_list (list of DynamicObstacle)
+	# <br>	-- The obstacles to pack
+	#
+	def __init__(self, obs_list):
+		self.obstacles = list(obs_list)
+		num_obs = len(self.obstacles)
+
+		circle_idx = []
+		circle_data = []
+		ellipse_idx = []
+		ellipse_data = []
+		rect_idx = []
+		rect_data = []
+		seg_idx = []
+		seg_list = []
+		polygon_seg = []
+
+		# Bounding circle of each obstacle, for cheap culling
+		self.bound_centers = np.zeros((num_obs, 2), dtype=np.float64)
+		self.bound_radii = np.zeros(num_obs, dtype=np.float64)
+
+		store, store_rows = ObstacleStore.get_store_rows(self.obstacles)
+		from_store = store_rows >= 0
+
+		for i, obs in enumerate(self.obstacles):
+			if from_store[i]:
+				continue
+			elif obs.shape == 1:
+				circle_idx.append(i)
+				circle_data.append((obs.coordinate[0], obs.coordinate[1], obs.radius))
+				self.bound_centers[i] = obs.coordinate
+				self.bound_radii[i] = obs.radius
+			elif obs.shape == 2:
+				x, y = obs.coordinate[0], obs.coordinate[1]
+				w, h = obs.size[0], obs.size[1]
+				# Same edge order as Geometry.rectangle_line_intersection
+				corners = np.array([[x, y], [x+w, y], [x+w, y+h], [x, y+h]], dtype=np.float64)
+				seg_list.append(np.hstack((corners, np.roll(corners, -1, axis=0))))
+				seg_idx.append(np.full(4, i))
+				polygon_seg.append(np.zeros(4, dtype=bool))
+				rect_idx.append(i)
+				rect_data.append((x, y, w, h))
+				self.bound_centers[i] = (x + w/2.0, y + h/2.0)
+				self.bound_radii[i] = np.sqrt(w*w + h*h) / 2.0
+			elif obs.shape == 3:
+				vec = obs.get_velocity_vector()
+				angle = np.arctan2(vec[1], vec[0])
+				ellipse_idx.append(i)
+				ellipse_data.append((obs.coordinate[0], obs.coordinate[1], obs.width / 2.0, obs.height / 2.0, angle))
+				self.bound_centers[i] = obs.coordinate
+				self.bound_radii[i] = max(obs.width, obs.height) / 2.0
+			elif obs.shape == 4:
+				vertices = np.array(obs.polygon.get_vertices(), dtype=np.float64)
+				# Same edge order as Polygon.line_intersection
+				seg_list.append(np.hstack((np.roll(vertices, 1, axis=0), vertices)))
+				seg_idx.append(np.full(len(vertices), i))
+				polygon_seg.append(np.ones(len(vertices), dtype=bool))
+				rect = obs.polygon.get_bounding_rectangle()
+				self.bound_centers[i] = (rect[0][0] + rect[1][0]/2.0, rect[0][1] + rect[1][1]/2.0)
+				self.bound_radii[i] = np.sqrt(rect[1][0]**2 + rect[1][1]**2) / 2.0
+
+		self.circle_idx = np.array(circle_idx, dtype=np.intp)
+		self.circles = np.array(circle_data, dtype=np.float64).reshape(-1, 3)
+
+		self.ellipse_idx = np.array(ellipse_idx, dtype=np.intp)
+		self.ellipses = np.array(ellipse_data, dtype=np.float64).reshape(-1, 5)
+
+		self.rect_idx = np.array(rect_idx, dtype=np.intp)
+		self.rects = np.array(rect_data, dtype=np.float64).reshape(-1, 4)
+
+		if len(seg_list) > 0:
+			self.seg_idx = np.concatenate(seg_idx).astype(np.intp)
+			self.segments = np.vstack(seg_list)
+			## Whether each segment is a polygon edge (rather than a
+			# rectangle edge)
+			self.seg_is_polygon = np.concatenate(polygon_seg)
+		else:
+			self.seg_idx = np.zeros(0, dtype=np.intp)
+			self.segments = np.zeros((0, 4), dtype=np.float64)
+			self.seg_is_polygon = np.zeros(0, dtype=bool)
+
+		if np.any(from_store):
+			self._pack_from_store(store, np.flatnonzero(from_store), store_rows[from_store])
+
+		# Where each obstacle's primitives are: its row in `circles` or
+		# `ellipses` (or -1), and its run of rows in `segments`
+		self._circle_of = np.full(num_obs, -1, dtype=np.intp)
+		self._circle_of[self.circle_idx] = np.arange(len(self.circle_idx))
+		self._ellipse_of = np.full(num_obs, -1, dtype=np.intp)
+		self._ellipse_of[self.ellipse_idx] = np.arange(len(self.ellipse_idx))
+		self._seg_start = np.searchsorted(self.seg_idx, np.arange(num_obs))
+		self._seg_count = np.searchsorted(self.seg_idx, np.arange(num_obs), side='right') - self._seg_start
+
+
+	## Packs the circles, rectangles, and ellipses that are in an
+	# `ObstacleStore`, and merges them with the obstacles packed so far,
+	# keeping every array in obstacle order.
+	#
+	# @param store (`ObstacleStore` object)
+	#
+	# @param obs_ids (numpy array of int)
+	# <br>	-- The indices of the obstacles to pack
+	#
+	# @param store_rows (numpy array of int)
+	# <br>	-- The obstacles' rows in `store`
+	#
+	def _pack_from_store(self, store, obs_ids, store_rows):
+		rows = store.get_rows(store_rows)
+		x = rows['positions'][:, 0]
+		y = rows['positions'][:, 1]
+		shapes = rows['shapes']
+
+		sel = shapes == 1
+		circles = np.stack((x[sel], y[sel], rows['radii'][sel]), axis=1)
+		self.circle_idx, self.circles = _merge(self.circle_idx, obs_ids[sel], (self.circles, circles))
+		self.bound_centers[obs_ids[sel]] = rows['positions'][sel]
+		self.bound_radii[obs_ids[sel]] = rows['radii'][sel]
+
+		sel = shapes == 2
+		x, y = x[sel], y[sel]
+		w, h = rows['sizes'][sel, 0], rows['sizes'][sel, 1]
+		# Same edge order as Geometry.rectangle_line_intersection
+		corners = np.stack((np.stack((x, y), axis=1), np.stack((x+w, y), axis=1), np.stack((x+w, y+h), axis=1), np.stack((x, y+h), axis=1)), axis=1)
+		segments = np.concatenate((corners, np.roll(corners, -1, axis=1)), axis=2).reshape(-1, 4)
+		seg_idx = np.repeat(obs_ids[sel], 4)
+		self.rect_idx, self.rects = _merge(self.rect_idx, obs_ids[sel], (self.rects, np.stack((x, y, w, h), axis=1)))
+		self.seg_idx, self.segments, self.seg_is_polygon = _merge(self.seg_idx, seg_idx, (self.segments, segments), (self.seg_is_polygon, np.zeros(len(seg_idx), dtype=bool)))
+		self.bound_centers[obs_ids[sel]] = np.stack((x + w/2.0, y + h/2.0), axis=1)
+		self.bound_radii[obs_ids[sel]] = np.sqrt(w*w + h*h) / 2.0
+
+		sel = shapes == 3
+		velocities = rows['velocities'][sel]
+		widths, heights = rows['widths'][sel], rows['heights'][sel]
+		angles = np.arctan2(velocities[:, 1], velocities[:, 0])
+		ellipses = np.stack((rows['positions'][sel, 0], rows['positions'][sel, 1], widths / 2.0, heights / 2.0, angles), axis=1)
+		self.ellipse_idx, self.ellipses = _merge(self.ellipse_idx, obs_ids[sel], (self.ellipses, ellipses))
+		self.bound_centers[obs_ids[sel]] = rows['positions'][sel]
+		self.bound_radii[obs_ids[sel]] = np.maximum(widths, heights) / 2.0
+
+
+	def __len__(self):
+		return len(self.obstacles)
+
+
+	## Gets a mask of the obstacles whose bounding circle comes within
+	# `radius` of `center`. Obstacles outside the mask cannot intersect
+	# any line segment starting at `center` with length at most `radius`.
+	#
+	# If `obs_ids` is given, only those obstacles are checked, and the
+	# mask has one entry per element of `obs_ids`.
+	#
+	def near_mask(self, center, radius, obs_ids=None):
+		if obs_ids is None:
+			obs_ids = slice(None)
+		diff = self.bound_centers[obs_ids] - np.asarray(center, dtype=np.float64)
+		reach = self.bound_radii[obs_ids] + radius
+		return np.einsum('ij,ij->i', diff, diff) <= reach * reach
+
+
+	## Computes the distance from `origin` to each obstacle along each beam.
+	#
+	# Semantics match `GeometricRadar._obs_dist_along_line()`: the beams
+	# are line segments from `origin` to `origin + beams[j]`, and the
+	# distance is measured to the nearest intersection with the
+	# obstacle's boundary.
+	#
+	# @param origin (numpy array)
+	# <br>	Format: `[x, y]`
+	# <br>	-- The start point of every beam
+	#
+	# @param beams (numpy array)
+	# <br>	Format: `[[dx1, dy1], ..., [dxn, dyn]]`
+	# <br>	-- The beam vectors
+	#
+	# @param obs_mask (numpy array of bool)
+	# <br>	-- Optional mask of which obstacles to test. Distances for
+	# 	obstacles outside the mask are reported as infinite.
+	#
+	# @param obs_ids (numpy array of int)
+	# <br>	-- Optional list of obstacle indices to test. If given, only
+	# 	these obstacles are tested, and row `k` of the result
+	# 	belongs to obstacle `obs_ids[k]`. Overrides `obs_mask`.
+	#
+	# @returns (numpy array)
+	# <br>	Format: `(num_obstacles, num_beams)`
+	# <br>	-- The distance to each obstacle along each beam, or
+	# 	`inf` where the beam does not intersect the obstacle.
+	#
+	def beam_distances(self, origin, beams, obs_mask=None, obs_ids=None):
+		if obs_ids is not None:
+			rows = np.asarray(obs_ids, dtype=np.intp)
+		elif obs_mask is not None:
+			rows = np.flatnonzero(obs_mask)
+		else:
+			rows = np.arange(len(self.obstacles))
+		origins = np.broadcast_to(np.asarray(origin, dtype=np.float64), (len(rows), 2))
+		dists = self.pair_beam_distances(origins, beams, rows)
+		if obs_ids is not None:
+			return dists
+
+		out = np.full((len(self.obstacles), dists.shape[1]), np.inf)
+		out[rows] = dists
+		return out
+
+
+	## Computes the distance along each beam from each of several origins
+	# to an obstacle paired with that origin. This is how scans from many
+	# centers are batched: each center is paired with the obstacles near
+	# it, and all of the pairs are computed at once.
+	#
+	# @param origins (numpy array)
+	# <br>	Format: `[[x1, y1], ..., [xn, yn]]`
+	# <br>	-- The start point of the beams of each pair
+	#
+	# @param beams (numpy array)
+	# <br>	Format: `[[dx1, dy1], ..., [dxm, dym]]`
+	# <br>	-- The beam vectors, shared by all pairs
+	#
+	# @param obs_ids (numpy array of int)
+	# <br>	-- The obstacle of each pair. An obstacle may appear in any
+	# 	number of pairs.
+	#
+	# @returns (numpy array)
+	# <br>	Format: `(num_pairs, num_beams)`
+	# <br>	-- Row `k` holds the distances from `origins[k]` to
+	# 	obstacle `obs_ids[k]`, as in `beam_distances()`.
+	#
+	def pair_beam_distances(self, origins, beams, obs_ids):
+		origins = np.asarray(origins, dtype=np.float64).reshape(-1, 2)
+		beams = np.asarray(beams, dtype=np.float64)
+		obs_ids = np.asarray(obs_ids, dtype=np.intp)
+		beam_lengths = np.sqrt(np.einsum('ij,ij->i', beams, beams))
+		out = np.full((len(obs_ids), beams.shape[0]), np.inf)
+
+		rows = np.flatnonzero(self._circle_of[obs_ids] >= 0)
+		if len(rows) > 0:
+			circles = self.circles[self._circle_of[obs_ids[rows]]]
+			t = _unit_circle_hits((origins[rows] - circles[:, :2]) / circles[:, 2:3], beams[np.newaxis, :, :] / circles[:, 2:3, np.newaxis])
+			out[rows] = t * beam_lengths
+
+		rows = np.flatnonzero(self._ellipse_of[obs_ids] >= 0)
+		if len(rows) > 0:
+			ellipses = self.ellipses[self._ellipse_of[obs_ids[rows]]]
+			# Rotate by -angle and scale by the radii, which maps the
+			# ellipse to the unit circle. The transform is linear, so
+			# the beam parameter at the intersections is unchanged.
+			cosang = np.cos(ellipses[:, 4])[:, np.newaxis]
+			sinang = np.sin(ellipses[:, 4])[:, np.newaxis]
+			rx = ellipses[:, 2:3]
+			ry = ellipses[:, 3:4]
+			rel = origins[rows] - ellipses[:, :2]
+			rel_t = np.stack(((cosang[:, 0]*rel[:, 0] + sinang[:, 0]*rel[:, 1]) / rx[:, 0], (-sinang[:, 0]*rel[:, 0] + cosang[:, 0]*rel[:, 1]) / ry[:, 0]), axis=-1)
+			beams_t = np.stack(((cosang*beams[:, 0] + sinang*beams[:, 1]) / rx, (-sinang*beams[:, 0] + cosang*beams[:, 1]) / ry), axis=-1)
+			t = _unit_circle_hits(rel_t, beams_t)
+			out[rows] = t * beam_lengths
+
+		counts = self._seg_count[obs_ids]
+		rows = np.flatnonzero(counts)
+		if len(rows) > 0:
+			# Expand each pair into the edges of its obstacle, then
+			# reduce each pair's run of edges to its nearest hit
+			counts = counts[rows]
+			firsts = np.cumsum(counts) - counts
+			seg_rows = np.repeat(rows, counts)
+			seg_sel = np.repeat(self._seg_start[obs_ids[rows]] - firsts, counts) + np.arange(len(seg_rows))
+			t = _segment_hits(origins[seg_rows], beams, self.segments[seg_sel])
+			out[rows] = np.minimum.reduceat(t, firsts, axis=0) * beam_lengths
+
+		return out
+
+
+	## Checks which obstacles contain each of the given points.
+	#
+	# Semantics match `GeometricEnvironment.get_obsflags()`: circles and
+	# ellipses are open, rectangles are closed, and polygons use the
+	# even-odd rule of `Polygon.contains_point()`.
+	#
+	# @param points (numpy array)
+	# <br>	Format: `[[x1, y1], ..., [xn, yn]]`
+	#
+	# @param obs_ids (numpy array of int)
+	# <br>	-- Optional list of obstacle indices to test. If given, only
+	# 	these obstacles are tested, and row `k` of the result
+	# 	belongs to obstacle `obs_ids[k]`.
+	#
+	# @returns (numpy array of bool)
+	# <br>	Format: `(num_obstacles, num_points)`
+	#
+	def contains_points(self, points, obs_ids=None):
+		points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+		px = points[np.newaxis, :, 0]
+		py = points[np.newaxis, :, 1]
+
+		row_of = np.arange(len(self.obstacles))
+		obs_mask = None
+		if obs_ids is not None:
+			obs_ids = np.asarray(obs_ids, dtype=np.intp)
+			obs_mask = np.zeros(len(self.obstacles), dtype=bool)
+			obs_mask[obs_ids] = True
+			row_of[obs_ids] = np.arange(len(obs_ids))
+		out = np.zeros((len(self.obstacles) if obs_ids is None else len(obs_ids), points.shape[0]), dtype=bool)
+
+		circle_sel = self._select(self.circle_idx, obs_mask)
+		if len(circle_sel) > 0:
+			circles = self.circles[circle_sel]
+			dx = px - circles[:, 0:1]
+			dy = py - circles[:, 1:2]
+			out[row_of[self.circle_idx[circle_sel]]] = dx*dx + dy*dy < circles[:, 2:3]**2
+
+		ellipse_sel = self._select(self.ellipse_idx, obs_mask)
+		if len(ellipse_sel) > 0:
+			ellipses = self.ellipses[ellipse_sel]
+			cosang = np.cos(ellipses[:, 4:5])
+			sinang = np.sin(ellipses[:, 4:5])
+			dx = px - ellipses[:, 0:1]
+			dy = py - ellipses[:, 1:2]
+			u = (cosang*dx + sinang*dy) / ellipses[:, 2:3]
+			v = (-sinang*dx + cosang*dy) / ellipses[:, 3:4]
+			out[row_of[self.ellipse_idx[ellipse_sel]]] = u*u + v*v < 1
+
+		rect_sel = self._select(self.rect_idx, obs_mask)
+		if len(rect_sel) > 0:
+			rects = self.rects[rect_sel]
+			out[row_of[self.rect_idx[rect_sel]]] = ((rects[:, 0:1] <= px) & (px <= rects[:, 0:1] + rects[:, 2:3])
+				& (rects[:, 1:2] <= py) & (py <= rects[:, 1:2] + rects[:, 3:4]))
+
+		seg_sel = self._select(self.seg_idx, obs_mask)
+		seg_sel = seg_sel[self.seg_is_polygon[seg_sel]]
+		if len(seg_sel) > 0:
+			# Each segment runs from vertex i-1 to vertex i, as in
+			# Polygon.contains_point
+			segments = self.segments[seg_sel]
+			xa, ya = segments[:, 0:1], segments[:, 1:2]
+			xb, yb = segments[:, 2:3], segments[:, 3:4]
+			with np.errstate(invalid='ignore', divide='ignore'):
+				crosses = ((yb > py) != (ya > py)) & (px < (xa - xb) * (py - yb) / (ya - yb) + xb)
+			owners = self.seg_idx[seg_sel]
+			starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+			out[row_of[owners[starts]]] = np.logical_xor.reduceat(crosses, starts, axis=0)
+
+		return out
+
+
+	## Checks which obstacles each of several line segments touches,
+	# either by crossing the obstacle's boundary or by lying inside it.
+	#
+	# @param starts (numpy array)
+	# <br>	Format: `[[x1, y1], ..., [xn, yn]]`
+	# <br>	-- The start point of each segment
+	#
+	# @param ends (numpy array)
+	# <br>	Format: `[[x1, y1], ..., [xn, yn]]`
+	# <br>	-- The end point of each segment
+	#
+	# @param inflate_radius (float)
+	# <br>	-- If positive, the segments are swept by a disk of this
+	# 	radius (e.g., the footprint of a robot), so an obstacle is
+	# 	touched if it comes within `inflate_radius` of a segment.
+	# 	This is exact for circles, rectangles and polygons. Ellipses
+	# 	are scaled up until they contain their inflated shape, so
+	# 	for them the answer may be a false positive, but is never a
+	# 	false negative.
+	#
+	# @param obs_ids (numpy array of int)
+	# <br>	-- Optional list of obstacle indices to test. If given, only
+	# 	these obstacles are tested, and row `k` of the result
+	# 	belongs to obstacle `obs_ids[k]`.
+	#
+	# @returns (numpy array of bool)
+	# <br>	Format: `(num_obstacles, num_segments)`
+	#
+	def segments_touch(self, starts, ends, inflate_radius=0, obs_ids=None):
+		starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+		ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+		a = starts[np.newaxis, :, :]
+		b = ends[np.newaxis, :, :]
+
+		row_of = np.arange(len(self.obstacles))
+		obs_mask = None
+		if obs_ids is not None:
+			obs_ids = np.asarray(obs_ids, dtype=np.intp)
+			obs_mask = np.zeros(len(self.obstacles), dtype=bool)
+			obs_mask[obs_ids] = True
+			row_of[obs_ids] = np.arange(len(obs_ids))
+
+		# Segments that start inside an obstacle touch it, even if they
+		# never cross its boundary
+		out = self.contains_points(starts, obs_ids=obs_ids)
+
+		circle_sel = self._select(self.circle_idx, obs_mask)
+		if len(circle_sel) > 0:
+			circles = self.circles[circle_sel]
+			dist = _point_segment_distances(circles[:, np.newaxis, :2], a, b)
+			out[row_of[self.circle_idx[circle_sel]]] |= dist < circles[:, 2:3] + inflate_radius
+
+		ellipse_sel = self._select(self.ellipse_idx, obs_mask)
+		if len(ellipse_sel) > 0:
+			ellipses = self.ellipses[ellipse_sel]
+			scale = 1.0 + inflate_radius / np.minimum(ellipses[:, 2:3], ellipses[:, 3:4])
+			cosang = np.cos(ellipses[:, 4:5])
+			sinang = np.sin(ellipses[:, 4:5])
+			rx = ellipses[:, 2:3] * scale
+			ry = ellipses[:, 3:4] * scale
+
+			# Map each ellipse to the unit circle at the origin
+			def to_unit(p):
+				dx = p[:, :, 0] - ellipses[:, 0:1]
+				dy = p[:, :, 1] - ellipses[:, 1:2]
+				return np.stack(((cosang*dx + sinang*dy) / rx, (-sinang*dx + cosang*dy) / ry), axis=-1)
+			dist = _point_segment_distances(np.zeros(2), to_unit(a), to_unit(b))
+			out[row_of[self.ellipse_idx[ellipse_sel]]] |= dist < 1
+
+		seg_sel = self._select(self.seg_idx, obs_mask)
+		if len(seg_sel) > 0:
+			edges = self.segments[seg_sel]
+			c = edges[:, np.newaxis, 0:2]
+			d = edges[:, np.newaxis, 2:4]
+			crosses = (_cross(c, d, a) * _cross(c, d, b) < 0) & (_cross(a, b, c) * _cross(a, b, d) < 0)
+			dist = np.minimum(np.minimum(_point_segment_distances(a, c, d), _point_segment_distances(b, c, d)),
+				np.minimum(_point_segment_distances(c, a, b), _point_segment_distances(d, a, b)))
+			touches = crosses | (dist <= inflate_radius)
+			owners = self.seg_idx[seg_sel]
+			starts_idx = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+			out[row_of[owners[starts_idx]]] |= np.logical_or.reduceat(touches, starts_idx, axis=0)
+
+		return out
+
+
+	def _select(self, prim_idx, obs_mask):
+		if obs_mask is None:
+			return np.arange(len(prim_idx))
+		return np.flatnonzero(obs_mask[prim_idx])
+
+
+## Beam parameters of the nearest intersection with the unit circle at the
+# origin, for beams `p + t*d` with `0 <= t <= 1`.
+#
+# `p` has shape `(k, 2)` and `d` has shape `(k, n, 2)`; the result has shape
+# `(k, n)` and is `inf` where there is no intersection. As in
+# `Geometry.circle_line_intersection`, only boundary crossings count, so a
+# beam starting inside the circle hits where it exits.
+#
+def _unit_circle_hits(p, d):
+	a = np.einsum('knj,knj->kn', d, d)
+	b = np.einsum('kj,knj->kn', p, d)
+	c = np.einsum('kj,kj->k', p, p)[:, np.newaxis] - 1.0
+	disc = b*b - a*c
+
+	with np.errstate(invalid='ignore', divide='ignore'):
+		sqrt_disc = np.sqrt(disc)
+		t1 = (-b - sqrt_disc) / a
+		t2 = (-b + sqrt_disc) / a
+
+	valid = (0 <= disc) & (0 < a)
+	t1_ok = valid & (0 <= t1) & (t1 <= 1)
+	t2_ok = valid & (0 <= t2) & (t2 <= 1)
+	return np.where(t1_ok, t1, np.where(t2_ok, t2, np.inf))
+
+
+## Beam parameters of the intersections of each segment with each beam.
+#
+# Uses the same formula as `Geometry.line_line_intersection`, so the results
+# agree with the scalar version, including its treatment of parallel lines
+# and endpoints.
+#
+# `origin` is either the start point of every beam, or has one start point
+# per segment.
+#
+# @returns (numpy array)
+# <br>	Format: `(num_segments, num_beams)`
+#
+def _segment_hits(origin, beams, segments):
+	origin = np.asarray(origin, dtype=np.float64).reshape(-1, 2)
+	s1_x = beams[np.newaxis, :, 0]
+	s1_y = beams[np.newaxis, :, 1]
+	p2_x = segments[:, 0:1]
+	p2_y = segments[:, 1:2]
+	s2_x = segments[:, 2:3] - p2_x
+	s2_y = segments[:, 3:4] - p2_y
+	dx = origin[:, 0:1] - p2_x
+	dy = origin[:, 1:2] - p2_y
+
+	denom = -s2_x * s1_y + s1_x * s2_y
+	with np.errstate(invalid='ignore', divide='ignore'):
+		s = (-s1_y * dx + s1_x * dy) / denom
+		t = (s2_x * dy - s2_y * dx) / denom
+
+	hit = (denom != 0) & (0 <= s) & (s <= 1) & (0 <= t) & (t <= 1)
+	return np.where(hit, t, np.inf)
+
+
+## Distances from points to line segments, broadcasting over the leading
+# dimensions of all three arguments (each with a last dimension of 2).
+#
+def _point_segment_distances(points, a, b):
+	points = np.asarray(points, dtype=np.float64)
+	ab = b - a
+	ap = points - a
+	length_sq = np.sum(ab * ab, axis=-1)
+	with np.errstate(invalid='ignore', divide='ignore'):
+		t = np.where(0 < length_sq, np.sum(ap * ab, axis=-1) / length_sq, 0.0)
+	t = np.clip(t, 0, 1)
+	diff = ap - t[..., np.newaxis] * ab
+	return np.sqrt(np.sum(diff * diff, axis=-1))
+
+
+## The z component of the cross product of `b - a` and `p - a`, i.e. which
+# side of the line through `a` and `b` the point `p` is on.
+#
+def _cross(a, b, p):
+	return (b[..., 0] - a[..., 0]) * (p[..., 1] - a[..., 1]) - (b[..., 1] - a[..., 1]) * (p[..., 0] - a[..., 0])
+
+
+## Merges packed arrays with one row per obstacle (or per primitive of an
+# obstacle) from two sources, ordering the rows by obstacle index. Rows of the
+# same obstacle keep their order.
+#
+# @param idx_a (numpy array of int)
+# <br>	-- The obstacle index of each row of the first source
+#
+# @param idx_b (numpy array of int)
+# <br>	-- The obstacle index of each row of the second source
+#
+# @param arrays (tuples)
+# <br>	Format: `(array_a, array_b)`
+# <br>	-- The arrays to merge
+#
+# @returns (list)
+# <br>	-- The merged obstacle indices, then each merged array
+#
+def _merge(idx_a, idx_b, *arrays):
+	idx = np.concatenate((idx_a, idx_b))
+	order = np.argsort(idx, kind='stable')
+	return [idx[order]] + [np.concatenate(pair)[order] for pair in arrays]
@@ -0,0 +1,231 @@
+#!/usr/bin/python3
+
+## @package PedestrianData
+#
+# Columnar storage of recorded pedestrian trajectories, such as the ETH
+# dataset's `obsmat.txt`.
+#
+# A dataset is a directory of `.npy` files: one per field of a sample (see
+# `COLUMNS`), with the samples of each pedestrian stored one after another,
+# plus `ped_ids.npy` and `offsets.npy`, which say where each pedestrian's
+# samples are (rows `offsets[i]` to `offsets[i+1]` belong to pedestrian
+# `ped_ids[i]`). The columns are memory-mapped when a dataset is loaded, so
+# loading takes about as long as opening the files, and reading one
+# pedestrian only reads that pedestrian's samples.
+#
+# `obsmat.json` (see `obsmat_to_json.py`) is still accepted:
+# `load_obsmat()` converts it the first time it is used and loads the
+# converted dataset from then on.
+#
+
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+
+## The fields of a sample, in the order of the columns
+COLUMNS = ('time', 'pos_x', 'pos_y', 'vel_x', 'vel_y')
+
+
+## A set of pedestrian trajectories, as columns of samples.
+#
+class PedestrianDataset:
+
+	## Constructor
+	#
+	# @param ped_ids (numpy array of int)
+	# <br>	-- The pedestrian IDs, in the order their samples are stored
+	#
+	# @param offsets (numpy array of int)
+	# <br>	-- Where each pedestrian's samples start in the columns, plus
+	# 	the total number of samples at the end
+	#
+	# @param columns (dict)
+	# <br>	-- Maps each name in `COLUMNS` to a numpy array of that
+	# 	field of every sample
+	#
+	def __init__(self, ped_ids, offsets, columns):
+		self.ped_ids = ped_ids
+		self.offsets = offsets
+		self.columns = columns
+		self._index = {ped_id: i for i, ped_id in enumerate(ped_ids.tolist())}
+
+
+	def __len__(self):
+		return len(self.ped_ids)
+
+
+	def __contains__(self, ped_id):
+		return ped_id in self._index
+
+
+	## Gets the samples of a pedestrian.
+	#
+	# @param ped_id (int)
+	#
+	# @returns (dict)
+	# <br>	-- Maps each name in `COLUMNS` to a numpy array of the
+	# 	pedestrian's samples of that field, in time order. The arrays
+	# 	are read-only views of the dataset.
+	#
+	def get_samples(self, ped_id):
+		i = self._index[ped_id]
+		start, end = self.offsets[i], self.offsets[i+1]
+		return {name: column[start:end] for name, column in self.columns.items()}
+
+
+	## Gets one sample of a pedestrian, in the same format as the samples
+	# of `obsmat.json`.
+	#
+	# @param ped_id (int)
+	#
+	# @param sample_num (int)
+	# <br>	-- Index of the sample (negative to count from the end)
+	#
+	# @returns (dict)
+	# <br>	Format: `{'time': t, 'pos_x': x, ...}`
+	#
+	def get_sample(self, ped_id, sample_num):
+		return {name: float(column[sample_num]) for name, column in self.get_samples(ped_id).items()}
+
+
+## Builds a dataset from samples grouped by pedestrian.
+#
+# @param pedestrians (dict)
+# <br>	-- Maps pedestrian IDs to lists of samples, each a dict with the
+# 	fields in `COLUMNS` (as `obsmat.json` holds them). The velocity
+# 	fields may be left out, in which case they are NaN.
+#
+# @returns (`PedestrianDataset` object)
+#
+def from_samples(pedestrians):
+	ped_ids = np.array([int(ped_id) for ped_id in pedestrians], dtype=np.int64)
+	counts = [len(samples) for samples in pedestrians.values()]
+	offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+	columns = dict()
+	for name in COLUMNS:
+		if name in ('vel_x', 'vel_y'):
+			values = [sample.get(name, np.nan) for samples in pedestrians.values() for sample in samples]
+		else:
+			values = [sample[name] for samples in pedestrians.values() for sample in samples]
+		columns[name] = np.array(values, dtype=np.float64)
+	return PedestrianDataset(ped_ids, offsets, columns)
+
+
+## Reads the samples of a raw `obsmat.txt` file.
+#
+# @returns (dict)
+# <br>	-- Maps pedestrian IDs to lists of samples, in the format of
+# 	`from_samples()`
+#
+def read_obsmat_txt(filename):
+	pedestrians = dict()
+	with open(filename, 'r') as f:
+		for line in f.readlines():
+			# Weird line format; vals separated by three spaces, with
+			# three leading spaces before the first val in the line
+			fields = line.split()
+			if len(fields) == 0:
+				continue
+
+			# If this is the first time seeing the pedestrian, add them
+			pedestrian_id = int(float(fields[1]))
+			if pedestrian_id not in pedestrians:
+				pedestrians[pedestrian_id] = []
+
+			# Add the sample
+			pedestrians[pedestrian_id].append({
+				'time':  float(fields[0]),
+				'pos_x': float(fields[2]),
+				'pos_y': float(fields[4]),
+				'vel_x': float(fields[5]),
+				'vel_y': float(fields[7]),
+			})
+
+	# In order of ID, like obsmat.json (see obsmat_to_json.py)
+	return {ped_id: pedestrians[ped_id] for ped_id in sorted(pedestrians)}
+
+
+## Saves a dataset as a directory of `.npy` files. The directory is written
+# under a temporary name and then renamed into place, so that it is never
+# seen half-written. A dataset already at `dirname` is kept, as other
+# processes may be loading it, unless `replace` is true: it is then renamed
+# aside before being deleted.
+#
+# @param dataset (`PedestrianDataset` object)
+#
+# @param dirname (string)
+#
+# @param replace (bool)
+#
+def save_dataset(dataset, dirname, replace=False):
+	parent = os.path.dirname(os.path.abspath(dirname))
+	tmp_dirname = tempfile.mkdtemp(prefix='.tmp-', dir=parent)
+	try:
+		np.save(os.path.join(tmp_dirname, 'ped_ids.npy'), dataset.ped_ids)
+		np.save(os.path.join(tmp_dirname, 'offsets.npy'), dataset.offsets)
+		for name in COLUMNS:
+			np.save(os.path.join(tmp_dirname, name + '.npy'), np.ascontiguousarray(dataset.columns[name], dtype=np.float64))
+		if replace and os.path.isdir(dirname):
+			old_dirname = tmp_dirname + '.old'
+			try:
+				os.rename(dirname, old_dirname)
+			except FileNotFoundError:
+				# Another process replaced it first
+				pass
+			else:
+				shutil.rmtree(old_dirname, ignore_errors=True)
+		os.rename(tmp_dirname, dirname)
+	except OSError:
+		# Another process may have saved the dataset first
+		shutil.rmtree(tmp_dirname, ignore_errors=True)
+		if not os.path.isdir(dirname):
+			raise
+
+
+## Loads a dataset saved by `save_dataset()`, memory-mapping its columns.
+#
+# @param dirname (string)
+#
+# @returns (`PedestrianDataset` object)
+#
+def load_dataset(dirname):
+	def load(name):
+		return np.load(os.path.join(dirname, name + '.npy'), mmap_mode='r')
+	columns = {name: load(name) for name in COLUMNS}
+	return PedestrianDataset(np.array(load('ped_ids')), np.array(load('offsets')), columns)
+
+
+def _is_up_to_date(dirname, json_filename):
+	return os.path.isdir(dirname) and (not os.path.exists(json_filename) or os.path.getmtime(json_filename) <= os.path.getmtime(dirname))
+
+
+## Loads the pedestrians of an `obsmat.json` file, from its columnar
+# version (`obsmat.peds` next to it) if that is up to date. Otherwise, the
+# JSON file is read and converted, and the columnar version is saved for
+# next time if possible.
+#
+# @param json_filename (string)
+#
+# @returns (`PedestrianDataset` object)
+#
+def load_obsmat(json_filename='obsmat.json'):
+	dirname = os.path.splitext(json_filename)[0] + '.peds'
+	if _is_up_to_date(dirname, json_filename):
+		try:
+			return load_dataset(dirname)
+		except (OSError, ValueError):
+			# Being replaced by another process, or unreadable
+			pass
+
+	with open(json_filename, 'r') as f:
+		dataset = from_samples(json.load(f))
+	try:
+		# Another process may have saved it in the meantime
+		save_dataset(dataset, dirname, replace=not _is_up_to_date(dirname, json_filename))
+	except OSError:
+		# The columnar version only makes the next load faster
+		pass
+	return dataset
@@ -92,6 +92,28 @@ class Radar:
 		return None
 
 
+	## Produces a radar scan from each of several center points.
+	#
+	# Subclasses may override this with a batched implementation; the
+	# default just calls `scan()` once per center.
+	#
+	# @param centers (numpy array)
+	# <br>	Format `[[x1, y1], ..., [xn, yn]]`
+	# <br>	-- The center points of the scans
+	#
+	# @returns (numpy array)
+	# <br>	Format: `(num_centers, data_size)`
+	# <br>	-- Row `i` is the radar data for `centers[i]`, in the same
+	# 	format as `scan()`.
+	#
+	def scan_many(self, centers):
+		centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+		radar_data = np.empty([centers.shape[0], self.get_data_size()], dtype=np.float64)
+		for i in range(centers.shape[0]):
+			radar_data[i] = self.scan(centers[i])
+		return radar_data
+
+
 	## Sets the degree step of the `Radar`.
 	#
 	# @param newDegreeStep (float)
@@ -137,6 +159,49 @@ class Radar:
 		return None
 
 
+	## Gets the list of obstacles that the `dynobs_ids` returned by
+	# `scan_full()` refer to.
+	#
+	def get_dynobs_list(self):
+		return self._env.dynamic_obstacles
+
+
+	## Makes a function that looks up the nearest dynamic obstacle at a
+	# given angle, for use as the obstacle getter passed to
+	# `ObstaclePredictor.AbstractObstaclePredictor.add_observation()`.
+	#
+	# @param center (numpy array)
+	# <br>	Format `[x, y]`
+	# <br>	-- The center point of the scan
+	#
+	# @param dynobs_ids (numpy array)
+	# <br>	-- The `dynobs_ids` returned by `scan_full()`. If `None`,
+	# 	the obstacles are found with `get_dynobs_at_angle()`
+	# 	instead.
+	#
+	# @returns (function)
+	# <br>	-- A function taking an angle (in degrees) and returning the
+	# 	nearest `DynamicObstacle` along the beam at that angle, or
+	# 	`None`.
+	#
+	def get_dynobs_getter(self, center, dynobs_ids):
+		if dynobs_ids is None:
+			return self._get_dynobs_at_angle_getter(center)
+		dynobs_list = self.get_dynobs_list()
+		def getter(angle):
+			obs_id = dynobs_ids[int(np.round(angle / self.get_degree_step())) % len(dynobs_ids)]
+			return dynobs_list[obs_id] if 0 <= obs_id else None
+		return getter
+
+
+	## Makes the obstacle getter that `get_dynobs_getter()` falls back to
+	# when there are no `dynobs_ids`, which looks up each obstacle with
+	# `get_dynobs_at_angle()`.
+	#
+	def _get_dynobs_at_angle_getter(self, center):
+		return lambda angle: self.get_dynobs_at_angle(center, angle)
+
+
 	## Gets the `DynamicObstacle` object corresponding to the nearest
 	# dynamic obstacle along the beam at the specified angle.
 	#
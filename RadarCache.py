@@ -0,0 +1,176 @@
+#!/usr/bin/python3
+
+## @package RadarCache
+#
+
+import numpy as np
+import threading
+
+
+## Caches the results of radar scans for the current environment step.
+#
+# Within one step of the simulation, the same location is often scanned
+# several times (e.g., by a planner, by the `StaticMapper`, by a local and
+# a global planner, and again by `Robot.draw()`). `CachedRadar` wraps a
+# `Radar` or `RadarSensor` and remembers the result of each scan, so that
+# repeated scans with the same arguments are free.
+#
+# The cache is keyed on the method, its arguments (the center point, the
+# cell type or the obstacle list), and the state of the environment. The
+# environment state is the counter from `Environment.get_state_version()`
+# together with the positions of the robots (which can be obstacles for a
+# `RadarSensor`, and which move during a step), so the cache is cleared
+# automatically when either changes.
+#
+# Attributes and methods that are not cached are passed through to the
+# wrapped radar, so a `CachedRadar` can be used anywhere the wrapped radar
+# can.
+#
+# Scans may be requested from several threads at once (e.g., from a
+# `concurrent.futures.ThreadPoolExecutor`). The cache itself is guarded by a
+# lock, but the scans are computed outside of it, so they can run in
+# parallel when the wrapped radar releases the GIL.
+#
+class CachedRadar:
+
+	## Constructor
+	#
+	# @param radar (`Radar` or `RadarSensor` object)
+	# <br>	-- The radar to wrap
+	#
+	# @param env (`Environment` object)
+	# <br>	-- The environment, used to detect when cached scans are
+	# 	out of date. Defaults to the environment of `radar`.
+	#
+	def __init__(self, radar, env=None):
+		self._radar = radar
+		self._env = env if env is not None else radar._env
+		self._cache = {}
+		self._cache_state = None
+		self._lock = threading.Lock()
+
+		## Number of scans answered from the cache
+		self.hits = 0
+
+		## Number of scans that had to be computed
+		self.misses = 0
+
+
+	def __getattr__(self, name):
+		return getattr(self._radar, name)
+
+
+	@property
+	def radius(self):
+		return self._radar.radius
+
+	@radius.setter
+	def radius(self, value):
+		self._radar.radius = value
+		self.clear()
+
+
+	## Sets the degree step of the wrapped radar. This changes the
+	# format of the scans, so the cache is cleared.
+	#
+	def set_degree_step(self, newDegreeStep):
+		self._radar.set_degree_step(newDegreeStep)
+		self.clear()
+
+
+	## Empties the cache (the hit and miss counters are kept).
+	#
+	def clear(self):
+		with self._lock:
+			self._cache = {}
+			self._cache_state = None
+
+
+	## Resets the hit and miss counters to zero.
+	#
+	def reset_stats(self):
+		self.hits = 0
+		self.misses = 0
+
+
+	def scan(self, *args, **kwargs):
+		return self._cached_call('scan', args, kwargs)
+
+
+	def scan_dynamic_obstacles(self, *args, **kwargs):
+		return self._cached_call('scan_dynamic_obstacles', args, kwargs)
+
+
+	def scan_full(self, *args, **kwargs):
+		return self._cached_call('scan_full', args, kwargs)
+
+
+	def scan_many(self, *args, **kwargs):
+		return self._cached_call('scan_many', args, kwargs)
+
+
+	def scan_obstacles_list(self, *args, **kwargs):
+		return self._cached_call('scan_obstacles_list', args, kwargs)
+
+
+	def scan_obstacles_list_many(self, *args, **kwargs):
+		return self._cached_call('scan_obstacles_list_many', args, kwargs)
+
+
+	def scan_obstacles_lists(self, *args, **kwargs):
+		return self._cached_call('scan_obstacles_lists', args, kwargs)
+
+
+	def scan_obstacles_lists_many(self, *args, **kwargs):
+		return self._cached_call('scan_obstacles_lists_many', args, kwargs)
+
+
+	def _env_state(self):
+		return (self._env.get_state_version(), tuple((robot.location[0], robot.location[1]) for robot in self._env.robots))
+
+
+	def _cached_call(self, method_name, args, kwargs):
+		state = self._env_state()
+		key = (method_name, _freeze(args), _freeze(sorted(kwargs.items())))
+		with self._lock:
+			if state != self._cache_state:
+				self._cache = {}
+				self._cache_state = state
+			if key in self._cache:
+				self.hits += 1
+				result = self._cache[key]
+			else:
+				self.misses += 1
+				result = None
+
+		if result is None:
+			result = getattr(self._radar, method_name)(*args, **kwargs)
+			with self._lock:
+				if state == self._cache_state:
+					self._cache[key] = result
+
+		# Callers are free to modify the scans they get back, so
+		# never hand out the cached arrays themselves
+		return _copy_result(result)
+
+
+## Converts scan arguments to a hashable cache key. Arrays and sequences are
+# compared by value, while other objects (e.g., obstacles) are compared by
+# identity.
+#
+def _freeze(value):
+	if isinstance(value, np.ndarray):
+		return (value.shape, value.dtype.str, value.tobytes())
+	if isinstance(value, (list, tuple)):
+		return tuple(_freeze(v) for v in value)
+	if value is None or isinstance(value, (int, float, str, np.number)):
+		return value
+	return id(value)
+
+
+def _copy_result(result):
+	if isinstance(result, np.ndarray):
+		return result.copy()
+	if isinstance(result, tuple):
+		return tuple(_copy_result(r) for r in result)
+	return result
@@ -9,6 +9,7 @@ import Vector
 import Geometry
 import cython
 from GeometricRadar import GeometricRadar
+from Radar import Radar
 
 
 ## Wrapper for GeometricRadar, to allow for opaque robots (i.e., so the scan
@@ -16,9 +17,11 @@ from GeometricRadar import GeometricRadar
 # of relying on the caller specify it.
 #
 # Many of the methods in this class are simple wrappers around methods in Radar
-# or GeometricRadar, so see the documentation for those for more info.
+# or GeometricRadar, so see the documentation for those for more info. Methods
+# that only depend on other methods (such as `get_dynobs_getter()`) are
+# inherited from Radar.
 #
-class RadarSensor:
+class RadarSensor(Radar):
 	## Constructor.
 	#
 	# @param robot
@@ -49,8 +52,30 @@ class RadarSensor:
 		return [other_robot.get_obstacle() for other_robot in self._other_robots if other_robot.get_obstacle() is not None]
 
 
+	## Scans the environment's obstacles and the other robots. The
+	# environment's dynamic obstacles are passed to the radar as the
+	# environment's own list, so it can reuse their packing for the step
+	# (see `GeometricEnvironment.get_dynamic_packed()`), and the other
+	# robots are scanned separately.
+	#
 	def scan(self, *args):
-		return self.scan_obstacles_list(self._env.dynamic_obstacles + self._env.static_obstacles + self._robot_obs_list())
+		center = self._robot.location
+		radar_data = self._radar.scan_obstacles_lists(center, self._env.dynamic_obstacles, self._env.static_obstacles)
+		robot_obs_list = self._robot_obs_list()
+		if len(robot_obs_list) == 0:
+			return radar_data
+		return np.minimum(radar_data, self._radar.scan_obstacles_list(center, robot_obs_list))
+
+
+	## Scans from each of the given center points, picking up the same
+	# obstacles (including other robots) as `scan()`.
+	#
+	def scan_many(self, centers):
+		radar_data = self._radar.scan_obstacles_lists_many(centers, self._env.dynamic_obstacles, self._env.static_obstacles)
+		robot_obs_list = self._robot_obs_list()
+		if len(robot_obs_list) == 0:
+			return radar_data
+		return np.minimum(radar_data, self._radar.scan_obstacles_list_many(centers, robot_obs_list))
 
 
 	@property
@@ -62,6 +87,12 @@ class RadarSensor:
 		self._radar.radius = value
 
 
+	## Sets the degree step of the underlying Radar
+	#
+	def set_degree_step(self, newDegreeStep):
+		self._radar.set_degree_step(newDegreeStep);
+
+
 	## Gets the degree step of the underlying Radar
 	#
 	def get_degree_step(self):
@@ -76,7 +107,43 @@ class RadarSensor:
 
 
 	def scan_dynamic_obstacles(self, *args, **kwargs):
-		return self.scan_obstacles_list(self._env.dynamic_obstacles + self._robot_obs_list())
+		radar_data = self.scan_obstacles_list(self._env.dynamic_obstacles)
+		robot_obs_list = self._robot_obs_list()
+		if len(robot_obs_list) == 0:
+			return radar_data
+		return np.minimum(radar_data, self.scan_obstacles_list(robot_obs_list))
+
+
+	## Produces the combined, dynamic-only, and static-only scans in one
+	# pass. Other robots count as dynamic obstacles, and the returned
+	# `dynobs_ids` index into `get_dynobs_list()`.
+	#
+	def scan_full(self, *args):
+		center = self._robot.location
+		radar_data, dynamic_radar_data, static_radar_data, dynobs_ids = self._radar.scan_full_obstacles_lists(center, self._env.dynamic_obstacles, self._env.static_obstacles)
+		robot_obs_list = self._robot_obs_list()
+		if len(robot_obs_list) == 0:
+			return radar_data, dynamic_radar_data, static_radar_data, dynobs_ids
+
+		_, robot_radar_data, _, robot_ids = self._radar.scan_full_obstacles_lists(center, robot_obs_list, [])
+		# On ties the environment's obstacle comes first, as it does in
+		# `get_dynobs_list()`
+		closer = robot_radar_data < dynamic_radar_data
+		dynobs_ids[closer] = robot_ids[closer] + len(self._env.dynamic_obstacles)
+		dynamic_radar_data = np.minimum(dynamic_radar_data, robot_radar_data)
+		radar_data = np.minimum(radar_data, robot_radar_data)
+		return radar_data, dynamic_radar_data, static_radar_data, dynobs_ids
+
+
+	def get_dynobs_list(self):
+		return self._env.dynamic_obstacles + self._robot_obs_list()
+
+
+	## The scans are always centered on the robot, so obstacles are looked
+	# up with `get_dynobs_at_angle()` from the robot's location.
+	#
+	def _get_dynobs_at_angle_getter(self, center):
+		return self.get_dynobs_at_angle
 
 
 	def scan_static_obstacles_one_by_one(self):
@@ -0,0 +1,157 @@
+#!/usr/bin/python3
+
+## @package Rasterizer
+#
+# Stamps obstacle shapes directly into occupancy grids, without drawing them.
+#
+# Grid cell `(x, y)` is covered by a shape if the center of the cell,
+# `(x + 0.5, y + 0.5)`, is inside the shape. Each function ORs `value` into
+# the covered cells and only touches the cells within the shape's bounding
+# box, so the cost depends on the size of the shape rather than the size of
+# the grid. Parts of a shape that fall outside the grid are ignored.
+#
+
+import numpy as np
+
+
+## Stamps a `DynamicObstacle` into a grid, using the same geometry as
+# `GeometricEnvironment.get_obsflags()`.
+#
+# @param grid (numpy array)
+# <br>	Format: `(width, height)`
+# <br>	-- The grid to modify
+#
+# @param obs (`DynamicObstacle` object)
+# <br>	-- The obstacle to stamp
+#
+# @param value (int)
+# <br>	-- The bits to set in the covered cells
+#
+# @param coordinate (numpy array)
+# <br>	Format: `[x, y]`
+# <br>	-- If given, the obstacle is stamped as if it were here instead of
+# 	at its `coordinate` (e.g., to stamp where it will be later)
+#
+# @param velocity (numpy array)
+# <br>	Format: `[dx, dy]`
+# <br>	-- If given, used instead of the obstacle's velocity to orient
+# 	ellipses
+#
+def stamp_obstacle(grid, obs, value, coordinate=None, velocity=None):
+	if coordinate is None:
+		coordinate = obs.coordinate
+	if obs.shape == 1:
+		fill_circle(grid, coordinate, obs.radius, value)
+	elif obs.shape == 2:
+		fill_rect(grid, coordinate, obs.size, value)
+	elif obs.shape == 3:
+		vec = obs.get_velocity_vector() if velocity is None else velocity
+		fill_ellipse(grid, coordinate, obs.width, obs.height, np.arctan2(vec[1], vec[0]), value)
+	elif obs.shape == 4:
+		fill_polygon(grid, obs.polygon.get_vertices(), value)
+
+
+## Gets the window of grid cells overlapping a bounding box, and the
+# coordinates of the centers of those cells.
+#
+# @returns (tuple)
+# <br>	Format: `(window, px, py)`
+# <br>	-- `window` is a view into `grid` (or `None` if the box misses
+# 	the grid), and `px` and `py` are broadcastable arrays of the
+# 	cell-center coordinates for it.
+#
+def _window(grid, xmin, ymin, xmax, ymax):
+	x0 = max(0, int(np.floor(xmin)))
+	y0 = max(0, int(np.floor(ymin)))
+	x1 = min(grid.shape[0], int(np.ceil(xmax)) + 1)
+	y1 = min(grid.shape[1], int(np.ceil(ymax)) + 1)
+	if x1 <= x0 or y1 <= y0:
+		return None, None, None
+	px = np.arange(x0, x1)[:, np.newaxis] + 0.5
+	py = np.arange(y0, y1)[np.newaxis, :] + 0.5
+	return grid[x0:x1, y0:y1], px, py
+
+
+## Stamps a circle into a grid.
+#
+# @param center (numpy array)
+# <br>	Format: `[x, y]`
+#
+# @param radius (float)
+#
+def fill_circle(grid, center, radius, value):
+	window, px, py = _window(grid, center[0] - radius, center[1] - radius, center[0] + radius, center[1] + radius)
+	if window is None:
+		return
+	window[(px - center[0])**2 + (py - center[1])**2 < radius * radius] |= value
+
+
+## Stamps an axis-aligned rectangle into a grid.
+#
+# @param corner (numpy array)
+# <br>	Format: `[x, y]`
+# <br>	-- The corner with the lowest coordinates
+#
+# @param size (numpy array)
+# <br>	Format: `[width, height]`
+#
+def fill_rect(grid, corner, size, value):
+	window, px, py = _window(grid, corner[0], corner[1], corner[0] + size[0], corner[1] + size[1])
+	if window is None:
+		return
+	# Closed on all sides, as in `Geometry.point_inside_rectangle()`
+	inside_x = (corner[0] <= px) & (px <= corner[0] + size[0])
+	inside_y = (corner[1] <= py) & (py <= corner[1] + size[1])
+	window[inside_x & inside_y] |= value
+
+
+## Stamps a rotated ellipse into a grid.
+#
+# @param center (numpy array)
+# <br>	Format: `[x, y]`
+#
+# @param width (float)
+# <br>	-- The diameter along the direction given by `angle`
+#
+# @param height (float)
+# <br>	-- The diameter perpendicular to `angle`
+#
+# @param angle (float)
+# <br>	-- The angle of the `width` axis, in radians
+#
+def fill_ellipse(grid, center, width, height, angle, value):
+	r = max(width, height) / 2.0
+	window, px, py = _window(grid, center[0] - r, center[1] - r, center[0] + r, center[1] + r)
+	if window is None:
+		return
+	dx = px - center[0]
+	dy = py - center[1]
+	u = (dx * np.cos(angle) + dy * np.sin(angle)) / (width / 2.0)
+	v = (dy * np.cos(angle) - dx * np.sin(angle)) / (height / 2.0)
+	window[u*u + v*v < 1] |= value
+
+
+## Stamps a polygon into a grid, using the even-odd rule (the same as
+# `Polygon.contains_point()`).
+#
+# @param vertices (numpy array)
+# <br>	Format: `[[x1, y1], ..., [xn, yn]]`
+#
+def fill_polygon(grid, vertices, value):
+	vertices = np.asarray(vertices, dtype=np.float64)
+	lo = np.min(vertices, axis=0)
+	hi = np.max(vertices, axis=0)
+	window, px, py = _window(grid, lo[0], lo[1], hi[0], hi[1])
+	if window is None:
+		return
+	inside = np.zeros(window.shape, dtype=bool)
+	for i in range(len(vertices)):
+		xa, ya = vertices[i]
+		xb, yb = vertices[i-1]
+		if ya == yb:
+			continue
+		# Cells whose centers are left of where the edge crosses their row
+		crosses = (ya > py) != (yb > py)
+		x_cross = xa + (xb - xa) * (py - ya) / (yb - ya)
+		inside ^= crosses & (px < x_cross)
+	window[inside] |= value
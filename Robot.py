@@ -128,12 +128,45 @@ class Robot:
 
 	def set_obstacle(self, obstacle):
 		self._obstacle = obstacle
+		self._env.collision_broadphase.update_robot(self)
 
 
 	def get_stats(self):
 		return self.stats
 
 
+	## Gets the state of this robot's motion and statistics, for
+	# `Environment.snapshot()`. The state of the navigation algorithm and
+	# sensors is not included.
+	#
+	# @returns (tuple)
+	# <br>	-- The location (first), and anything else `set_state()`
+	# 	needs to put the robot back where it is now
+	#
+	def get_state(self):
+		stats = (self.stats.num_static_collisions, self.stats.num_dynamic_collisions, self.stats.num_steps, len(self.stats.decision_times))
+		counters = (self.stepNum, self._last_collision_step, self._drawcoll, self._current_speed, self._movement_ang, len(self._visited_points))
+		obstacle_state = self._obstacle.get_state() if self._obstacle is not None else None
+		return (np.array(self.location, dtype=np.float64), np.array(self._last_mmv), counters, stats, obstacle_state)
+
+
+	## Puts this robot back into a state from `get_state()`. Points
+	# visited and decision times recorded since then are dropped.
+	#
+	def set_state(self, state):
+		location, last_mmv, counters, stats, obstacle_state = state
+		self.location = np.array(location)
+		self._last_mmv = np.array(last_mmv)
+		self.stepNum, self._last_collision_step, self._drawcoll, self._current_speed, self._movement_ang, num_visited_points = counters
+		# The lists are trimmed in place, since debug_info refers to
+		# them
+		del self._visited_points[num_visited_points:]
+		self.stats.num_static_collisions, self.stats.num_dynamic_collisions, self.stats.num_steps, num_decision_times = stats
+		del self.stats.decision_times[num_decision_times:]
+		if self._obstacle is not None and obstacle_state is not None:
+			self._obstacle.set_state(obstacle_state)
+
+
 	## Does one step of the robot's navigation.
 	#
 	# This function uses radar and location information to make a
@@ -175,7 +208,7 @@ class Robot:
 		self.location = np.add(self.location, movement_vec)
 
 		if self._obstacle is not None:
-			self._obstacle.next_step(1)
+			self._move_obstacle()
 
 		collision_flags = self._compute_collision_flags()
 		if (collision_flags & ObsFlag.ANY_OBSTACLE):
@@ -190,7 +223,7 @@ class Robot:
 			self.location = np.add(self.location, -movement_vec*1.01 + np.random.uniform(-movement_vec_len*0.007, movement_vec_len*0.007, size=2));
 
 			if self._obstacle is not None:
-				self._obstacle.next_step(1)
+				self._move_obstacle()
 
 		self._visited_points.append(np.array(self.location))
 
@@ -205,19 +238,22 @@ class Robot:
 
 		flags = 0
 
-		if self._collides_with_obstacle_list(self._env.dynamic_obstacles):
+		# Only the obstacles and robots near this robot's body can
+		# touch it
+		broadphase = self._env.collision_broadphase
+		center = self._obstacle.coordinate
+		radius = self._obstacle.radius
+		box = (center[0] - radius, center[1] - radius, center[0] + radius, center[1] + radius)
+
+		if self._collides_with_obstacle_list(broadphase.dynamic_obstacles_in_box(box)):
 			flags = flags | ObsFlag.DYNAMIC_OBSTACLE
 			flags = flags | ObsFlag.ANY_OBSTACLE
 
-		if self._collides_with_obstacle_list(self._env.static_obstacles):
+		if self._collides_with_obstacle_list(broadphase.static_obstacles_in_box(box)):
 			flags = flags | ObsFlag.STATIC_OBSTACLE
 			flags = flags | ObsFlag.ANY_OBSTACLE
 
-		robo_obstacles = []
-		for robot in self._env.robots:
-			if robot == self or robot._obstacle is None:
-				continue
-			robo_obstacles.append(robot._obstacle)
+		robo_obstacles = [robot._obstacle for robot in broadphase.robots_in_box(box, robot=self)]
 
 		if self._collides_with_obstacle_list(robo_obstacles):
 			flags = flags | ObsFlag.ROBOT_OBSTACLE
@@ -227,6 +263,14 @@ class Robot:
 		return flags
 
 
+	## Moves this robot's _obstacle to where the robot is, and tells the
+	# environment's collision broadphase.
+	#
+	def _move_obstacle(self):
+		self._obstacle.next_step(1)
+		self._env.collision_broadphase.update_robot(self)
+
+
 	## Checks if this robot's _obstacle collides with any of the obstacles
 	# in the given list.
 	#
@@ -0,0 +1,317 @@
+#!/usr/bin/python3
+
+## @package SpatialIndex
+#
+# Acceleration structures for queries against the obstacles of a map.
+#
+
+import numpy as np
+import ObstacleStore
+from PackedObstacles import PackedObstacles, _segment_hits
+
+
+## A uniform grid over a (fixed) list of obstacles.
+#
+# Each grid cell holds the indices of the obstacles whose bounding box
+# overlaps the cell, and the indices of the polygon/rectangle edges whose
+# bounding box overlaps the cell. Queries then only need to look at the
+# obstacles and edges in the cells they touch, so their cost depends on how
+# much geometry is near the query rather than on the size of the whole map.
+#
+# The obstacles are assumed not to move; the index must be rebuilt if they
+# do. It is meant for static obstacles, and is built once when the map is
+# loaded (see `GeometricEnvironment.get_static_index()`).
+#
+class SpatialIndex:
+
+	## Constructor
+	#
+	# @param obs_list (list of DynamicObstacle)
+	# <br>	-- The obstacles to index
+	#
+	# @param cell_size (float)
+	# <br>	-- The side length of a grid cell
+	#
+	def __init__(self, obs_list, cell_size=40):
+		## The list the index was built from
+		self.source = obs_list
+		self.obstacles = list(obs_list)
+		self.cell_size = float(cell_size)
+
+		## The obstacles, packed for batched intersection tests
+		self.packed = PackedObstacles(self.obstacles)
+
+		self.bounding_boxes = np.array([_bounding_box(obs) for obs in self.obstacles], dtype=np.float64).reshape(-1, 4)
+		segments = self.packed.segments
+		seg_boxes = np.column_stack((np.minimum(segments[:, 0], segments[:, 2]),
+			np.minimum(segments[:, 1], segments[:, 3]),
+			np.maximum(segments[:, 0], segments[:, 2]),
+			np.maximum(segments[:, 1], segments[:, 3])))
+
+		if len(self.obstacles) == 0:
+			self._origin = np.zeros(2)
+			self._shape = (1, 1)
+		else:
+			self._origin = np.floor(np.min(self.bounding_boxes[:, :2], axis=0))
+			extent = np.max(self.bounding_boxes[:, 2:], axis=0) - self._origin
+			self._shape = tuple(np.maximum(1, np.floor(extent / self.cell_size).astype(int) + 1))
+
+		self._obs_cells = self._bucket(self.bounding_boxes)
+		self._edge_cells = self._bucket(seg_boxes)
+
+		# Obstacles that are not made of edges (circles and ellipses)
+		self._is_curved = np.zeros(len(self.obstacles), dtype=bool)
+		self._is_curved[self.packed.circle_idx] = True
+		self._is_curved[self.packed.ellipse_idx] = True
+
+
+	def __len__(self):
+		return len(self.obstacles)
+
+
+	## Puts each box into every cell that it overlaps. Boxes are padded
+	# slightly, so that geometry lying exactly on a cell boundary is
+	# found from either side.
+	#
+	def _bucket(self, boxes):
+		buckets = [[] for i in range(self._shape[0] * self._shape[1])]
+		pad = 1e-6 * self.cell_size
+		lo = self._cell_coords(boxes[:, :2] - pad)
+		hi = self._cell_coords(boxes[:, 2:] + pad)
+		for i in range(boxes.shape[0]):
+			for cx in range(lo[i, 0], hi[i, 0] + 1):
+				for cy in range(lo[i, 1], hi[i, 1] + 1):
+					buckets[cx * self._shape[1] + cy].append(i)
+		return [np.array(bucket, dtype=np.intp) for bucket in buckets]
+
+
+	def _cell_coords(self, points):
+		cells = np.floor((np.asarray(points, dtype=np.float64) - self._origin) / self.cell_size).astype(int)
+		return np.clip(cells, 0, np.array(self._shape) - 1)
+
+
+	def _gather(self, buckets, cell_ids):
+		if len(cell_ids) == 0:
+			return np.zeros(0, dtype=np.intp)
+		return np.unique(np.concatenate([buckets[c] for c in cell_ids]))
+
+
+	## Gets the indices of the obstacles whose bounding boxes may overlap
+	# the given axis-aligned box.
+	#
+	# @returns (numpy array)
+	# <br>	-- Sorted indices into `obstacles`
+	#
+	def obstacle_ids_in_box(self, xmin, ymin, xmax, ymax):
+		if xmax < self._origin[0] or ymax < self._origin[1]:
+			return np.zeros(0, dtype=np.intp)
+		lo = self._cell_coords([xmin, ymin])
+		hi = self._cell_coords([xmax, ymax])
+		cell_ids = [cx * self._shape[1] + cy for cx in range(lo[0], hi[0] + 1) for cy in range(lo[1], hi[1] + 1)]
+		ids = self._gather(self._obs_cells, cell_ids)
+		boxes = self.bounding_boxes[ids]
+		return ids[(boxes[:, 0] <= xmax) & (xmin <= boxes[:, 2]) & (boxes[:, 1] <= ymax) & (ymin <= boxes[:, 3])]
+
+
+	## Gets the indices of the obstacles that may come within `radius`
+	# of `center`.
+	#
+	def obstacle_ids_near(self, center, radius):
+		return self.obstacle_ids_in_box(center[0] - radius, center[1] - radius, center[0] + radius, center[1] + radius)
+
+
+	## Gets the obstacles whose bounding box contains `point`. These are
+	# the only obstacles that can contain the point.
+	#
+	def obstacles_at(self, point):
+		return [self.obstacles[i] for i in self.obstacle_ids_in_box(point[0], point[1], point[0], point[1])]
+
+
+	## Checks whether the line segment intersects the boundary of any of
+	# the indexed obstacles. This gives the same result as checking
+	# `GeometricRadar._obs_dist_along_line()` against every obstacle, but
+	# only tests the edges and obstacles in the grid cells that the
+	# segment passes through.
+	#
+	# @param line (list of numpy array)
+	# <br>	Format: `[[x1, y1], [x2, y2]]`
+	# <br>	-- The segment to check
+	#
+	def segment_intersects(self, line):
+		p1 = np.asarray(line[0], dtype=np.float64)
+		p2 = np.asarray(line[1], dtype=np.float64)
+		cell_ids = self._cells_on_segment(p1, p2)
+		if len(cell_ids) == 0:
+			return False
+		direction = (p2 - p1)[np.newaxis, :]
+
+		edge_ids = self._gather(self._edge_cells, cell_ids)
+		if 0 < len(edge_ids) and np.any(np.isfinite(_segment_hits(p1, direction, self.packed.segments[edge_ids]))):
+			return True
+
+		curved_ids = self._gather(self._obs_cells, cell_ids)
+		curved_ids = curved_ids[self._is_curved[curved_ids]]
+		if 0 < len(curved_ids) and np.any(np.isfinite(self.packed.beam_distances(p1, direction, obs_ids=curved_ids))):
+			return True
+
+		return False
+
+
+	## Gets the cells that a line segment passes through, using the
+	# traversal of Amanatides and Woo. The segment is first clipped to
+	# the grid, since cells outside it are empty.
+	#
+	def _cells_on_segment(self, p1, p2):
+		lo = self._origin
+		hi = self._origin + np.array(self._shape) * self.cell_size
+		d = p2 - p1
+
+		# Clip to the grid (Liang-Barsky)
+		t0, t1 = 0.0, 1.0
+		for axis in range(2):
+			if d[axis] == 0:
+				if p1[axis] < lo[axis] or hi[axis] < p1[axis]:
+					return []
+				continue
+			ta = (lo[axis] - p1[axis]) / d[axis]
+			tb = (hi[axis] - p1[axis]) / d[axis]
+			t0 = max(t0, min(ta, tb))
+			t1 = min(t1, max(ta, tb))
+		if t1 < t0:
+			return []
+
+		start = p1 + t0 * d
+		cell = self._cell_coords(start)
+		last = self._cell_coords(p1 + t1 * d)
+		step = np.sign(d).astype(int)
+		t_max = np.full(2, np.inf)
+		t_delta = np.full(2, np.inf)
+		for axis in range(2):
+			if d[axis] != 0:
+				boundary = lo[axis] + (cell[axis] + (step[axis] > 0)) * self.cell_size
+				t_max[axis] = t0 + (boundary - start[axis]) / d[axis]
+				t_delta[axis] = self.cell_size / abs(d[axis])
+
+		cells = [cell[0] * self._shape[1] + cell[1]]
+		while not (cell[0] == last[0] and cell[1] == last[1]) and len(cells) <= self._shape[0] + self._shape[1]:
+			axis = 0 if t_max[0] < t_max[1] else 1
+			cell[axis] += step[axis]
+			if cell[axis] < 0 or self._shape[axis] <= cell[axis]:
+				break
+			t_max[axis] += t_delta[axis]
+			cells.append(cell[0] * self._shape[1] + cell[1])
+		return cells
+
+
+## A uniform grid over a set of axis-aligned boxes, for finding which boxes
+# may overlap a query box.
+#
+# Unlike `SpatialIndex`, it only holds the boxes, and the cells are built
+# with a few vectorized operations rather than one list per cell, so it is
+# cheap enough to rebuild every step for obstacles that move (see
+# `CollisionBroadphase`).
+#
+class BoxGrid:
+
+	## Constructor
+	#
+	# @param boxes (numpy array)
+	# <br>	Format: `[[xmin, ymin, xmax, ymax], ...]`
+	#
+	# @param cell_size (float)
+	# <br>	-- The side length of a grid cell. It is increased if the
+	# 	boxes are spread out so far that the grid would have more
+	# 	than `max_cells` cells per side.
+	#
+	def __init__(self, boxes, cell_size=40, max_cells=256):
+		self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+		num_boxes = len(self.boxes)
+		if num_boxes == 0:
+			self._origin = np.zeros(2)
+			self._shape = (1, 1)
+			self.cell_size = float(cell_size)
+		else:
+			self._origin = np.floor(np.min(self.boxes[:, :2], axis=0))
+			extent = np.max(self.boxes[:, 2:], axis=0) - self._origin
+			self.cell_size = max(float(cell_size), float(np.max(extent)) / max_cells)
+			self._shape = tuple(np.maximum(1, np.floor(extent / self.cell_size).astype(int) + 1))
+
+		# Each box is listed in every cell that it overlaps, with the
+		# entries sorted by cell. The boxes are padded slightly, as in
+		# `SpatialIndex._bucket()`.
+		pad = 1e-6 * self.cell_size
+		lo = self._cell_coords(self.boxes[:, :2] - pad)
+		hi = self._cell_coords(self.boxes[:, 2:] + pad)
+		heights = hi[:, 1] - lo[:, 1] + 1
+		counts = (hi[:, 0] - lo[:, 0] + 1) * heights
+		box_ids = np.repeat(np.arange(num_boxes), counts)
+		k = np.arange(len(box_ids)) - np.repeat(np.cumsum(counts) - counts, counts)
+		cells = (lo[box_ids, 0] + k // heights[box_ids]) * self._shape[1] + lo[box_ids, 1] + k % heights[box_ids]
+		order = np.argsort(cells, kind='stable')
+		self._box_ids = box_ids[order]
+		self._cell_starts = np.searchsorted(cells[order], np.arange(self._shape[0] * self._shape[1] + 1))
+
+
+	def __len__(self):
+		return len(self.boxes)
+
+
+	def _cell_coords(self, points):
+		cells = np.floor((np.asarray(points, dtype=np.float64) - self._origin) / self.cell_size).astype(int)
+		return np.clip(cells, 0, np.array(self._shape) - 1)
+
+
+	## Gets the indices of the boxes that overlap (or touch) the given
+	# box.
+	#
+	# @returns (numpy array)
+	# <br>	-- Sorted indices into `boxes`
+	#
+	def ids_in_box(self, xmin, ymin, xmax, ymax):
+		if len(self.boxes) == 0:
+			return np.zeros(0, dtype=np.intp)
+		lo = self._cell_coords([xmin, ymin])
+		hi = self._cell_coords([xmax, ymax])
+
+		# The cells of each column of the query are contiguous
+		starts = self._cell_starts[np.arange(lo[0], hi[0] + 1) * self._shape[1] + lo[1]]
+		ends = self._cell_starts[np.arange(lo[0], hi[0] + 1) * self._shape[1] + hi[1] + 1]
+		ids = np.unique(np.concatenate([self._box_ids[start:end] for start, end in zip(starts.tolist(), ends.tolist())]))
+		boxes = self.boxes[ids]
+		return ids[(boxes[:, 0] <= xmax) & (xmin <= boxes[:, 2]) & (boxes[:, 1] <= ymax) & (ymin <= boxes[:, 3])]
+
+
+## Gets the axis-aligned bounding box of an obstacle.
+#
+# @returns (tuple)
+# <br>	Format: `(xmin, ymin, xmax, ymax)`
+#
+def _bounding_box(obs):
+	if obs.shape == 1:
+		r = obs.radius
+		return (obs.coordinate[0] - r, obs.coordinate[1] - r, obs.coordinate[0] + r, obs.coordinate[1] + r)
+	elif obs.shape == 2:
+		return (obs.coordinate[0], obs.coordinate[1], obs.coordinate[0] + obs.size[0], obs.coordinate[1] + obs.size[1])
+	elif obs.shape == 3:
+		r = max(obs.width, obs.height) / 2.0
+		return (obs.coordinate[0] - r, obs.coordinate[1] - r, obs.coordinate[0] + r, obs.coordinate[1] + r)
+	elif obs.shape == 4:
+		rect = obs.polygon.get_bounding_rectangle()
+		return (rect[0][0], rect[0][1], rect[0][0] + rect[1][0], rect[0][1] + rect[1][1])
+
+
+## Gets the bounding box of each obstacle in a list (see
+# `_bounding_box()`).
+#
+# @returns (numpy array)
+# <br>	Format: `[[xmin, ymin, xmax, ymax], ...]`
+#
+def _bounding_boxes(obs_list):
+	boxes = np.zeros((len(obs_list), 4), dtype=np.float64)
+	store, store_rows = ObstacleStore.get_store_rows(obs_list)
+	from_store = store_rows >= 0
+	if store is not None:
+		boxes[from_store] = store.get_bounding_boxes(store_rows[from_store])
+	for i in np.flatnonzero(~from_store):
+		boxes[i] = _bounding_box(obs_list[i])
+	return boxes
@@ -3,6 +3,7 @@
 
 import numpy as np
 import Vector
+from OccupancyPyramid import OccupancyPyramid
 
 
 class StaticMapper:
@@ -11,11 +12,14 @@ class StaticMapper:
 		self._gps = sensors['gps'];
 		if initial_gridsize is None:
 			initial_gridsize = (self._radar._env.width, self._radar._env.height)
-		self._griddata = np.zeros(np.array(initial_gridsize), dtype=int);
+		self._griddata = np.zeros(np.array(initial_gridsize), dtype=np.uint8);
+		self._pyramid = OccupancyPyramid(self._griddata);
 
 
 	def add_observation(self, location=None, full_scan = None, dynamic_scan = None):
 		location = location if location is not None else self._gps.location();
+		if full_scan is None and dynamic_scan is None:
+			full_scan, dynamic_scan, _, _ = self._radar.scan_full(location);
 		full_scan = full_scan if full_scan is not None else self._radar.scan(location);
 		dynamic_scan = dynamic_scan if dynamic_scan is not None else self._radar.scan_dynamic_obstacles(location);
 
@@ -31,6 +35,15 @@ class StaticMapper:
 
 		self._set_point_area(grid_data, self._gps.location(), 0b00000000);
 
+		# Each point sets the 5x5 area around it
+		changed = np.array(points + [self._gps.location()], dtype=np.float64).astype(int)
+		rect = (changed[:, 0].min() - 2, changed[:, 1].min() - 2, changed[:, 0].max() + 3, changed[:, 1].max() + 3)
+		if rect[0] < 0 or rect[1] < 0:
+			# Negative indices wrap around to the far edges
+			self._pyramid.rebuild();
+		else:
+			self._pyramid.update([rect]);
+
 
 	def _set_point_area(self, grid_data, point, value):
 		x = int(point[0]);
@@ -69,6 +82,13 @@ class StaticMapper:
 	def get_grid_data(self):
 		return self._griddata;
 
+
+	## Gets an `OccupancyPyramid` over the grid from `get_grid_data()`,
+	# which is kept up to date as observations are added.
+	#
+	def get_occupancy_pyramid(self):
+		return self._pyramid;
+
 		
 	## Convert radar data to a list of observed obstacle locations
 	#
@@ -4,7 +4,7 @@
 
 #define MIN_RESOLUTION 0.00001
 
-void _c_scan_generic(double centerx, double centery, double radius, long * grid_data, int grid_data_width, int grid_data_height, int cell_type_flags, double resolution, double degreeStep, double * out_data, int out_data_size)
+void _c_scan_generic(double centerx, double centery, double radius, const unsigned char * grid_data, int grid_data_width, int grid_data_height, int cell_type_flags, double resolution, double degreeStep, double * out_data, int out_data_size)
 {
 	
 	int i;
@@ -29,3 +29,264 @@ void _c_scan_generic(double centerx, double centery, double radius, long * grid_
 		}
 	}
 }
+
+
+/* Does three scans at once, stopping each beam at the first cell matching
+ * `any_flag`, `dynamic_flag`, and `static_flag` respectively. The results are
+ * the same as three calls to _c_scan_generic(), but each beam is only
+ * traversed once. */
+void _c_scan_full(double centerx, double centery, double radius, const unsigned char * grid_data, int grid_data_width, int grid_data_height, int any_flag, int dynamic_flag, int static_flag, double resolution, double degreeStep, double * out_all, double * out_dynamic, double * out_static, int out_data_size)
+{
+	int i;
+	double degree;
+	double check_dist;
+
+	if (resolution <= MIN_RESOLUTION) {
+		resolution = MIN_RESOLUTION;
+	}
+
+	for(i = 0, degree = 0.0; i < out_data_size && degree <= 360.0; i++, degree+=degreeStep) {
+		double ang_in_radians = degree * M_PI / 180.0;
+		double cos_cached = cos(ang_in_radians);
+		double sin_cached = sin(ang_in_radians);
+		int found_all = 0, found_dynamic = 0, found_static = 0;
+		for(check_dist = 0; check_dist < radius; check_dist += resolution) {
+			int x = (int)(cos_cached * check_dist + centerx);
+			int y = (int)(sin_cached * check_dist + centery);
+			unsigned char cell;
+			if((x < 0) || (y < 0) || (grid_data_width <= x) || (grid_data_height <= y)) {
+				/* Leaving the grid counts as a hit for every scan */
+				if (!found_all) out_all[i] = check_dist;
+				if (!found_dynamic) out_dynamic[i] = check_dist;
+				if (!found_static) out_static[i] = check_dist;
+				break;
+			}
+			cell = grid_data[x * grid_data_height + y];
+			if (!found_all && (cell & any_flag)) {
+				out_all[i] = check_dist;
+				found_all = 1;
+			}
+			if (!found_dynamic && (cell & dynamic_flag)) {
+				out_dynamic[i] = check_dist;
+				found_dynamic = 1;
+			}
+			if (!found_static && (cell & static_flag)) {
+				out_static[i] = check_dist;
+				found_static = 1;
+			}
+			if (found_all && found_dynamic && found_static) {
+				break;
+			}
+		}
+	}
+}
+
+
+/* Scans by exact grid traversal (Amanatides & Woo) instead of fixed-step
+ * sampling. Every cell crossed by a beam is visited exactly once, and the
+ * reported distance is where the beam enters the first matching cell.
+ *
+ * Several scans can be done at once: for each of the `num_flags` entries of
+ * `cell_type_flags`, row `f` of `out_data` (of length `out_data_size`)
+ * receives the scan that stops at cells matching `cell_type_flags[f]`. */
+void _c_scan_dda(double centerx, double centery, double radius, const unsigned char * grid_data, int grid_data_width, int grid_data_height, const int * cell_type_flags, int num_flags, double degreeStep, double * out_data, int out_data_size)
+{
+	int i, f;
+	double degree;
+
+	for(i = 0, degree = 0.0; i < out_data_size && degree <= 360.0; i++, degree+=degreeStep) {
+		double ang_in_radians = degree * M_PI / 180.0;
+		double dx = cos(ang_in_radians);
+		double dy = sin(ang_in_radians);
+		int x = (int)floor(centerx);
+		int y = (int)floor(centery);
+		int step_x = (0 < dx) - (dx < 0);
+		int step_y = (0 < dy) - (dy < 0);
+		double t_max_x = (dx != 0) ? ((x + (0 < step_x)) - centerx) / dx : INFINITY;
+		double t_max_y = (dy != 0) ? ((y + (0 < step_y)) - centery) / dy : INFINITY;
+		double t_delta_x = (dx != 0) ? 1.0 / fabs(dx) : INFINITY;
+		double t_delta_y = (dy != 0) ? 1.0 / fabs(dy) : INFINITY;
+		double t = 0.0;
+		unsigned int pending = (num_flags < 32) ? ((1u << num_flags) - 1u) : ~0u;
+
+		while (t < radius && pending) {
+			if ((x < 0) || (y < 0) || (grid_data_width <= x) || (grid_data_height <= y)) {
+				/* Leaving the grid counts as a hit for every scan */
+				for (f = 0; f < num_flags; f++) {
+					if (pending & (1u << f)) {
+						out_data[f * out_data_size + i] = t;
+					}
+				}
+				break;
+			}
+			for (f = 0; f < num_flags; f++) {
+				if ((pending & (1u << f)) && (grid_data[x * grid_data_height + y] & cell_type_flags[f])) {
+					out_data[f * out_data_size + i] = t;
+					pending &= ~(1u << f);
+				}
+			}
+			if (t_max_x < t_max_y) {
+				t = t_max_x;
+				x += step_x;
+				t_max_x += t_delta_x;
+			} else {
+				t = t_max_y;
+				y += step_y;
+				t_max_y += t_delta_y;
+			}
+		}
+	}
+}
+
+
+/* Finds the distance along a beam to the first static cell, using the
+ * distance field of the static map (the distance from each cell to the
+ * nearest static cell, 0 for static cells). From a cell with clearance `D`,
+ * the beam can safely jump ahead by `D - sqrt(2)`; it only steps from cell
+ * to cell when it is closer than that to a wall. Returns `limit` if there
+ * is no static cell before it. */
+static double _trace_distance_field(double centerx, double centery, double dx, double dy, double limit, const double * distance_field, int grid_data_width, int grid_data_height)
+{
+	double t = 0.0;
+
+	while (t < limit) {
+		double t_lookup = (0 < t) ? t + 1e-9 : t;
+		int x = (int)floor(centerx + t_lookup * dx);
+		int y = (int)floor(centery + t_lookup * dy);
+		double px = centerx + t * dx;
+		double py = centery + t * dy;
+		double jump, to_x, to_y;
+
+		x = (x < 0) ? 0 : ((grid_data_width <= x) ? grid_data_width - 1 : x);
+		y = (y < 0) ? 0 : ((grid_data_height <= y) ? grid_data_height - 1 : y);
+		jump = distance_field[x * grid_data_height + y];
+		if (jump == 0) {
+			return t;
+		}
+
+		jump -= M_SQRT2;
+		if (1 <= jump) {
+			t += jump;
+			continue;
+		}
+		to_x = (0 < dx) ? (x + 1 - px) / dx : ((dx < 0) ? (x - px) / dx : INFINITY);
+		to_y = (0 < dy) ? (y + 1 - py) / dy : ((dy < 0) ? (y - py) / dy : INFINITY);
+		t += fmax(fmin(to_x, to_y), 1e-9);
+	}
+	return limit;
+}
+
+
+/* Scans using the distance field of the static map, checking the grid cell
+ * by cell only inside the box `[box_x0, box_x1) x [box_y0, box_y1)`, which
+ * should hold every cell that is not part of the static map (the dynamic
+ * layer). The results match `_c_scan_dda()`.
+ *
+ * For each of the `num_flags` entries of `cell_type_flags`, row `f` of
+ * `out_data` (of length `out_data_size`) receives the scan that stops at
+ * cells matching `cell_type_flags[f]`. `static_flags` holds the flags of
+ * the cells in the static map. */
+void _c_scan_distance_field(double centerx, double centery, double radius, const double * distance_field, const unsigned char * grid_data, int grid_data_width, int grid_data_height, const int * cell_type_flags, int num_flags, int static_flags, int box_x0, int box_y0, int box_x1, int box_y1, double degreeStep, double * out_data, int out_data_size)
+{
+	int i, f;
+	double degree;
+	int inside = (0 <= centerx && centerx < grid_data_width && 0 <= centery && centery < grid_data_height);
+
+	for(i = 0, degree = 0.0; i < out_data_size && degree <= 360.0; i++, degree+=degreeStep) {
+		double ang_in_radians = degree * M_PI / 180.0;
+		double dx = cos(ang_in_radians);
+		double dy = sin(ang_in_radians);
+		double limit = radius;
+		double static_dist, t_in, t_out, t_stop;
+
+		/* Leaving the grid counts as a hit */
+		if (0 < dx) limit = fmin(limit, (grid_data_width - centerx) / dx);
+		if (dx < 0) limit = fmin(limit, -centerx / dx);
+		if (0 < dy) limit = fmin(limit, (grid_data_height - centery) / dy);
+		if (dy < 0) limit = fmin(limit, -centery / dy);
+		if (!inside) {
+			limit = 0.0;
+		}
+
+		static_dist = _trace_distance_field(centerx, centery, dx, dy, limit, distance_field, grid_data_width, grid_data_height);
+		t_stop = 0.0;
+		for (f = 0; f < num_flags; f++) {
+			out_data[f * out_data_size + i] = (cell_type_flags[f] & static_flags) ? static_dist : limit;
+			t_stop = fmax(t_stop, out_data[f * out_data_size + i]);
+		}
+
+		if (box_x1 <= box_x0 || box_y1 <= box_y0) {
+			continue;
+		}
+
+		/* Clip the beam to the box of the dynamic layer */
+		t_in = 0.0;
+		t_out = t_stop;
+		if (dx != 0) {
+			double ta = (box_x0 - centerx) / dx, tb = (box_x1 - centerx) / dx;
+			t_in = fmax(t_in, fmin(ta, tb));
+			t_out = fmin(t_out, fmax(ta, tb));
+		} else if (centerx < box_x0 || box_x1 <= centerx) {
+			continue;
+		}
+		if (dy != 0) {
+			double ta = (box_y0 - centery) / dy, tb = (box_y1 - centery) / dy;
+			t_in = fmax(t_in, fmin(ta, tb));
+			t_out = fmin(t_out, fmax(ta, tb));
+		} else if (centery < box_y0 || box_y1 <= centery) {
+			continue;
+		}
+		if (t_out <= t_in) {
+			continue;
+		}
+
+		/* Walk the cells of the box from where the beam enters it */
+		{
+			double t = t_in;
+			double t_lookup = (0 < t) ? t + 1e-9 : t;
+			int x = (int)floor(centerx + t_lookup * dx);
+			int y = (int)floor(centery + t_lookup * dy);
+			int step_x = (0 < dx) - (dx < 0);
+			int step_y = (0 < dy) - (dy < 0);
+			double t_max_x = (dx != 0) ? t + ((x + (0 < step_x)) - (centerx + t * dx)) / dx : INFINITY;
+			double t_max_y = (dy != 0) ? t + ((y + (0 < step_y)) - (centery + t * dy)) / dy : INFINITY;
+			double t_delta_x = (dx != 0) ? 1.0 / fabs(dx) : INFINITY;
+			double t_delta_y = (dy != 0) ? 1.0 / fabs(dy) : INFINITY;
+
+			while (t < t_out && box_x0 <= x && x < box_x1 && box_y0 <= y && y < box_y1) {
+				for (f = 0; f < num_flags; f++) {
+					if (t < out_data[f * out_data_size + i] && (grid_data[x * grid_data_height + y] & cell_type_flags[f])) {
+						out_data[f * out_data_size + i] = t;
+					}
+				}
+				if (t_max_x < t_max_y) {
+					t = t_max_x;
+					x += step_x;
+					t_max_x += t_delta_x;
+				} else {
+					t = t_max_y;
+					y += step_y;
+					t_max_y += t_delta_y;
+				}
+			}
+		}
+	}
+}
+
+
+/* Scans from each of `num_centers` center points. `centers` holds the points
+ * as consecutive (x, y) pairs, and row `i` of `out_data` (of length
+ * `out_data_size`) receives the scan from center `i`.
+ *
+ * When built with OpenMP, the centers are split across threads. The scans
+ * only read `grid_data` and each writes its own row, so no locking is
+ * needed. */
+void _c_scan_many(const double * centers, int num_centers, double radius, const unsigned char * grid_data, int grid_data_width, int grid_data_height, int cell_type_flags, double resolution, double degreeStep, double * out_data, int out_data_size)
+{
+	int i;
+
+	#pragma omp parallel for schedule(static)
+	for(i = 0; i < num_centers; i++) {
+		_c_scan_generic(centers[2*i], centers[2*i + 1], radius, grid_data, grid_data_width, grid_data_height, cell_type_flags, resolution, degreeStep, out_data + (long)i * out_data_size, out_data_size);
+	}
+}
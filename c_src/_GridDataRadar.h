@@ -4,7 +4,65 @@
 void _c_scan_generic(double centerx,
 		double centery,
 		double radius,
-		long * grid_data,
+		const unsigned char * grid_data,
+		int grid_data_width,
+		int grid_data_height,
+		int cell_type_flags,
+		double resolution,
+		double degreeStep,
+		double * out_data,
+		int out_data_size);
+
+void _c_scan_full(double centerx,
+		double centery,
+		double radius,
+		const unsigned char * grid_data,
+		int grid_data_width,
+		int grid_data_height,
+		int any_flag,
+		int dynamic_flag,
+		int static_flag,
+		double resolution,
+		double degreeStep,
+		double * out_all,
+		double * out_dynamic,
+		double * out_static,
+		int out_data_size);
+
+void _c_scan_dda(double centerx,
+		double centery,
+		double radius,
+		const unsigned char * grid_data,
+		int grid_data_width,
+		int grid_data_height,
+		const int * cell_type_flags,
+		int num_flags,
+		double degreeStep,
+		double * out_data,
+		int out_data_size);
+
+void _c_scan_distance_field(double centerx,
+		double centery,
+		double radius,
+		const double * distance_field,
+		const unsigned char * grid_data,
+		int grid_data_width,
+		int grid_data_height,
+		const int * cell_type_flags,
+		int num_flags,
+		int static_flags,
+		int box_x0,
+		int box_y0,
+		int box_x1,
+		int box_y1,
+		double degreeStep,
+		double * out_data,
+		int out_data_size);
+
+void _c_scan_many(const double * centers,
+		int num_centers,
+		double radius,
+		const unsigned char * grid_data,
 		int grid_data_width,
 		int grid_data_height,
 		int cell_type_flags,
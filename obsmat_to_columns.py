@@ -0,0 +1,27 @@
+#!/usr/bin/env -p python3
+
+## Converts pedestrian trajectories from `obsmat.txt` or `obsmat.json` to the
+# columnar format of `PedestrianData`, which loads in milliseconds. Runs that
+# use `obsmat.json` convert it automatically (to `obsmat.peds`), so this is
+# only needed to convert ahead of time or from the raw `obsmat.txt`.
+
+import json
+import sys
+import PedestrianData
+
+if len(sys.argv) < 3:
+	print("Usage: python3 obsmat_to_columns.py path/to/obsmat.txt|path/to/obsmat.json path/to/output.peds")
+	sys.exit(1)
+
+input_filename = sys.argv[1];
+output_dirname = sys.argv[2];
+
+if input_filename.endswith('.json'):
+	with open(input_filename, 'r') as f:
+		pedestrians = json.load(f)
+else:
+	pedestrians = PedestrianData.read_obsmat_txt(input_filename)
+
+dataset = PedestrianData.from_samples(pedestrians)
+PedestrianData.save_dataset(dataset, output_dirname, replace=True)
+print("Wrote {} samples of {} pedestrians to {}".format(dataset.offsets[-1], len(dataset), output_dirname))
@@ -14,7 +14,9 @@ import DrawTool
 from GridDataEnvironment import GridDataEnvironment
 from GridDataRadar import GridDataRadar
 from GeometricEnvironment import GeometricEnvironment
+from Environment import ObsFlag
 from GeometricRadar import GeometricRadar
+from RadarCache import CachedRadar
 from Robot import Robot, RobotStats, GpsSensor
 from Target import Target
 import Vector
@@ -59,17 +61,14 @@ target = Target((760, 50), radius=20)
 env.non_interactive_objects += [start_point, target]
 
 # Init robots
-radar = GeometricRadar(env, radius = cmdargs.radar_range);
+radar = CachedRadar(GeometricRadar(env, radius = cmdargs.radar_range));
 initial_position = np.array(start_point.position);
 robot_list = [];
 
 # Init basics for coverage algorithm
 bcast_channel = BroadcastChannel()
 def obs_on_line(line):
-	for obs in env.static_obstacles:
-		if radar._obs_dist_along_line(obs, line) < float('inf'):
-			return True
-	return False
+	return env.segment_collides(line[0], line[1], ObsFlag.STATIC_OBSTACLE)
 
 visibility_range = cmdargs.radar_range
 
@@ -15,6 +15,7 @@ from GridDataEnvironment import GridDataEnvironment
 from GridDataRadar import GridDataRadar
 from GeometricEnvironment import GeometricEnvironment
 from GeometricRadar import GeometricRadar
+from RadarCache import CachedRadar
 from Robot import Robot, RobotStats, GpsSensor
 from Target import Target
 import Vector
@@ -43,7 +44,7 @@ objective = NavigationObjective(target, env)
 env.non_interactive_objects += [start_point, target]
 
 # Init robots
-radar = GeometricRadar(env, radius = cmdargs.radar_range);
+radar = CachedRadar(GeometricRadar(env, radius = cmdargs.radar_range));
 initial_position = np.array(start_point.position);
 robot_list = [];
 
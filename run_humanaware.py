@@ -15,6 +15,7 @@ from GridDataEnvironment import GridDataEnvironment
 from GridDataRadar import GridDataRadar
 from GeometricEnvironment import GeometricEnvironment
 from GeometricRadar import GeometricRadar
+from RadarCache import CachedRadar
 from Robot import Robot, RobotStats, GpsSensor
 from Target import Target
 import Vector
@@ -22,7 +23,7 @@ import os
 import sys
 import binascii
 import random
-import json
+import PedestrianData
 
 from NavigationObjective import NavigationObjective
 
@@ -46,11 +47,10 @@ cmdarg_parser.add_argument('--ped-id-to-replace',
 );
 cmdargs = cmdarg_parser.parse_args(sys.argv[1:])
 
-with open('obsmat.json', 'r') as f:
-	obsmat = json.load(f)
-	start_human_obs = obsmat[str(cmdargs.ped_id_to_replace)][0]
-	end_human_obs = obsmat[str(cmdargs.ped_id_to_replace)][-1]
-	obsmat = None
+obsmat = PedestrianData.load_obsmat('obsmat.json')
+start_human_obs = obsmat.get_sample(cmdargs.ped_id_to_replace, 0)
+end_human_obs = obsmat.get_sample(cmdargs.ped_id_to_replace, -1)
+obsmat = None
 
 env_size = (640, 480)
 
@@ -63,7 +63,7 @@ objective = NavigationObjective(target, env)
 env.non_interactive_objects += [start_point, target]
 
 # Init robots
-radar = GeometricRadar(env, radius = cmdargs.radar_range);
+radar = CachedRadar(GeometricRadar(env, radius = cmdargs.radar_range));
 initial_position = np.array(start_point.position);
 robot_list = [];
 
@@ -14,6 +14,7 @@ import DrawTool
 from GeometricEnvironment import GeometricEnvironment
 from GeometricRadar import GeometricRadar
 from RadarSensor import RadarSensor
+from RadarCache import CachedRadar
 from Robot import Robot, RobotStats, GpsSensor
 from Target import Target
 import Vector
@@ -55,7 +56,7 @@ def make_default_robot(robot_name, path_color):
 	env.non_interactive_objects += [start_point, target]
 
 	robot = Robot(initial_position, cmdargs, env, path_color=path_color, name=robot_name, objective=objective);
-	robot.put_sensor('radar', RadarSensor(env, robot, [], radar));
+	robot.put_sensor('radar', CachedRadar(RadarSensor(env, robot, [], radar)));
 	robot.put_sensor('gps', GpsSensor(robot));
 	if robot_name in params['robots']:
 		robot.put_sensor('params', params['robots'][robot_name]);
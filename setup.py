@@ -32,7 +32,7 @@ extensions = cythonize(
 		language_level=3)
 
 extensions.extend(cythonize(Extension("Vector", sources=["Vector.py", "c_src/_Vector.c"], include_dirs=[numpy.get_include()]), language_level=3));
-extensions.extend(cythonize(Extension("GridDataRadar", sources=["GridDataRadar.py", "c_src/_GridDataRadar.c"], include_dirs=[numpy.get_include()]), language_level=3));
+extensions.extend(cythonize(Extension("GridDataRadar", sources=["GridDataRadar.py", "c_src/_GridDataRadar.c"], include_dirs=[numpy.get_include()], extra_compile_args=["-fopenmp"], extra_link_args=["-fopenmp"]), language_level=3));
 
 setup(
 	name = "SafeNav Simulator",
@@ -0,0 +1,60 @@
+#!/usr/bin/python3
+
+import argparse
+from Environment import ObsFlag
+import MovementPattern
+from DynamicObstacles import DynamicObstacle
+from Robot import Robot
+from testcode.helpers import make_geometric_env
+
+
+def test_robot_collisions_match_brute_force(num_robots=40, num_steps=15):
+	env, rng = make_geometric_env(seed=12, num_static=60)
+	for obs in env.static_obstacles + env.dynamic_obstacles:
+		# There is no circle-ellipse test
+		if obs.shape == 3:
+			obs.shape = 1
+	for i in range(10):
+		obs = DynamicObstacle(MovementPattern.CircleMovement(rng.uniform(100, 500, 2), 40, speed=8))
+		obs.radius = 15
+		env.dynamic_obstacles.append(obs)
+
+	cmdargs = argparse.Namespace(robot_speed=6, robot_movement_momentum=0)
+	for i in range(num_robots):
+		robot = Robot(rng.uniform(0, 600, 2), cmdargs, env)
+		obs = DynamicObstacle(MovementPattern.RobotBodyMovement(robot))
+		obs.radius = 10
+		robot.set_obstacle(obs)
+		env.add_robot(robot)
+	# One robot has no body, so others can not run into it
+	env.robots[3].set_obstacle(None)
+
+	def brute_force_flags(robot):
+		flags = 0
+		if robot._collides_with_obstacle_list(env.dynamic_obstacles):
+			flags |= ObsFlag.DYNAMIC_OBSTACLE | ObsFlag.ANY_OBSTACLE
+		if robot._collides_with_obstacle_list(env.static_obstacles):
+			flags |= ObsFlag.STATIC_OBSTACLE | ObsFlag.ANY_OBSTACLE
+		if robot._collides_with_obstacle_list([other._obstacle for other in env.robots if other is not robot and other._obstacle is not None]):
+			flags |= ObsFlag.ROBOT_OBSTACLE | ObsFlag.DYNAMIC_OBSTACLE | ObsFlag.ANY_OBSTACLE
+		return flags
+
+	num_collisions = 0
+	for step in range(num_steps):
+		env.next_step()
+		# Robots move one at a time, and each one sees the ones that
+		# moved before it at their new locations
+		for robot in env.robots:
+			if robot.get_obstacle() is None:
+				continue
+			robot.location = robot.location + rng.uniform(-15, 15, 2)
+			robot._move_obstacle()
+			flags = robot._compute_collision_flags()
+			assert flags == brute_force_flags(robot)
+			num_collisions += flags & ObsFlag.ROBOT_OBSTACLE != 0
+	assert 0 < num_collisions
+
+
+if __name__ == '__main__':
+	test_robot_collisions_match_brute_force()
+	print('PASS: robot collision flags match brute force')
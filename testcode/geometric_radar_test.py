@@ -0,0 +1,141 @@
+#!/usr/bin/python3
+
+import numpy as np
+import Geometry
+import StaticGeometricMaps
+from GeometricRadar import GeometricRadar
+from RadarCache import CachedRadar
+from RadarSensor import RadarSensor
+from testcode.helpers import ObstacleEnv, make_random_obstacle, make_geometric_env
+
+
+def _make_env(seed=3, num_dynamic=60):
+	rng = np.random.RandomState(seed)
+	static_obstacles = StaticGeometricMaps.load_map_file('Maps/coverage/csu_based.json')
+	dynamic_obstacles = [make_random_obstacle(rng) for i in range(num_dynamic)]
+	return ObstacleEnv(static_obstacles, dynamic_obstacles), rng
+
+
+def test_vectorized_scan_matches_per_beam_scan(num_scans=20, abs_error=1e-8):
+	env, rng = _make_env()
+	per_beam_radar = GeometricRadar(env, radius=100, use_vectorized_scan=False)
+	vectorized_radar = GeometricRadar(env, radius=100)
+
+	for i in range(num_scans):
+		center = rng.uniform(0, 800, 2)
+		assert np.allclose(per_beam_radar.scan(center), vectorized_radar.scan(center), rtol=0, atol=abs_error)
+		assert np.allclose(per_beam_radar.scan_dynamic_obstacles(center), vectorized_radar.scan_dynamic_obstacles(center), rtol=0, atol=abs_error)
+
+
+def test_scan_many_matches_scan(num_centers=10):
+	env, rng = _make_env()
+	radar = GeometricRadar(env, radius=100)
+	centers = rng.uniform(0, 800, (num_centers, 2))
+
+	batch = radar.scan_many(centers)
+	assert batch.shape == (num_centers, radar.get_data_size())
+	for i in range(num_centers):
+		assert np.array_equal(batch[i], radar.scan(centers[i]))
+
+
+def test_scan_full_matches_separate_scans(num_scans=10):
+	env, rng = _make_env()
+	radar = GeometricRadar(env, radius=100)
+
+	for i in range(num_scans):
+		center = rng.uniform(0, 800, 2)
+		radar_data, dynamic_radar_data, static_radar_data, dynobs_ids = radar.scan_full(center)
+		assert np.array_equal(radar_data, radar.scan(center))
+		assert np.array_equal(dynamic_radar_data, radar.scan_dynamic_obstacles(center))
+		assert np.array_equal(static_radar_data, radar.scan_obstacles_list(center, env.static_obstacles))
+
+		# Each beam that hits a dynamic obstacle reports that obstacle
+		for j in range(radar.get_data_size()):
+			if dynamic_radar_data[j] < radar.radius:
+				obs = env.dynamic_obstacles[dynobs_ids[j]]
+				assert np.isclose(radar.scan_obstacles_list(center, [obs])[j], dynamic_radar_data[j])
+			else:
+				assert dynobs_ids[j] == -1
+
+
+def test_cached_radar_reuses_scans_within_a_step():
+	env, rng = _make_env()
+	radar = CachedRadar(GeometricRadar(env, radius=100))
+	center = rng.uniform(0, 800, 2)
+
+	first = radar.scan(center)
+	first[:] = -1
+	second = radar.scan(center)
+	assert (radar.hits, radar.misses) == (1, 1)
+	assert np.array_equal(second, radar._radar.scan(center))
+
+	radar.scan_dynamic_obstacles(center)
+	radar.scan(center + 1)
+	assert (radar.hits, radar.misses) == (1, 3)
+
+	# Moving the obstacles and stepping the environment invalidates the cache
+	for obs in env.dynamic_obstacles:
+		obs.set_coordinate(obs.coordinate + 15)
+	env.step_num += 1
+	assert np.array_equal(radar.scan(center), radar._radar.scan(center))
+	assert (radar.hits, radar.misses) == (1, 4)
+
+
+class _SensorRobot:
+	def __init__(self, location, obstacle):
+		self.location = location
+		self._obstacle = obstacle
+
+	def get_obstacle(self):
+		return self._obstacle
+
+
+def test_radar_sensor_matches_combined_list(num_robots=6):
+	env, rng = make_geometric_env(seed=9, num_static=60)
+	robots = [_SensorRobot(rng.uniform(200, 350, 2), make_random_obstacle(rng)) for i in range(num_robots)]
+	robots[2]._obstacle = None
+	radar = GeometricRadar(env, radius=150)
+
+	# Only the other robots are packed for each scan; the environment's
+	# dynamic obstacles are packed once per step
+	packed_lists = []
+	pack_dynamic = radar._pack_dynamic
+	def recording_pack_dynamic(obs_list):
+		packed_lists.append(obs_list)
+		return pack_dynamic(obs_list)
+
+	num_robot_hits = 0
+	for robot in robots:
+		sensor = RadarSensor(env, robot, [other for other in robots if other is not robot], radar)
+		dynobs_list = sensor.get_dynobs_list()
+		center = robot.location
+		centers = center + rng.uniform(-50, 50, (5, 2))
+		expected_full = radar.scan_full_obstacles_lists(center, dynobs_list, env.static_obstacles)
+		expected_many = radar.scan_obstacles_lists_many(centers, dynobs_list, env.static_obstacles)
+		expected_dynamic = radar.scan_obstacles_list(center, dynobs_list)
+
+		radar._pack_dynamic = recording_pack_dynamic
+		full = sensor.scan_full()
+		scan = sensor.scan()
+		many = sensor.scan_many(centers)
+		dynamic = sensor.scan_dynamic_obstacles()
+		radar._pack_dynamic = pack_dynamic
+
+		assert np.allclose(scan, expected_full[0], atol=1e-8)
+		for values, expected in zip(full[:3], expected_full[:3]):
+			assert np.allclose(values, expected, atol=1e-8)
+		assert np.array_equal(full[3], expected_full[3])
+		num_robot_hits += np.count_nonzero(full[3] >= len(env.dynamic_obstacles))
+		assert np.allclose(many, expected_many, atol=1e-8)
+		assert np.allclose(dynamic, expected_dynamic, atol=1e-8)
+	assert 0 < num_robot_hits
+	assert all(obs_list is env.dynamic_obstacles or len(obs_list) < num_robots for obs_list in packed_lists)
+
+
+if __name__ == '__main__':
+	test_vectorized_scan_matches_per_beam_scan()
+	test_scan_many_matches_scan()
+	test_scan_full_matches_separate_scans()
+	test_cached_radar_reuses_scans_within_a_step()
+	test_radar_sensor_matches_combined_list()
+	print('PASS: vectorized GeometricRadar scan matches per-beam scan')
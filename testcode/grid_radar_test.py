@@ -0,0 +1,268 @@
+#!/usr/bin/python3
+
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import numpy as np
+import pygame as PG
+from concurrent.futures import ThreadPoolExecutor
+from Environment import ObsFlag
+from GridDataRadar import GridDataRadar
+from RadarCache import CachedRadar
+from OccupancyPyramid import OccupancyPyramid
+import GridTraversal
+import Rasterizer
+import MapImage
+from GridDataEnvironment import GridDataEnvironment
+
+
+## Minimal stand-in for a GridDataEnvironment, holding only the grids that
+# the radar reads. Static cells are taken to be part of the static map.
+#
+class _GridEnv:
+	def __init__(self, grid_data):
+		self.width = grid_data.shape[0]
+		self.height = grid_data.shape[1]
+		self.grid_data = grid_data
+		is_static = (grid_data & ObsFlag.STATIC_OBSTACLE) != 0
+		self.static_overlay = np.where(is_static, ObsFlag.STATIC_OBSTACLE | ObsFlag.ANY_OBSTACLE, 0).astype(np.uint8)
+		self.static_distance_field = GridTraversal.static_distance_field(is_static)
+
+
+def _make_env(seed=5, width=800, height=600, num_blocks=80):
+	rng = np.random.RandomState(seed)
+	grid_data = np.zeros((width, height), dtype=np.uint8)
+	for i in range(num_blocks):
+		x, y = rng.randint(0, width), rng.randint(0, height)
+		w, h = rng.randint(2, 30, 2)
+		grid_data[x:x+w, y:y+h] |= ObsFlag.ANY_OBSTACLE | (ObsFlag.DYNAMIC_OBSTACLE if i % 2 else ObsFlag.STATIC_OBSTACLE)
+	return _GridEnv(grid_data), rng
+
+
+def test_scan_many_matches_scan(num_centers=30):
+	env, rng = _make_env()
+	radar = GridDataRadar(env, radius=100)
+	centers = rng.uniform(0, 800, (num_centers, 2)) * [1, 0.75]
+
+	for cell_type in (ObsFlag.ANY_OBSTACLE, ObsFlag.DYNAMIC_OBSTACLE):
+		batch = radar.scan_many(centers, cell_type)
+		assert batch.shape == (num_centers, radar.get_data_size())
+		for i in range(num_centers):
+			assert np.array_equal(batch[i], radar.scan(centers[i], cell_type))
+
+
+def test_scans_from_threads(num_centers=40):
+	env, rng = _make_env()
+	env.robots = []
+	env.get_state_version = lambda: 0
+	centers = rng.uniform(0, 800, (num_centers, 2)) * [1, 0.75]
+
+	for scan_mode in ('sample', 'dda'):
+		radar = GridDataRadar(env, radius=100, scan_mode=scan_mode)
+		expected = radar.scan_many(centers)
+		cached = CachedRadar(radar)
+		with ThreadPoolExecutor(max_workers=4) as executor:
+			# Each center twice, so that some scans come from the cache
+			results = list(executor.map(cached.scan, np.vstack((centers, centers))))
+		for i in range(num_centers):
+			assert np.array_equal(results[i], expected[i])
+			assert np.array_equal(results[num_centers + i], expected[i])
+		assert cached.hits + cached.misses == 2 * num_centers
+
+
+def test_scan_full_matches_separate_scans(num_centers=30):
+	env, rng = _make_env()
+	radar = GridDataRadar(env, radius=100)
+
+	for center in rng.uniform(0, 800, (num_centers, 2)) * [1, 0.75]:
+		radar_data, dynamic_radar_data, static_radar_data, dynobs_ids = radar.scan_full(center)
+		assert np.array_equal(radar_data, radar.scan(center, ObsFlag.ANY_OBSTACLE))
+		assert np.array_equal(dynamic_radar_data, radar.scan(center, ObsFlag.DYNAMIC_OBSTACLE))
+		assert np.array_equal(static_radar_data, radar.scan(center, ObsFlag.STATIC_OBSTACLE))
+		assert dynobs_ids is None
+
+
+def test_scan_uses_whole_grid():
+	grid_data = np.zeros((1000, 700), dtype=np.uint8)
+	grid_data[950, :] = ObsFlag.ANY_OBSTACLE | ObsFlag.STATIC_OBSTACLE
+	radar = GridDataRadar(_GridEnv(grid_data), radius=100, resolution=1, degree_step=90)
+
+	# Beyond the size of the default 800x600 map
+	assert np.array_equal(radar.scan([900.5, 650.5]), [50, 50, 100, 100])
+	assert np.array_equal(radar.scan_full([900.5, 650.5])[2], [50, 50, 100, 100])
+
+
+def test_dda_matches_fine_sampling(num_centers=10):
+	env, rng = _make_env(num_blocks=150)
+	# Wall off the border, since the sampling scan treats the grid edges
+	# slightly differently (it truncates toward zero)
+	border = np.ones(env.grid_data.shape, dtype=bool)
+	border[1:-1, 1:-1] = False
+	env.grid_data[border] |= ObsFlag.ANY_OBSTACLE | ObsFlag.STATIC_OBSTACLE
+	radar = GridDataRadar(env, radius=100, degree_step=3, scan_mode='dda')
+	fine = GridDataRadar(env, radius=100, resolution=0.01, degree_step=3)
+
+	for center in rng.uniform(0, 800, (num_centers, 2)) * [1, 0.75]:
+		exact = radar.scan(center)
+		sampled = fine.scan(center)
+		# The DDA reports where the beam enters the cell, so it can only
+		# be slightly closer than the first sample inside the cell
+		assert np.all(exact <= sampled + 1e-9)
+		assert np.all(sampled - exact < 0.02)
+
+
+def test_dda_finds_thin_walls():
+	grid_data = np.zeros((200, 200), dtype=np.uint8)
+	grid_data[130, :] = ObsFlag.ANY_OBSTACLE | ObsFlag.STATIC_OBSTACLE
+	env = _GridEnv(grid_data)
+	center = np.array([100.5, 100.5])
+
+	sampled = GridDataRadar(env, radius=100, resolution=4, degree_step=1).scan(center)
+	exact = GridDataRadar(env, radius=100, degree_step=1, scan_mode='dda').scan(center)
+	# Beams close to 0 degrees cross the one-cell wall between samples
+	assert np.any(sampled[:40] == 100)
+	for i in range(40):
+		assert abs(exact[i] - 29.5 / np.cos(np.radians(i))) < 1e-6
+
+
+def test_dda_scan_full_matches_separate_scans(num_centers=10):
+	env, rng = _make_env()
+	radar = GridDataRadar(env, radius=100, scan_mode='dda')
+
+	for center in rng.uniform(0, 800, (num_centers, 2)) * [1, 0.75]:
+		radar_data, dynamic_radar_data, static_radar_data, dynobs_ids = radar.scan_full(center)
+		assert np.array_equal(radar_data, radar.scan(center, ObsFlag.ANY_OBSTACLE))
+		assert np.array_equal(dynamic_radar_data, radar.scan(center, ObsFlag.DYNAMIC_OBSTACLE))
+		assert np.array_equal(static_radar_data, radar.scan(center, ObsFlag.STATIC_OBSTACLE))
+		assert np.array_equal(radar.scan_many([center, center])[1], radar_data)
+
+
+def test_distance_field_matches_dda(num_centers=20):
+	env, rng = _make_env(num_blocks=150)
+	dda = GridDataRadar(env, radius=150, degree_step=2, scan_mode='dda')
+	radar = GridDataRadar(env, radius=150, degree_step=2, scan_mode='distance_field')
+
+	# Include centers outside the grid and inside obstacles
+	centers = np.vstack((rng.uniform(0, 800, (num_centers, 2)) * [1, 0.75], [[-20, 50], [850, 300], [5, 5]]))
+	for center in centers:
+		expected = dda.scan_full(center)
+		actual = radar.scan_full(center)
+		for j in range(3):
+			assert np.allclose(actual[j], expected[j], atol=1e-6)
+		assert np.allclose(radar.scan(center, ObsFlag.STATIC_OBSTACLE), expected[2], atol=1e-6)
+
+
+def test_pyramid_matches_dda(num_centers=20):
+	env, rng = _make_env(num_blocks=150)
+	dda = GridDataRadar(env, radius=150, degree_step=2, scan_mode='dda')
+	radar = GridDataRadar(env, radius=150, degree_step=2, scan_mode='pyramid')
+
+	centers = np.vstack((rng.uniform(0, 800, (num_centers, 2)) * [1, 0.75], [[-20, 50], [799.5, 599.5]]))
+	for center in centers:
+		expected = dda.scan_full(center)
+		actual = radar.scan_full(center)
+		for j in range(3):
+			assert np.allclose(actual[j], expected[j], atol=1e-6)
+
+
+def test_pyramid_update_matches_rebuild():
+	env, rng = _make_env(width=803, height=601)
+	pyramid = OccupancyPyramid(env.grid_data)
+
+	grid_data = env.grid_data.copy()
+	grid_data[100:130, 40:45] = 0
+	grid_data[790:810, 590:601] |= ObsFlag.DYNAMIC_OBSTACLE
+	pyramid.update([(100, 40, 130, 45), (790, 590, 810, 610)], grid_data=grid_data)
+
+	expected = OccupancyPyramid(grid_data)
+	for k in range(len(expected.levels)):
+		assert np.array_equal(pyramid.levels[k], expected.levels[k])
+	assert pyramid.any_at([795], [595], ObsFlag.DYNAMIC_OBSTACLE)
+	assert not pyramid.any_at([110, 120], [42, 42], ObsFlag.ANY_OBSTACLE)
+
+
+def test_incremental_grid_update_matches_rebuild(num_steps=15):
+	os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+	PG.init()
+	PG.display.set_mode((800, 600))
+	np.random.seed(11)
+	cmdargs = argparse.Namespace(map_modifier_num=1, speedmode=2)
+	env = GridDataEnvironment(800, 600, 'Maps/floorplan.png', cmdargs=cmdargs)
+	grid_data = env.grid_data
+	assert grid_data.dtype == np.uint8 and env.static_overlay.dtype == np.uint8
+
+	for step in range(num_steps):
+		env.next_step()
+		env._update_grid_data()
+		assert env.grid_data is grid_data
+		assert 0 < len(env.get_dirty_rects()) <= 2 * len(env.dynamic_obstacles)
+
+		expected = np.array(env.static_overlay)
+		for obs in env.dynamic_obstacles:
+			Rasterizer.stamp_obstacle(expected, obs, ObsFlag.DYNAMIC_OBSTACLE | ObsFlag.ANY_OBSTACLE)
+		assert np.array_equal(grid_data, expected)
+
+		pyramid = OccupancyPyramid(expected)
+		for k in range(len(pyramid.levels)):
+			assert np.array_equal(env.occupancy_pyramid.levels[k], pyramid.levels[k])
+
+
+def test_png_decoder_matches_pygame():
+	for filename in sorted(glob.glob('Maps/**/*.png', recursive=True)):
+		image = PG.image.load(filename)
+		expected = np.dstack((PG.surfarray.array3d(image), PG.surfarray.array_alpha(image)))
+		assert np.array_equal(MapImage.load_png(filename), expected), filename
+
+
+def test_map_loads_without_display():
+	# In a new interpreter, so that no display mode is set and nothing
+	# else has imported pygame
+	code = '\n'.join((
+		'import argparse, sys',
+		'import numpy as np',
+		'from GridDataEnvironment import GridDataEnvironment',
+		"env = GridDataEnvironment(800, 600, 'Maps/floorplan.png', cmdargs=argparse.Namespace(map_modifier_num=1, speedmode=2), map_cache=False)",
+		'env.next_step()',
+		'assert np.any(env.static_overlay) and np.any(env.grid_data != env.static_overlay)',
+		"assert 'pygame' not in sys.modules",
+	))
+	subprocess.check_call([sys.executable, '-c', code])
+
+
+def test_segment_cells_match_fine_sampling(num_segments=200):
+	rng = np.random.RandomState(9)
+	for i in range(num_segments):
+		p0, p1 = rng.uniform(-5, 25, (2, 2))
+		xs, ys = GridTraversal.segment_cells(p0, p1)
+		cells = set(zip(xs.tolist(), ys.tolist()))
+		samples = p0 + np.linspace(0, 1, 20001)[:, np.newaxis] * (p1 - p0)
+		sampled = set(map(tuple, np.floor(samples).astype(int).tolist()))
+		assert sampled <= cells
+		# Any extra cells are only grazed by the segment
+		extra = np.array(sorted(cells - sampled)).reshape(-1, 2)
+		assert np.all(GridTraversal.segment_box_distances(p0, p1, extra, extra + 1) < 1e-6)
+
+		xs, ys = GridTraversal.segment_band_cells(p0, p1, 2.5)
+		band = np.column_stack((xs, ys))
+		assert cells <= set(map(tuple, band.tolist()))
+		assert np.all(GridTraversal.segment_box_distances(p0, p1, band, band + 1) <= 2.5)
+
+
+if __name__ == '__main__':
+	test_scan_many_matches_scan()
+	test_scans_from_threads()
+	test_scan_full_matches_separate_scans()
+	test_scan_uses_whole_grid()
+	test_dda_matches_fine_sampling()
+	test_dda_finds_thin_walls()
+	test_dda_scan_full_matches_separate_scans()
+	test_distance_field_matches_dda()
+	test_pyramid_matches_dda()
+	test_pyramid_update_matches_rebuild()
+	test_incremental_grid_update_matches_rebuild()
+	test_png_decoder_matches_pygame()
+	test_map_loads_without_display()
+	test_segment_cells_match_fine_sampling()
+	print('PASS: GridDataRadar scans agree')
@@ -0,0 +1,64 @@
+## @package helpers
+# Obstacle and environment factories shared by the test modules.
+#
+
+import argparse
+import numpy as np
+import MovementPattern
+from DynamicObstacles import DynamicObstacle
+from GeometricEnvironment import GeometricEnvironment
+from Polygon import Polygon
+
+
+## Minimal stand-in for a GeometricEnvironment, holding only the obstacle
+# lists that the radar reads.
+#
+class ObstacleEnv:
+	def __init__(self, static_obstacles, dynamic_obstacles):
+		self.width = 800
+		self.height = 600
+		self.static_obstacles = static_obstacles
+		self.dynamic_obstacles = dynamic_obstacles
+		self.robots = []
+		self.step_num = 0
+
+	def get_state_version(self):
+		return self.step_num
+
+
+## Makes a static obstacle of a random shape, size and location.
+#
+# @param rng (`numpy.random.RandomState` object)
+#
+# @returns (`DynamicObstacle` object)
+#
+def make_random_obstacle(rng):
+	obs = DynamicObstacle(MovementPattern.StaticMovement(rng.uniform(0, 800, 2)))
+	obs.shape = rng.randint(1, 5)
+	obs.radius = rng.uniform(5, 30)
+	obs.size = list(rng.uniform(5, 40, 2))
+	obs.width = rng.uniform(5, 30)
+	obs.height = rng.uniform(5, 30)
+	# Give the obstacle a velocity, so ellipses are rotated
+	obs._last_position = obs.coordinate - rng.uniform(-3, 3, 2)
+	if obs.shape == 4:
+		obs.polygon = Polygon(obs.coordinate + rng.uniform(-20, 20, (5, 2)))
+	return obs
+
+
+## Makes a GeometricEnvironment of the csu_based map, with random static
+# obstacles added and 20 random dynamic ones.
+#
+# @param seed (int)
+#
+# @param num_static (int)
+#
+# @returns (tuple of `GeometricEnvironment` object, `numpy.random.RandomState` object)
+#
+def make_geometric_env(seed=7, num_static=150):
+	cmdargs = argparse.Namespace(speedmode=2, map_name='Maps/coverage/csu_based.json', map_modifier_num=0)
+	env = GeometricEnvironment(800, 600, cmdargs.map_name, cmdargs=cmdargs)
+	rng = np.random.RandomState(seed)
+	env.static_obstacles = env.static_obstacles + [make_random_obstacle(rng) for i in range(num_static)]
+	env.dynamic_obstacles = [make_random_obstacle(rng) for i in range(20)]
+	return env, rng
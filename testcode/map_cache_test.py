@@ -0,0 +1,30 @@
+#!/usr/bin/python3
+
+import argparse
+import tempfile
+import numpy as np
+from MapCache import MapCache
+from GridDataEnvironment import GridDataEnvironment
+
+
+def test_map_cache_matches_uncached():
+	cmdargs = argparse.Namespace(map_modifier_num=0, speedmode=2)
+	expected = GridDataEnvironment(800, 600, 'Maps/floorplan.png', cmdargs=cmdargs, map_cache=False)
+	with tempfile.TemporaryDirectory() as cache_dir:
+		cache = MapCache(cache_dir)
+		for _ in range(2):
+			env = GridDataEnvironment(800, 600, 'Maps/floorplan.png', cmdargs=cmdargs, map_cache=cache)
+			assert np.array_equal(env.static_overlay, expected.static_overlay)
+			assert np.array_equal(env.static_distance_field, expected.static_distance_field)
+			assert np.array_equal(env.grid_data, expected.grid_data)
+		assert cache.misses == 1 and cache.hits == 1
+
+		# Other maps and grid sizes must not reuse the entry
+		key = cache.get_key('Maps/floorplan.png', 'static_layers', (800, 600))
+		assert cache.get_key('Maps/floorplan.png', 'static_layers', (900, 700)) != key
+		assert cache.get_key('Maps/maze.png', 'static_layers', (800, 600)) != key
+
+
+if __name__ == '__main__':
+	test_map_cache_matches_uncached()
+	print('PASS: cached map layers match uncached ones')
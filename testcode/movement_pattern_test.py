@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+
+import numpy as np
+import MovementPattern
+from DynamicObstacles import DynamicObstacle
+
+
+def test_clock_driven_obstacles_match_stepped_obstacles(num_steps=30):
+	def make_obstacles():
+		return [
+			DynamicObstacle(MovementPattern.CircleMovement((300, 200), 30, 2)),
+			DynamicObstacle(MovementPattern.PathMovement([(10, 10), (200, 50), (100, 300), (10, 10)], speed=3)),
+			DynamicObstacle(MovementPattern.PathMovement([(-1000, -1000, 0), (50, 60, 5), (90, 60, 9.5), (-1000, -1000, 9.51)], loop=False)),
+		]
+	stepped = make_obstacles()
+	clocked = make_obstacles()
+	clock = MovementPattern.SimClock()
+
+	for step in range(num_steps):
+		# One obstacle joins the clock late
+		for obs in (clocked if step >= 5 else clocked[:2]):
+			obs.next_step(1, clock=clock)
+		clock.advance(1)
+		for obs in stepped[:2] if step < 5 else stepped:
+			obs.next_step(1)
+		for a, b in zip(stepped, clocked):
+			assert np.array_equal(a.coordinate, b.coordinate)
+			assert np.array_equal(a.get_velocity_vector(), b.get_velocity_vector())
+
+
+def test_path_pos_at_matches_linear_search():
+	def linear_pos_at(path, time):
+		for i in range(len(path) - 1):
+			if path[i][2] <= time < path[i+1][2]:
+				return path[i][:2] + ((path[i+1][:2] - path[i][:2]) * (time - path[i][2]) / (path[i+1][2] - path[i][2]))
+		return path[0][:2] if time <= path[0][2] else path[-1][:2]
+
+	rng = np.random.RandomState(3)
+	points = rng.uniform(0, 800, (60, 2))
+	stamps = np.cumsum(rng.uniform(0.1, 5, 60))
+	# Like the obsmat pedestrians: off screen, with segments of no
+	# duration at the ends
+	timestamped = [(-1000, -1000, stamps[0])] + [(x, y, t) for (x, y), t in zip(points, stamps)] + [(-1000, -1000, stamps[-1] + 0.01)]
+	for movement in (MovementPattern.PathMovement(points, speed=4), MovementPattern.PathMovement(timestamped, loop=False)):
+		length = movement._path_length
+		# Forward steps (which use the cursor), then random jumps
+		times = np.concatenate((np.arange(-3, 2.5 * length, 0.7), rng.uniform(-10, 3 * length, 300), movement._path_list[:, 2]))
+		many = movement.pos_at_many(times)
+		for time, pos in zip(times, many):
+			expected = linear_pos_at(movement._path_list, time % length if movement._loop else time)
+			assert np.array_equal(movement.pos_at(time), expected)
+			assert np.array_equal(pos, expected)
+
+
+if __name__ == '__main__':
+	test_clock_driven_obstacles_match_stepped_obstacles()
+	test_path_pos_at_matches_linear_search()
+	print('PASS: movement patterns agree')
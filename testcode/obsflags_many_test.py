@@ -0,0 +1,28 @@
+#!/usr/bin/python3
+
+import numpy as np
+from Environment import ObsFlag
+from testcode.helpers import make_geometric_env
+
+
+def test_get_obsflags_many_matches_get_obsflags(num_points=2000):
+	env, rng = make_geometric_env()
+	obstacles = env.static_obstacles + env.dynamic_obstacles
+	near = np.array([obs.coordinate for obs in obstacles])[rng.randint(0, len(obstacles), num_points)] + rng.uniform(-30, 30, (num_points, 2))
+	points = np.vstack((near, rng.uniform(-50, 850, (300, 2))))
+
+	for flag_types in (0xFFFFFFFF, ObsFlag.DYNAMIC_OBSTACLE, ObsFlag.STATIC_OBSTACLE, ObsFlag.ANY_OBSTACLE):
+		expected = [env.get_obsflags(point, flag_types) for point in points]
+		assert np.array_equal(env.get_obsflags_many(points, flag_types), expected)
+
+	# Short segments, as checked by the RRT planners
+	for i in range(50):
+		p1 = rng.uniform(0, 800, 2)
+		segment = p1 + np.outer(np.arange(0, 60, 1.0), rng.uniform(-1, 1, 2))
+		expected = [env.get_obsflags(point) for point in segment]
+		assert np.array_equal(env.get_obsflags_many(segment), expected)
+
+
+if __name__ == '__main__':
+	test_get_obsflags_many_matches_get_obsflags()
+	print('PASS: get_obsflags_many matches get_obsflags')
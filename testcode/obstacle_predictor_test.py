@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+
+import argparse
+import numpy as np
+from GeometricEnvironment import GeometricEnvironment
+import Rasterizer
+import MovementPattern
+from DynamicObstacles import DynamicObstacle
+from ObstaclePredictor import OracleObstaclePredictor
+
+
+def test_oracle_predictor_matches_future_obstacles(num_steps=40):
+	cmdargs = argparse.Namespace(speedmode=2, map_name='Maps/coverage/csu_based.json', map_modifier_num=0)
+	env = GeometricEnvironment(800, 600, cmdargs.map_name, cmdargs=cmdargs)
+	rng = np.random.RandomState(8)
+	# The obstacles' movements start later than the clock
+	for step in range(3):
+		env.next_step()
+	movements = [
+		MovementPattern.CircleMovement(rng.uniform(100, 500, 2), 40, speed=6),
+		MovementPattern.PathMovement(rng.uniform(0, 600, (5, 2)), speed=9, loop=True),
+		MovementPattern.PathMovement(rng.uniform(0, 600, (4, 2)), speed=5, loop=False),
+		MovementPattern.StaticMovement(rng.uniform(0, 600, 2)),
+		MovementPattern.RandomMovement(initial_pos=rng.uniform(0, 600, 2), speed=8),
+	]
+	for i, movement in enumerate(movements * 2):
+		obs = DynamicObstacle(movement)
+		obs.shape = 1 + i % 3
+		obs.radius = rng.uniform(5, 20)
+		obs.size = rng.uniform(5, 30, 2)
+		obs.width, obs.height = rng.uniform(8, 30, 2)
+		env.dynamic_obstacles.append(obs)
+	for i in range(10):
+		start = rng.randint(0, num_steps)
+		path = [(-1000, -1000, start)] + [tuple(rng.uniform(0, 600, 2)) + (start + t,) for t in range(1, 15)]
+		obs = DynamicObstacle(MovementPattern.PathMovement(path, loop=False))
+		obs.shape = 3
+		obs.width, obs.height = 20, 10
+		env.schedule_obstacle(obs, start, start + 14)
+
+	env.next_step()
+	predictor = OracleObstaclePredictor(env, chunk_size=8)
+	predictor.add_observation(None, None, None, None)
+	cells = np.indices((800, 600)).reshape(2, -1).T
+	snapshot = env.snapshot()
+	for step in range(num_steps):
+		grid = np.zeros((800, 600), dtype=np.uint8)
+		for obs in env.dynamic_obstacles:
+			if type(obs._movement) is not MovementPattern.RandomMovement:
+				Rasterizer.stamp_obstacle(grid, obs, 1)
+		assert np.array_equal(predictor.get_prediction_many(cells + 0.5, step).reshape(800, 600), grid)
+		for x, y in cells[rng.randint(0, len(cells), 50)]:
+			assert predictor.get_prediction([x + 0.3, y + 0.7], step) == grid[x, y]
+		assert np.any(grid)
+		env.next_step()
+
+	# Predictions are relative to the last observation
+	env.restore(snapshot)
+	for step in range(5):
+		env.next_step()
+	predictor.add_observation(None, None, None, None)
+	grid = np.zeros((800, 600), dtype=np.uint8)
+	for obs in env.dynamic_obstacles:
+		if type(obs._movement) is not MovementPattern.RandomMovement:
+			Rasterizer.stamp_obstacle(grid, obs, 1)
+	assert np.array_equal(predictor.get_prediction_many(cells + 0.5, 0).reshape(800, 600), grid)
+	assert predictor.get_prediction([-5, 10], 0) == 0
+
+
+if __name__ == '__main__':
+	test_oracle_predictor_matches_future_obstacles()
+	print('PASS: oracle predictions match future obstacles')
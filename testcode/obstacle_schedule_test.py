@@ -0,0 +1,51 @@
+#!/usr/bin/python3
+
+import argparse
+import numpy as np
+from GeometricEnvironment import GeometricEnvironment
+import MovementPattern
+from DynamicObstacles import DynamicObstacle
+from testcode.helpers import make_random_obstacle
+
+
+def test_scheduled_obstacles_are_only_active_in_their_intervals(num_obstacles=40, num_steps=60):
+	cmdargs = argparse.Namespace(speedmode=2, map_name='Maps/coverage/csu_based.json', map_modifier_num=0)
+	env = GeometricEnvironment(800, 600, cmdargs.map_name, cmdargs=cmdargs)
+	rng = np.random.RandomState(4)
+	always = make_random_obstacle(rng)
+	env.dynamic_obstacles.append(always)
+
+	# Pedestrian-style paths: parked off screen before and after
+	intervals = []
+	for i in range(num_obstacles):
+		start = rng.randint(0, num_steps)
+		end = start + rng.randint(0, 20)
+		path = [(-1000, -1000, start)] + [tuple(rng.uniform(0, 600, 2)) + (t,) for t in range(start, end + 1)] + [(-1000, -1000, end + 0.01)]
+		obs = DynamicObstacle(MovementPattern.PathMovement(path, loop=False))
+		env.schedule_obstacle(obs, start, end)
+		intervals.append((obs, start, end))
+
+	for step in range(num_steps):
+		if step == 20:
+			snapshot = env.snapshot()
+			expected = list(env.dynamic_obstacles)
+		time = env.clock.time
+		active = [obs for obs, start, end in intervals if start <= time <= end]
+		assert env.dynamic_obstacles[0] is always
+		assert set(map(id, env.dynamic_obstacles[1:])) == set(map(id, active))
+		assert env.obstacle_schedule.num_active() == len(active)
+		for obs in active:
+			assert np.array_equal(obs.coordinate, obs._movement.pos_at(time))
+			assert 0 <= obs.coordinate[0]
+		env.next_step()
+
+	env.restore(snapshot)
+	assert env.dynamic_obstacles == expected
+	env.next_step()
+	time = env.clock.time
+	assert set(map(id, env.dynamic_obstacles[1:])) == set(id(obs) for obs, start, end in intervals if start <= time <= end)
+
+
+if __name__ == '__main__':
+	test_scheduled_obstacles_are_only_active_in_their_intervals()
+	print('PASS: scheduled obstacles are only active in their intervals')
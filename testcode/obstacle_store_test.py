@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+
+import numpy as np
+import MovementPattern
+from DynamicObstacles import DynamicObstacle
+from ObstacleStore import ObstacleStore
+from GeometricRadar import GeometricRadar
+from testcode.helpers import ObstacleEnv
+
+
+def test_stored_obstacles_match_stepped_obstacles(num_steps=30):
+	def make_obstacles():
+		obstacles = [
+			DynamicObstacle(MovementPattern.CircleMovement((300, 200), 30, 2)),
+			DynamicObstacle(MovementPattern.PathMovement([(10, 10), (200, 50), (100, 300), (10, 10)], speed=30)),
+			DynamicObstacle(MovementPattern.PathMovement([(-1000, -1000, 0), (50, 60, 5), (90, 60, 9.5), (-1000, -1000, 9.51)], loop=False)),
+			DynamicObstacle(MovementPattern.RandomMovement(initial_pos=(250, 250), speed=4)),
+			DynamicObstacle(MovementPattern.RandomMovement(initial_pos=(150, 100), random_interval=0.4, speed=3)),
+		]
+		for obs, shape in zip(obstacles, (3, 1, 2, 2, 1)):
+			obs.shape = shape
+			obs.radius = 12
+			obs.size = [20, 15]
+			obs.width = 30
+			obs.height = 14
+		return obstacles
+	stepped = make_obstacles()
+	stepped_clock = MovementPattern.SimClock()
+	stored = make_obstacles()
+	store = ObstacleStore(MovementPattern.SimClock())
+	for obs in stored:
+		store.add(obs)
+	assert len(store) == len(stored)
+
+	center = np.array([200.0, 150.0])
+	stepped_radar = GeometricRadar(ObstacleEnv([], stepped), radius=150)
+	stored_radar = GeometricRadar(ObstacleEnv([], stored), radius=150)
+	for step in range(num_steps):
+		np.random.seed(step)
+		for obs in stepped:
+			obs.next_step(1, clock=stepped_clock)
+		stepped_clock.advance(1)
+		np.random.seed(step)
+		store.step(1, range(len(stored)))
+		store.clock.advance(1)
+
+		for a, b in zip(stepped, stored):
+			assert np.array_equal(a.coordinate, b.coordinate)
+			assert np.array_equal(a.get_velocity_vector(), b.get_velocity_vector())
+		assert np.array_equal(stepped_radar.scan_dynamic_obstacles(center), stored_radar.scan_dynamic_obstacles(center))
+
+	# Attributes of stored obstacles are kept in the store
+	stored[1].radius = 40
+	assert store.radii[1] == 40
+	stored[1].coordinate = np.array([5.0, 6.0])
+	assert np.array_equal(store.get_positions(np.array([1]))[0], (5.0, 6.0))
+	store.clock.advance(1)
+	assert not np.array_equal(stored[1].coordinate, (5.0, 6.0))
+
+
+if __name__ == '__main__':
+	test_stored_obstacles_match_stepped_obstacles()
+	print('PASS: stored obstacles match stepped obstacles')
@@ -0,0 +1,90 @@
+#!/usr/bin/python3
+
+import json
+import os
+import tempfile
+import numpy as np
+import PedestrianData
+
+
+def _make_pedestrians(rng, num_pedestrians):
+	pedestrians = {}
+	for ped_id in rng.permutation(3 * num_pedestrians)[:num_pedestrians]:
+		start = rng.uniform(0, 100)
+		pedestrians[str(ped_id)] = [{name: float(value) for name, value in zip(PedestrianData.COLUMNS, (start + 0.4*i,) + tuple(rng.uniform(-10, 10, 4)))} for i in range(rng.randint(1, 30))]
+	return pedestrians
+
+
+def _assert_same_dataset(dataset, expected):
+	assert np.array_equal(dataset.ped_ids, expected.ped_ids)
+	assert np.array_equal(dataset.offsets, expected.offsets)
+	for name in PedestrianData.COLUMNS:
+		assert np.array_equal(dataset.columns[name], expected.columns[name])
+
+
+def test_pedestrian_dataset_matches_json():
+	rng = np.random.RandomState(6)
+	pedestrians = {}
+	for ped_id in (3, 1, 12, 7):
+		start = rng.uniform(0, 100)
+		pedestrians[str(ped_id)] = [{name: float(value) for name, value in zip(PedestrianData.COLUMNS, (start + 0.4*i,) + tuple(rng.uniform(-10, 10, 4)))} for i in range(rng.randint(1, 30))]
+
+	with tempfile.TemporaryDirectory() as tmp_dir:
+		json_filename = os.path.join(tmp_dir, 'obsmat.json')
+		with open(json_filename, 'w') as f:
+			json.dump(pedestrians, f)
+
+		# Converted on the first load, then loaded from the columns
+		for i in range(2):
+			dataset = PedestrianData.load_obsmat(json_filename)
+			assert os.path.isdir(os.path.join(tmp_dir, 'obsmat.peds'))
+			assert dataset.ped_ids.tolist() == [3, 1, 12, 7]
+			for ped_id, samples in pedestrians.items():
+				assert int(ped_id) in dataset
+				assert dataset.get_sample(int(ped_id), 0) == samples[0]
+				assert dataset.get_sample(int(ped_id), -1) == samples[-1]
+				columns = dataset.get_samples(int(ped_id))
+				for name in PedestrianData.COLUMNS:
+					assert columns[name].tolist() == [sample[name] for sample in samples]
+		assert isinstance(dataset.columns['time'], np.memmap)
+
+
+def test_replaced_dataset_stays_loadable():
+	rng = np.random.RandomState(2)
+	pedestrians = _make_pedestrians(rng, 50)
+	expected = PedestrianData.from_samples(pedestrians)
+	other = PedestrianData.from_samples(_make_pedestrians(rng, 30))
+
+	with tempfile.TemporaryDirectory() as tmp_dir:
+		json_filename = os.path.join(tmp_dir, 'obsmat.json')
+		dirname = os.path.join(tmp_dir, 'obsmat.peds')
+		with open(json_filename, 'w') as f:
+			json.dump(pedestrians, f)
+		PedestrianData.load_obsmat(json_filename)
+		dataset = PedestrianData.load_obsmat(json_filename)
+		assert isinstance(dataset.columns['time'], np.memmap)
+
+		# Another process saved the dataset first, so it is kept
+		PedestrianData.save_dataset(other, dirname)
+		_assert_same_dataset(PedestrianData.load_dataset(dirname), expected)
+		assert sorted(os.listdir(tmp_dir)) == ['obsmat.json', 'obsmat.peds']
+
+		# Replaced while still memory-mapped here
+		PedestrianData.save_dataset(other, dirname, replace=True)
+		_assert_same_dataset(dataset, expected)
+		_assert_same_dataset(PedestrianData.load_dataset(dirname), other)
+		assert sorted(os.listdir(tmp_dir)) == ['obsmat.json', 'obsmat.peds']
+
+		# Half gone, as when another process replaces it during the
+		# load, so the JSON file is read instead
+		os.utime(json_filename, (0, 0))
+		os.remove(os.path.join(dirname, 'pos_x.npy'))
+		dataset = PedestrianData.load_obsmat(json_filename)
+		assert not isinstance(dataset.columns['time'], np.memmap)
+		_assert_same_dataset(dataset, expected)
+
+
+if __name__ == '__main__':
+	test_pedestrian_dataset_matches_json()
+	test_replaced_dataset_stays_loadable()
+	print('PASS: pedestrian datasets match obsmat.json')
@@ -0,0 +1,46 @@
+#!/usr/bin/python3
+
+import numpy as np
+from Environment import ObsFlag
+import MovementPattern
+from DynamicObstacles import DynamicObstacle
+import Rasterizer
+from testcode.helpers import make_geometric_env
+
+
+def test_rasterized_obstacles_match_get_obsflags(num_points=3000):
+	env, rng = make_geometric_env()
+	grid_data = np.zeros((800, 600), dtype=np.uint8)
+	for obs in env.dynamic_obstacles:
+		Rasterizer.stamp_obstacle(grid_data, obs, ObsFlag.DYNAMIC_OBSTACLE)
+
+	# Mostly cells near the obstacles, where the shapes matter
+	near = np.array([obs.coordinate for obs in env.dynamic_obstacles])[rng.randint(0, 20, num_points)] + rng.uniform(-40, 40, (num_points, 2))
+	cells = np.vstack((near, rng.uniform(0, 800, (300, 2)) * [1, 0.75])).astype(int)
+	cells = cells[(0 <= cells[:, 0]) & (cells[:, 0] < 800) & (0 <= cells[:, 1]) & (cells[:, 1] < 600)]
+	for x, y in cells:
+		expected = env.get_obsflags([x + 0.5, y + 0.5], ObsFlag.DYNAMIC_OBSTACLE)
+		assert grid_data[x, y] == expected
+
+
+def test_rectangle_edge_cells_match_get_obsflags():
+	env, rng = make_geometric_env()
+	# The far edges pass through cell centers, which count as inside
+	obs = DynamicObstacle(MovementPattern.StaticMovement([10.5, 20.5]))
+	obs.shape = 2
+	obs.size = [4, 3]
+	env.dynamic_obstacles = [obs]
+	grid_data = np.zeros((800, 600), dtype=np.uint8)
+	Rasterizer.stamp_obstacle(grid_data, obs, ObsFlag.DYNAMIC_OBSTACLE)
+
+	assert np.count_nonzero(grid_data) == 5 * 4
+	assert grid_data[14, 23] == ObsFlag.DYNAMIC_OBSTACLE
+	for x in range(8, 17):
+		for y in range(18, 26):
+			assert grid_data[x, y] == env.get_obsflags([x + 0.5, y + 0.5], ObsFlag.DYNAMIC_OBSTACLE)
+
+
+if __name__ == '__main__':
+	test_rasterized_obstacles_match_get_obsflags()
+	test_rectangle_edge_cells_match_get_obsflags()
+	print('PASS: rasterized obstacles match get_obsflags')
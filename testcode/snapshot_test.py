@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+
+import argparse
+import numpy as np
+from GeometricEnvironment import GeometricEnvironment
+from GridDataEnvironment import GridDataEnvironment
+
+
+def test_restore_updates_batched_queries(num_points=1000):
+	np.random.seed(9)
+	cmdargs = argparse.Namespace(speedmode=2, map_name='Maps/coverage/csu_based.json', map_modifier_num=1)
+	env = GeometricEnvironment(800, 600, cmdargs.map_name, cmdargs=cmdargs)
+	rng = np.random.RandomState(9)
+	points = rng.uniform(0, 800, (num_points, 2)) * [1, 0.75]
+
+	snapshot = env.snapshot()
+	before = env.get_obsflags_many(points)
+	for step in range(20):
+		env.next_step()
+	assert not np.array_equal(env.get_obsflags_many(points), before)
+
+	# The packed obstacles cached for the later step must not be reused
+	env.restore(snapshot)
+	assert np.array_equal(env.get_obsflags_many(points), before)
+	assert np.array_equal(env.get_obsflags_many(points), [env.get_obsflags(point) for point in points])
+
+
+def test_restore_repeats_steps(num_steps=10):
+	np.random.seed(5)
+	cmdargs = argparse.Namespace(map_modifier_num=1, speedmode=2)
+	env = GridDataEnvironment(800, 600, 'Maps/floorplan.png', cmdargs=cmdargs, map_cache=False)
+	for step in range(3):
+		env.next_step()
+
+	def run():
+		states = []
+		for step in range(num_steps):
+			env.next_step()
+			positions = np.array([obs.coordinate for obs in env.dynamic_obstacles])
+			states.append((env.get_step_num(), positions, np.array(env.grid_data), [np.array(level) for level in env.occupancy_pyramid.levels]))
+		return states
+
+	snapshot = env.snapshot()
+	grid_data = env.grid_data
+	expected = run()
+	for attempt in range(2):
+		env.restore(snapshot)
+		assert env.grid_data is grid_data
+		assert env.get_step_num() == snapshot.step_num
+		assert np.array_equal([obs.coordinate for obs in env.dynamic_obstacles], snapshot.obstacle_positions)
+		assert np.array_equal(env.grid_data, snapshot.grid_data)
+		for step, state in enumerate(run()):
+			assert state[0] == expected[step][0]
+			assert np.array_equal(state[1], expected[step][1])
+			assert np.array_equal(state[2], expected[step][2])
+			for k in range(len(state[3])):
+				assert np.array_equal(state[3][k], expected[step][3][k])
+
+
+if __name__ == '__main__':
+	test_restore_updates_batched_queries()
+	test_restore_repeats_steps()
+	print('PASS: restored snapshots repeat the same steps')
@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+
+import numpy as np
+import Geometry
+from Environment import ObsFlag
+from GeometricRadar import GeometricRadar
+from SpatialIndex import BoxGrid
+from testcode.helpers import make_random_obstacle, make_geometric_env
+
+
+def test_segment_intersects_matches_brute_force(num_segments=300):
+	env, rng = make_geometric_env()
+	radar = GeometricRadar(env)
+	index = env.get_static_index()
+
+	for i in range(num_segments):
+		p1 = rng.uniform(-50, 850, 2)
+		p2 = p1 + rng.uniform(-200, 200, 2)
+		expected = any(radar._obs_dist_along_line(obs, (p1, p2)) < float('inf') for obs in env.static_obstacles)
+		assert index.segment_intersects((p1, p2)) == expected
+
+
+def test_get_obsflags_matches_brute_force(num_points=300):
+	env, rng = make_geometric_env()
+
+	for point in rng.uniform(0, 800, (num_points, 2)):
+		expected = 0
+		for obs in env.static_obstacles:
+			vec = point - obs.coordinate
+			if (obs.shape == 1 and np.dot(vec, vec) < obs.radius*obs.radius) \
+				or (obs.shape == 2 and Geometry.point_inside_rectangle([obs.coordinate, obs.size], point)) \
+				or (obs.shape == 3 and Geometry.point_inside_ellipse(obs.coordinate, obs.width, obs.height, np.arctan2(obs.get_velocity_vector()[1], obs.get_velocity_vector()[0]), point)) \
+				or (obs.shape == 4 and obs.polygon.contains_point(point)):
+				expected = ObsFlag.STATIC_OBSTACLE
+				break
+		assert env.get_obsflags(point, ObsFlag.STATIC_OBSTACLE) == expected
+
+
+def test_indexed_radar_matches_per_beam_scan(num_scans=15, abs_error=1e-8):
+	env, rng = make_geometric_env()
+	per_beam_radar = GeometricRadar(env, use_vectorized_scan=False)
+	indexed_radar = GeometricRadar(env)
+
+	centers = rng.uniform(0, 800, (num_scans, 2))
+	for center in centers:
+		assert np.allclose(per_beam_radar.scan(center), indexed_radar.scan(center), rtol=0, atol=abs_error)
+		assert np.allclose(per_beam_radar.scan(center), indexed_radar.scan_full(center)[0], rtol=0, atol=abs_error)
+	assert np.array_equal(indexed_radar.scan_many(centers), [indexed_radar.scan(center) for center in centers])
+
+	# The radar shares the environment's packing of the dynamic obstacles
+	assert indexed_radar._pack_dynamic(env.dynamic_obstacles) is env.get_dynamic_packed()
+	assert indexed_radar._pack_dynamic(list(env.dynamic_obstacles)) is not env.get_dynamic_packed()
+
+
+def test_box_grid_matches_brute_force(num_queries=300):
+	rng = np.random.RandomState(10)
+	lo = rng.uniform(-100, 900, (500, 2))
+	boxes = np.hstack((lo, lo + rng.uniform(0, 60, (500, 2))))
+	# A few large boxes, and one far away
+	boxes[:5, 2:] += 400
+	boxes[5] = (5000, 5000, 5010, 5010)
+	grid = BoxGrid(boxes, cell_size=25)
+
+	for i in range(num_queries):
+		q = rng.uniform(-200, 1000, 2)
+		q = np.concatenate((q, q + rng.uniform(0, 80, 2)))
+		expected = np.flatnonzero((boxes[:, 0] <= q[2]) & (q[0] <= boxes[:, 2]) & (boxes[:, 1] <= q[3]) & (q[1] <= boxes[:, 3]))
+		assert np.array_equal(grid.ids_in_box(*q), expected)
+	# Boxes that only touch the query count
+	assert 7 in grid.ids_in_box(boxes[7, 2], boxes[7, 3], boxes[7, 2] + 1, boxes[7, 3] + 1)
+	assert len(BoxGrid(np.zeros((0, 4))).ids_in_box(0, 0, 10, 10)) == 0
+
+
+if __name__ == '__main__':
+	test_segment_intersects_matches_brute_force()
+	test_get_obsflags_matches_brute_force()
+	test_indexed_radar_matches_per_beam_scan()
+	test_box_grid_matches_brute_force()
+	print('PASS: spatial index queries match brute force')